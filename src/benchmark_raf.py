@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# File: benchmark_raf.py
+# Updated: 02/05/2023
+# =============================================================================
+'''Micro-benchmark of the RAF operators against their former loop-based versions'''
+# =============================================================================
+# Dependencies:
+#   ./robustness/abstract_domains/raf.py
+#   ./robustness/utils/error.py
+#   ./robustness/utils/hyperplane.py
+# =============================================================================
+
+from numpy import absolute, array, asarray, dot, empty, matrix, ones, squeeze, zeros
+from numpy.linalg import inv
+from numpy.random import default_rng
+from sys import argv
+from timeit import timeit
+from typing import Any, Callable
+
+from robustness import Integer, Real, String, Vector
+from robustness.abstract_domains import Raf
+from robustness.utils import Error
+from robustness.utils.hyperplane import Hyperplane
+
+# argv[1] = number of repetitions of each operation (optional)
+
+def loop_square(x: Raf) -> Raf:
+    '''
+    Square of a RAF computed with the former nested loop over the coefficients
+    :param x: The RAF to square
+    :return: The square of the RAF
+    '''
+    noise = abs(x.noise**2 + 2 * x.center * x.noise)
+    for i in range(0, x.size()):
+        noise += x.linear[i]**2
+        noise += abs(2 * x.linear[i] * x.noise)
+        for j in range(i + 1, x.size()):
+            noise += abs(2 * x.linear[i] * x.linear[j])
+    return Raf(x.center**2, 2 * x.center * x.linear, noise)
+
+def loop_mul(x: Raf, y: Raf) -> Raf:
+    '''
+    Product of two RAFs computed with the former loop over the coefficients
+    :param x: First factor
+    :param y: Second factor
+    :return: The product of the RAFs
+    '''
+    linear = empty(x.linear.shape)
+    x_norm_one = 0.0
+    y_norm_one = 0.0
+    xy = 0.0
+    xy_abs = 0.0
+    for i in range(0, x.size()):
+        xy += x.linear[i] * y.linear[i]
+        xy_abs += abs(x.linear[i] * y.linear[i])
+        x_norm_one += abs(x.linear[i])
+        y_norm_one += abs(y.linear[i])
+        linear[i] = y.center * x.linear[i] + x.center * y.linear[i]
+    return Raf(
+        x.center * y.center + 0.5 * xy,
+        linear,
+        abs(y.center) * x.noise + abs(x.center) * y.noise + (x_norm_one + x.noise) * (y_norm_one + y.noise) - 0.5 * xy_abs
+    )
+
+def hyperplane_abs(x: Raf) -> Raf:
+    '''
+    Absolute value of a RAF computed with the former hyperplane construction
+    :param x: The RAF, which must not be single variable and must contain 0
+    :return: The absolute value of the RAF
+    '''
+    n = x.size() + 2
+
+    p = Hyperplane(dimensions=n)
+    p.constant = x.center
+    for i in range(0, x.size()):
+        p.coefficients[i] = x.linear[i]
+    p.coefficients[x.size()] = x.noise
+    p.coefficients[x.size() + 1] = -1
+
+    points = zeros((n, n))
+    for i in range(0, x.size()):
+        points[0][i] = +1 if x.linear[i] < 0.0 else -1
+        points[1][i] = -1 if x.linear[i] < 0.0 else +1
+    points[0][x.size()] = -1
+    points[1][x.size()] = +1
+    points[0][x.size() + 1] = abs(x.lowerbound())
+    points[1][x.size() + 1] = abs(x.upperbound())
+    for i in range(0, x.size()):
+        points[i + 2][i] = 1
+        points[i + 2][x.size() + 1] = abs(p(points[i + 2]))
+
+    X = matrix(points)
+    A = matrix.dot(inv(X), ones((n, 1)))
+    h_top = Hyperplane(squeeze(asarray(A)), -1.0)
+
+    y = zeros(n)
+    nabla = array([p.coefficients[i] for i in range(0, n)])
+    nabla[n - 1] = 0
+    for i in range(1, 100):
+        if dot(y, nabla) == -p.constant:
+            break
+        elif dot(y, nabla) > -p.constant:
+            y -= nabla / i
+        else:
+            y += nabla / i
+
+    h_bottom = Hyperplane(h_top.coefficients, h_top.constant - h_top(y))
+    h = Hyperplane(h_top.coefficients, 0.5 * (h_top.constant + h_bottom.constant))
+    delta = abs(0.5 * (h_top.constant - h_bottom.constant) / -h.coefficients[n-1])
+    h_c = h / -h.coefficients[n - 1]
+
+    return Raf(h_c.constant, h_c.coefficients[0:n-2], abs(h_c.coefficients[n - 2]) + delta)
+
+def random_raf(rng: Any, dimensions: Integer) -> Raf:
+    return Raf(rng.uniform(-0.5, 0.5), rng.uniform(-1, 1, dimensions), rng.uniform(0, 1))
+
+def difference(x: Raf, y: Raf) -> Real:
+    return max(abs(x.center - y.center), absolute(x.linear - y.linear).max(), abs(x.noise - y.noise))
+
+def benchmark(
+    name: String,
+    former: Callable[..., Raf],
+    current: Callable[..., Raf],
+    operands: Vector[Raf],
+    dimensions: Integer,
+    repetitions: Integer
+) -> None:
+    '''
+    Time an operator against its former version and print one line of the report
+    :param name: Name of the operator
+    :param former: Former version of the operator
+    :param current: Current version of the operator
+    :param operands: Operands of the operator
+    :param dimensions: Number of noise symbols of the operands
+    :param repetitions: Number of times each version is run
+    '''
+    former_time = timeit(lambda: former(*operands), number=repetitions) / repetitions
+    current_time = timeit(lambda: current(*operands), number=repetitions) / repetitions
+    print('{:<8}{:>6}{:>14.2e}{:>14.2e}{:>10.1f}x{:>14.2e}'.format(
+        name, dimensions, former_time, current_time, former_time / current_time,
+        difference(former(*operands), current(*operands))
+    ))
+
+if __name__ == '__main__':
+    repetitions = 20
+    if len(argv) > 1:
+        if not argv[1].isdigit() or int(argv[1]) == 0:
+            Error('Number of repetitions \'{}\' not recognized. Expected value: positive integer'.format(argv[1]))
+        repetitions = int(argv[1])
+
+    rng = default_rng(0)
+    print('{:<8}{:>6}{:>14}{:>14}{:>11}{:>14}'.format('op', 'd', 'former (s)', 'current (s)', 'speedup', 'max diff'))
+    for dimensions in [10, 100, 1000]:
+        x, y = random_raf(rng, dimensions), random_raf(rng, dimensions)
+        benchmark('square', loop_square, Raf.square, [x], dimensions, repetitions if dimensions < 1000 else 1)
+        benchmark('mul', loop_mul, Raf.__mul__, [x, y], dimensions, repetitions)
+        benchmark('abs', hyperplane_abs, Raf.__abs__, [x], dimensions, repetitions if dimensions < 1000 else 1)
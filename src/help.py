@@ -43,7 +43,10 @@ while True:
             '\n  python3 nave.py <config_file.ini>' +
             '\n  # or' + 
             '\n  python3 nave.py <config_file.ini> log' +
-            '\n  # to obtain also a log file in \'{}\'\n'.format(settings_parser.get('DEFAULT', 'logs_dir')) +
+            '\n  # to obtain also a log file in \'{}\''.format(settings_parser.get('DEFAULT', 'logs_dir')) +
+            '\n  # or' +
+            '\n  python3 nave.py <config_file.ini> resume' +
+            '\n  # to continue an interrupted run from its last checkpoint (\'save_in\' must be set)\n' +
             '\nNote: You can use \'...\' to match multiple files. For example:' +
             '\n  python3 nave.py ...    # match all files in \'{}\''.format(settings_parser.get('DEFAULT', 'config_dir')) +
             '\n  python3 nave.py str... # match all files in \'{}\' starting with \'str\''.format(settings_parser.get('DEFAULT', 'config_dir'))
@@ -69,16 +72,20 @@ while True:
                     '\n  categories_<feature_number> = <literal_val_1> <literal_val_2> ... <literal_val_n>' +
                     '\n  feature_range = <min> <max>' + 
                     '\n  feature_range_<feature_number> = <min> <max>' + 
-                    '\n  random = <value in {true,false}>' +
+                    '\n  random = <value in {true,false}> # if true, num_test test points are sampled with random_state' +
                     '\n  random_state = <integer_val> ' +
+                    '\n  stream_test_set = <value in {true,false}> # default = false' +
                     '\n  perturbation = <value in {hyper_rect,l_inf,noise_cat}> *' +
-                    '\n  epsilons = <real_val_1> <real_val_2> ... <real_val_n>' +
-                    '\n  epsilon = <real_val> * # only if perturbation = l_inf' +
+                    '\n  epsilons = <real_val_1> <real_val_2> ... <real_val_n> # per-feature magnitudes if hyper_rect, sweep levels (one results folder each) if l_inf' +
+                    '\n  epsilon = <real_val> * # only if perturbation = l_inf and epsilons is not given' +
                     '\n  noise = <real_val> * # only if perturbation = noise_cat' +
                     '\n  noise_type = <value in {hyper_rect,l_inf}>' +
                     '\n  cat_on = <integer_val_1> <integer_val_2> ... <integer_val_n>' +
-                    '\n  k = <integer_val_1> <integer_val_2> ... <integer_val_n> *' +
+                    '\n  k = <integer_val_1> <integer_val_2> ... <integer_val_n> * # or ranges as <min>-<max>' +
                     '\n  distance_metric = <value in {euclidean,manhattan}> *' +
+                    '\n  pruning = <value in {none,kd_tree,quickselect}> # default = none' +
+                    '\n  certified_radius = <value in {true,false}> # default = false, only if perturbation = l_inf' +
+                    '\n  radius_precision = <real_val> # default = 0.001' +
                     '\n  skip_ties = <value in {true,false}> # default = false \n' + 
                     '\n  * Required\n' +
                     '\n  Examples can be found in \'{}\'\n'.format(settings_parser.get('DEFAULT', 'config_dir')) +
@@ -109,7 +116,17 @@ while True:
                     '\n  python3 standardize_dataset.py <dataset_name> <format in {csv,libsvm,svmlight}>\n' +
                     '\nExamples:' + 
                     '\n  python3 standardize_dataset.py adult csv' +
-                    '\n  python3 standardize_dataset.py letter libsvm'
+                    '\n  python3 standardize_dataset.py letter libsvm\n' +
+                    '\n\nPreprocessed datasets are cached in \'{}\''.format(settings_parser.get('DEFAULT', 'cache_dir', fallback='')) +
+                    '\n  # set cache_dir to an empty value in settings.ini to disable the cache\n' +
+                    '\n\nLarge test sets can be streamed (stream_test_set = true), that is read and preprocessed' +
+                    '\n{} points at a time (chunk_size in settings.ini), as they are verified\n'.format(settings_parser.get('DEFAULT', 'chunk_size', fallback='10000')) +
+                    '\n\nThe test points are verified in blocks of batch_size points (settings.ini, default = 1),' +
+                    '\nclassified at once if the perturbation creates a single adversarial region and certified_radius = false,' +
+                    '\nacross the number of processes set by workers (settings.ini, default = 1, workers >= 1)\n' +
+                    '\n\nSparse libsvm / svmlight datasets (less than 10% of the features stored, no categorical features)' +
+                    '\nare kept sparse when scaling maps 0 to 0 along every feature:' +
+                    '\n  abstraction = interval and pruning = none or quickselect are then required'
                 )
                 if pick(['Back', 'Exit'], text, indicator='=>')[0] == 'Exit':
                     exit()
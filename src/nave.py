@@ -8,29 +8,90 @@
 # Dependencies:
 #   ./robustness/base.py
 #   ./robustness/concrete_classifier.py
+#   ./robustness/shared_dataset.py
 #   ./robustness/abstract_classifiers/interval_classifier.py
+#   ./robustness/abstract_domains/interval.py
+#   ./robustness/perturbations/l_infinity.py
+#   ./robustness/perturbations/noise_cat.py
 #   ./robustness/utils/error.py
 #   ./robustness/utils/inizialize_main.py
+#   ./robustness/utils/results_writer.py
 # =============================================================================
 
+from collections import deque
 from configparser import ConfigParser
 from datetime import datetime
 import glob
+from itertools import chain, islice
+from multiprocessing import Pool
+from numpy import array
 from os import listdir, makedirs
 from os.path import exists, join
-from pandas import DataFrame
 from sys import argv
 from time import time
 from tqdm import tqdm
-from typing import Any, Tuple
+from typing import Any, Iterator, Tuple, Type
 
-from robustness import ConcreteClassifier, Integer, Literal, Map, Real, Set, String, Vector
+from robustness import Boolean, ConcreteClassifier, Dataset, Integer, Literal, Map, Real, Set, SharedDataset, String, Vector
 from robustness.abstract_classifiers import IntervalClassifier, RafClassifier
-from robustness.utils import read_params, Error
+from robustness.abstract_domains import Interval
+from robustness.perturbations import Linfinity, NoiseCat
+from robustness.utils import read_classifications, read_params, Error, ResultsWriter
 
 import sys
 
 write_log = False
+resume = False
+batch_size = 1
+workers = 1
+
+worker_classifier = None
+worker_params = None
+
+# classifiers already fitted, shared by the configurations that use the same training set
+classifiers_cache = {}
+
+def get_fitted_classifier(
+    classifier_type: Type[ConcreteClassifier | IntervalClassifier | RafClassifier],
+    params: Map[String, Any]
+) -> ConcreteClassifier | IntervalClassifier | RafClassifier:
+    '''
+    Provide a classifier fitted on the training set, reusing the one of a previous configuration if possible
+    :param classifier_type: Type of the classifier to use
+    :param params: Input params
+    :return: The fitted classifier
+    '''
+    pruning = None if classifier_type == ConcreteClassifier else params['pruning']
+    key = (params['datasets_key'], classifier_type, pruning)
+    if params['datasets_key'] is not None and key in classifiers_cache:
+        classifier = classifiers_cache[key]
+    else:
+        classifier = classifier_type()
+        if classifier_type == ConcreteClassifier:
+            classifier.fit(params['training_set'])
+        else:
+            classifier.fit(params['training_set'], pruning)
+        if params['datasets_key'] is not None:
+            classifiers_cache[key] = classifier
+    return classifier
+
+def set_categorical_blocks(
+    classifier: IntervalClassifier | RafClassifier,
+    params: Map[String, Any]
+) -> None:
+    '''
+    Let an abstract classifier look up the part of the distances due to the categorical features set by NOISE-CAT,
+    instead of computing the whole distances again for each combination of their values
+    :param classifier: Abstract classifier to use
+    :param params: Input params
+    '''
+    if isinstance(params['perturbation'], NoiseCat):
+        classifier.set_categorical_blocks(
+            params['perturbation'].get_cat_indexes(),
+            params['perturbation'].get_noise().get_starting_index()
+        )
+    else:
+        classifier.set_categorical_blocks(None)
 
 def get_classification(
     test_point: Vector[Real],
@@ -48,62 +109,127 @@ def get_classification(
 
     most_voted_labels = {k: Set() for k in params['k_values']}
     k_values_to_use = [k for k in params['k_values']]
-    
-    for _ in range(params['perturbation'].num_adv_regions()):
+
+    join_regions = isinstance(params['perturbation'], NoiseCat) and params['perturbation'].num_adv_regions() > 1 and \
+        not isinstance(classifier, ConcreteClassifier)
+
+    for i in range(params['perturbation'].num_adv_regions()):
+        if len(k_values_to_use) == 0:
+            break
         adv_region = params['perturbation'].perturb(test_point)
         for k, labels in classifier.classify(adv_region, k_values_to_use, params['distance_metric']).items():
             most_voted_labels[k] = most_voted_labels[k].union(labels)
             if len(most_voted_labels[k]) == params['training_set'].num_classes():
                 k_values_to_use.remove(k)
-        if len(k_values_to_use) == 0:
-            break
+
+        # a single region joining all the combinations of the categorical values decides the k for which it proves
+        # one label, so the other combinations are skipped (it is only tried when the first combination is stable)
+        if i == 0 and join_regions:
+            stable_k_values = [k for k in k_values_to_use if len(most_voted_labels[k]) == 1]
+            if len(stable_k_values) > 0:
+                joined_region = params['perturbation'].get_joined_region(test_point)
+                for k, labels in classifier.classify(joined_region, stable_k_values, params['distance_metric']).items():
+                    if len(labels) == 1:
+                        most_voted_labels[k] = labels
+                        k_values_to_use.remove(k)
 
     return most_voted_labels, time() - start_time
 
-def perform_concrete_classification(
+def get_batch_classification(
+    test_points: Vector[Vector[Real]],
+    classifier: ConcreteClassifier | IntervalClassifier | RafClassifier,
     params: Map[String, Any],
-    results_dir_path: String
-) -> None:
+) -> Tuple[Vector[Map[Integer, Set[Literal]]], Real]:
     '''
-    Main program for concrete classification
+    Provide the classification of a block of points and its execution time
+    (only for perturbations that create a single adversarial region)
+    :param test_points: Target test points
+    :param classifier: Classifier to use
     :param params: Input params
-    :param results_dir_path: Directory for the results
+    :return: Classification of each point and execution time
     '''
-    details = []
-    stable_yes_cnt = []
-    stable_no_cnt = []
-    robust_yes_cnt = []
-    robust_no_cnt = []
-    runtime = 0
-
-    for _ in params['k_values']:
-        details.append(
-            DataFrame({
-                'Robust': [],
-                'Stable': [],
-                'Classification': []
-            })
-        )
-        stable_yes_cnt.append(0)
-        stable_no_cnt.append(0)
-        robust_yes_cnt.append(0)
-        robust_no_cnt.append(0)
+    start_time = time()
 
-    concrete_classifier = ConcreteClassifier()
-    concrete_classifier.fit(params['training_set'])
-    concrete_classifier.set_log(write_log)
+    regions_lb, regions_ub = [], []
+    for test_point in test_points:
+        lower_bounds, upper_bounds = Interval.get_bounds(params['perturbation'].perturb(test_point))
+        regions_lb.append(lower_bounds)
+        regions_ub.append(upper_bounds)
 
-    classified_points = 0
+    if isinstance(classifier, ConcreteClassifier):
+        most_voted_labels = classifier.classify_batch(array(regions_lb), params['k_values'], params['distance_metric'])
+    else:
+        most_voted_labels = classifier.classify_batch(array(regions_lb), array(regions_ub), params['k_values'], params['distance_metric'])
 
-    progress_bar = tqdm(
-        zip(params['test_set'].get_points(), params['test_set'].get_labels()),
-        total=params['num_test'],
-        bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}{postfix}]',
-        desc='Verifying',
-        postfix='ROB=?%, STAB=?%'
-    )
+    return most_voted_labels, time() - start_time
 
-    for i, (test_point, test_label) in enumerate(progress_bar):
+def get_certified_classification(
+    test_point: Vector[Real],
+    test_label: Literal,
+    classifier: IntervalClassifier | RafClassifier,
+    params: Map[String, Any],
+) -> Tuple[Map[Integer, Set[Literal]], Real, Map[Integer, Real]]:
+    '''
+    Provide the classification of a point, its execution time and, for each k, the largest epsilon
+    (up to the one of the perturbation) at which the point is proved robust, found by bisection
+    :param test_point: Target test point
+    :param test_label: Label of the test point
+    :param classifier: Abstract classifier to use
+    :param params: Input params
+    :return: Point classification, execution time and certified radius for each k (0 if never proved robust)
+    '''
+    start_time = time()
+
+    perturbation = params['perturbation']
+    lower_epsilons = {k: 0.0 for k in params['k_values']}
+    upper_epsilons = {k: perturbation.get_epsilon() for k in params['k_values']}
+    candidates = {}
+
+    def probe(epsilon: Real) -> Map[Integer, Set[Literal]]:
+        # the candidates of a larger region are also the candidates of a smaller one
+        larger_epsilons = [larger_epsilon for larger_epsilon in candidates if larger_epsilon > epsilon]
+        classifier.restrict_candidates(candidates[min(larger_epsilons)] if len(larger_epsilons) > 0 else None)
+        adv_region = Linfinity(
+            epsilon,
+            perturbation.get_feature_range(),
+            perturbation.get_starting_index()
+        ).perturb(test_point)
+        most_voted_labels = classifier.classify(adv_region, params['k_values'], params['distance_metric'])
+        candidates[epsilon] = classifier.get_last_candidates()
+
+        for k, labels in most_voted_labels.items():
+            if lower_epsilons[k] < epsilon <= upper_epsilons[k]:
+                if labels == {test_label}:
+                    lower_epsilons[k] = epsilon
+                else:
+                    upper_epsilons[k] = epsilon
+        return most_voted_labels
+
+    try:
+        most_voted_labels = probe(perturbation.get_epsilon())
+        while True:
+            k = max(params['k_values'], key=lambda k: upper_epsilons[k] - lower_epsilons[k])
+            if upper_epsilons[k] - lower_epsilons[k] <= params['radius_precision']:
+                break
+            probe(0.5 * (lower_epsilons[k] + upper_epsilons[k]))
+    finally:
+        classifier.restrict_candidates(None)
+
+    return most_voted_labels, time() - start_time, lower_epsilons
+
+def select_test_points(
+    concrete_classifier: ConcreteClassifier | None,
+    params: Map[String, Any]
+) -> Iterator[Tuple[Vector[Real], Literal]]:
+    '''
+    Select, in order, the test points to classify
+    :param concrete_classifier: Concrete classifier used to skip ties (if required)
+    :param params: Input params
+    :return: Test points to classify, with their labels
+    '''
+    classified_points = 0
+
+    for test_point, test_label in params['test_set'].iterate():
         if classified_points == params['num_test']:
             break
 
@@ -115,196 +241,316 @@ def perform_concrete_classification(
                 break
             continue
 
-        most_voted_labels, exec_time = get_classification(test_point, concrete_classifier, params)
-        runtime += exec_time
         classified_points += 1
-        
-        for j, (k, labels) in enumerate(most_voted_labels.items()):
-            if len(labels) == 1:
-                is_stable = 'Yes'
-                stable_yes_cnt[j] += 1
-                if test_label in labels:
-                    is_robust = 'Yes' 
-                    robust_yes_cnt[j] += 1
-                else:
-                    is_robust = 'No'
-                    robust_no_cnt[j] += 1
-            else:
-                is_stable = 'No'
-                stable_no_cnt[j] += 1
-                is_robust = 'No'
-                robust_no_cnt[j] += 1
-
-            details[j].loc[len(details[j].index)] = [is_robust, is_stable, labels]
+        yield test_point, test_label
 
-        progress_bar.set_postfix_str('ROB={}%, STAB={}%'.format(
-            round(sum(robust_yes_cnt) / (classified_points * len(params['k_values'])) * 100, 1),
-            round(sum(stable_yes_cnt) / (classified_points * len(params['k_values'])) * 100, 1)
-        ))
-
-        if classified_points == params['num_test'] or i + 1 == params['test_set'].num_points():
-            progress_bar.set_description('Completed')
-
-    for i, k in enumerate(params['k_values']):
-        if not exists(join(results_dir_path, 'k{}'.format(k))):
-            makedirs(join(results_dir_path, 'k{}'.format(k)))
-
-        details[i].to_csv(join(results_dir_path, 'k{}'.format(k), 'details.csv'))
-
-        robustness = DataFrame({
-            '# Yes' : [robust_yes_cnt[i]],
-            '# No': [robust_no_cnt[i]],
-            'Robustness': ['{}%'.format(
-                round(robust_yes_cnt[i] / classified_points * 100, 1)
-                    if classified_points > 0 else '-'
-            )]
-        })
-        robustness.to_csv(join(results_dir_path, 'k{}'.format(k), 'robustness.csv'))
-
-        stability = DataFrame({
-            '# Yes' : [stable_yes_cnt[i]],
-            '# No': [stable_no_cnt[i]],
-            'Stability': ['{}%'.format(round(
-                stable_yes_cnt[i] / classified_points * 100, 1)
-                    if classified_points > 0 else '-'
-            )]
-        })
-        stability.to_csv(join(results_dir_path, 'k{}'.format(k), 'stability.csv'))
-
-    with open(join(results_dir_path, 'runtime.txt'), 'w') as file:
-        file.write('{} seconds'.format(round(runtime)))
+def select_blocks(
+    concrete_classifier: ConcreteClassifier | None,
+    params: Map[String, Any],
+    start: Integer = 0,
+    reused: Vector[Map[Integer, Set[Literal]] | None] | None = None
+) -> Iterator[Vector[Tuple[Vector[Real], Literal, Map[Integer, Set[Literal]] | None]]]:
+    '''
+    Group, in order, the selected test points in blocks holding at most batch_size points to classify,
+    plus the points whose classification is reused, reading the test points only as each block is required
+    :param concrete_classifier: Concrete classifier used to skip ties (if required)
+    :param params: Input params
+    :param start: Number of selected test points already verified, which are skipped
+    :param reused: Classification to reuse for each selected test point (None if it must be computed)
+    :return: Test points of each block, with their labels and reused classifications (None if not available)
+    '''
+    block = []
+    pending = 0
+    for i, (test_point, test_label) in enumerate(islice(select_test_points(concrete_classifier, params), start, None), start):
+        reused_labels = reused[i] if reused is not None else None
+        if reused_labels is None:
+            if pending == max(batch_size, 1):
+                yield block
+                block = []
+                pending = 0
+            pending += 1
+        block.append((test_point, test_label, reused_labels))
+    if len(block) > 0:
+        yield block
+
+def classify_block(
+    test_points: Vector[Vector[Real]],
+    test_labels: Vector[Literal],
+    classifier: ConcreteClassifier | IntervalClassifier | RafClassifier,
+    params: Map[String, Any],
+    use_batches: Boolean
+) -> Vector[Tuple[Map[Integer, Set[Literal]], Real, Map[Integer, Real] | None]]:
+    '''
+    Classify a block of test points
+    :param test_points: Target test points
+    :param test_labels: Labels of the test points
+    :param classifier: Classifier to use
+    :param params: Input params
+    :param use_batches: Whether the block can be classified at once
+    :return: Classification, execution time and certified radii (if required) of each test point
+    '''
+    if params['certified_radius']:
+        return [
+            get_certified_classification(test_point, test_label, classifier, params)
+                for test_point, test_label in zip(test_points, test_labels)
+        ]
+    if not use_batches or len(test_points) == 0:
+        return [(*get_classification(test_point, classifier, params), None) for test_point in test_points]
+    block_labels, exec_time = get_batch_classification(test_points, classifier, params)
+    return [(most_voted_labels, exec_time / len(test_points), None) for most_voted_labels in block_labels]
+
+def init_worker(
+    classifier_type: Type[ConcreteClassifier | IntervalClassifier | RafClassifier],
+    training_set: Dataset,
+    params: Map[String, Any]
+) -> None:
+    '''
+    Fit the classifier of a worker process and store the input params
+    :param classifier_type: Type of the classifier to use
+    :param training_set: Training set, attached without copying it when shared
+    :param params: Input params needed to classify a point
+    '''
+    global worker_classifier, worker_params
+    worker_classifier = classifier_type()
+    if classifier_type == ConcreteClassifier:
+        worker_classifier.fit(training_set)
+    else:
+        worker_classifier.fit(training_set, params['pruning'])
+        set_categorical_blocks(worker_classifier, params)
+    worker_classifier.set_log(write_log)
+    worker_params = {**params, 'training_set': training_set}
+
+def classify_worker_block(
+    task: Tuple[Vector[Vector[Real]], Vector[Literal], Boolean]
+) -> Vector[Tuple[Map[Integer, Set[Literal]], Real, Map[Integer, Real] | None]]:
+    '''
+    Classify a block of test points in a worker process
+    :param task: Target test points, their labels and whether they can be classified at once
+    :return: Classification, execution time and certified radii (if required) of each test point
+    '''
+    test_points, test_labels, use_batches = task
+    return classify_block(test_points, test_labels, worker_classifier, worker_params, use_batches)
 
-    print('\nThe results have been saved in \'{}\'\n'.format(results_dir_path))
+def merge_block_results(
+    block: Vector[Tuple[Vector[Real], Literal, Map[Integer, Set[Literal]] | None]],
+    results: Iterator[Tuple[Map[Integer, Set[Literal]], Real, Map[Integer, Real] | None]]
+) -> Iterator[Tuple[Literal, Map[Integer, Set[Literal]], Real, Map[Integer, Real] | None]]:
+    '''
+    Merge, in order, the classifications reused for a block with the ones computed for its other points
+    :param block: Test points of the block, with their labels and reused classifications (None if not available)
+    :param results: Classification, execution time and certified radii of each test point without a reused classification
+    :return: Label, classification, execution time and certified radii of each test point of the block
+    '''
+    results = iter(results)
+    for _, test_label, reused_labels in block:
+        if reused_labels is not None:
+            yield test_label, reused_labels, 0.0, None
+        else:
+            yield (test_label, *next(results))
 
-def perform_abstract_classification(
+def classify_test_set(
+    classifier: ConcreteClassifier | IntervalClassifier | RafClassifier,
+    concrete_classifier: ConcreteClassifier | None,
     params: Map[String, Any],
-    results_dir_path: String
+    start: Integer = 0,
+    reused: Vector[Map[Integer, Set[Literal]] | None] | None = None
+) -> Iterator[Tuple[Literal, Map[Integer, Set[Literal]], Real, Map[Integer, Real] | None]]:
+    '''
+    Classify the test points in order, in blocks when the perturbation allows it
+    and across a pool of worker processes when more than one worker is required
+    :param classifier: Classifier to use
+    :param concrete_classifier: Concrete classifier used to skip ties (if required)
+    :param params: Input params
+    :param start: Number of selected test points already verified, which are skipped
+    :param reused: Classification to reuse for each selected test point (None if it must be computed)
+    :return: Label, classification, execution time and certified radii (if required) of each classified test point
+    '''
+    use_batches = batch_size > 1 and params['perturbation'].num_adv_regions() == 1 and not params['certified_radius']
+
+    blocks = select_blocks(concrete_classifier, params, start, reused)
+    first_block = next(blocks, None)
+    if first_block is None:
+        return
+    blocks = chain([first_block], blocks)
+
+    if workers == 1:
+        for block in blocks:
+            test_points = [point for point, _, reused_labels in block if reused_labels is None]
+            test_labels = [label for _, label, reused_labels in block if reused_labels is None]
+            if use_batches:
+                results = classify_block(test_points, test_labels, classifier, params, use_batches)
+            else:
+                results = (
+                    classify_block([point], [label], classifier, params, use_batches)[0]
+                        for point, label in zip(test_points, test_labels)
+                )
+            yield from merge_block_results(block, results)
+        return
+
+    # workers attach to the training set in shared memory instead of receiving a copy of it
+    shared_training_set = SharedDataset.create(params['training_set'])
+    worker_params = {
+        key: params[key] for key in ['perturbation', 'k_values', 'distance_metric', 'pruning', 'certified_radius', 'radius_precision']
+    }
+    try:
+        with Pool(workers, initializer=init_worker, initargs=(type(classifier), shared_training_set, worker_params)) as pool:
+            # pool.imap would read the whole test set ahead of the workers, hence at most two blocks per worker are submitted
+            # before the results of the oldest one are written
+            submitted = deque()
+            for block in blocks:
+                task = (
+                    [point for point, _, reused_labels in block if reused_labels is None],
+                    [label for _, label, reused_labels in block if reused_labels is None],
+                    use_batches
+                )
+                submitted.append((block, pool.apply_async(classify_worker_block, (task,))))
+                if len(submitted) == 2 * workers:
+                    block, results = submitted.popleft()
+                    yield from merge_block_results(block, results.get())
+            while len(submitted) > 0:
+                block, results = submitted.popleft()
+                yield from merge_block_results(block, results.get())
+    finally:
+        shared_training_set.release()
+
+def write_results(
+    classifier: ConcreteClassifier | IntervalClassifier | RafClassifier,
+    concrete_classifier: ConcreteClassifier | None,
+    params: Map[String, Any],
+    results_dir_path: String,
+    abstract: Boolean,
+    reused: Vector[Map[Integer, Set[Literal]] | None] | None = None
 ) -> None:
     '''
-    Main program for abstract classification
+    Stream the classifications of the test points to the results files, showing the progress
+    (when resuming, the points verified before the last checkpoint are skipped)
+    :param classifier: Classifier to use
+    :param concrete_classifier: Concrete classifier used to skip ties (if required)
     :param params: Input params
     :param results_dir_path: Directory for the results
+    :param abstract: Whether the classifications come from an abstract classifier
+    :param reused: Classification to reuse for each selected test point (None if it must be computed)
     '''
-    details = []
-    stable_yes_cnt = []
-    stable_do_not_know_cnt = []
-    robust_yes_cnt = []
-    robust_no_cnt = []
-    robust_do_not_know_cnt = []
-    runtime = 0
-
-    for _ in params['k_values']:
-        details.append(
-            DataFrame({
-                'Robust': [],
-                'Stable': [],
-                'Classification': []
-            })
-        )
-        stable_yes_cnt.append(0)
-        stable_do_not_know_cnt.append(0)
-        robust_yes_cnt.append(0)
-        robust_no_cnt.append(0)
-        robust_do_not_know_cnt.append(0)
-
-    abstract_classifier = IntervalClassifier()
-    if params['abstraction'] == 'raf':
-        abstract_classifier = RafClassifier()
-    abstract_classifier.fit(params['training_set'])
-    abstract_classifier.set_log(write_log)
-
-    if params['skip_ties']:
-        concrete_classifier = ConcreteClassifier()
-        concrete_classifier.fit(params['training_set'])
-
-    classified_points = 0
+    results_writer = ResultsWriter(
+        results_dir_path,
+        params['k_values'],
+        abstract,
+        resume=resume,
+        certified_radius=params['certified_radius']
+    )
+    classifications = classify_test_set(
+        classifier,
+        concrete_classifier,
+        params,
+        results_writer.get_classified_points(),
+        reused
+    )
 
     progress_bar = tqdm(
-        zip(params['test_set'].get_points(), params['test_set'].get_labels()),
+        initial=results_writer.get_classified_points(),
         total=params['num_test'],
         bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}{postfix}]',
         desc='Verifying',
         postfix='ROB=?%, STAB=?%'
     )
 
-    for i, (test_point, test_label) in enumerate(progress_bar):
-        if classified_points == params['num_test']:
-            break
-
-        if params['skip_ties']:
-            for labels in concrete_classifier.classify(test_point, params['k_values'], params['distance_metric']).values():
-                if len(labels) > 1:
-                    break
-            else:
-                break
-            continue
-
-        most_voted_labels, exec_time = get_classification(test_point, abstract_classifier, params)
-        runtime += exec_time
-        classified_points += 1
-
-        for j, (k, labels) in enumerate(most_voted_labels.items()):
-            if len(labels) == 1:
-                is_stable = 'Yes'
-                stable_yes_cnt[j] += 1
-                if test_label in labels:
-                    is_robust = 'Yes'
-                    robust_yes_cnt[j] += 1
-                else:
-                    is_robust = 'No'
-                    robust_no_cnt[j] += 1
-            else:
-                is_stable = 'Do not know'
-                stable_do_not_know_cnt[j] += 1
-                if test_label in labels:
-                    is_robust = 'Do not know' 
-                    robust_do_not_know_cnt[j] += 1
-                else:
-                    is_robust = 'No'
-                    robust_no_cnt[j] += 1
-
-            details[j].loc[len(details[j].index)] = [is_robust, is_stable, labels]
+    for test_label, most_voted_labels, exec_time, radii in classifications:
+        results_writer.add(test_label, most_voted_labels, exec_time, radii)
 
+        progress_bar.update()
         progress_bar.set_postfix_str('ROB={}%, STAB={}%'.format(
-            round(sum(robust_yes_cnt) / (classified_points * len(params['k_values'])) * 100, 1),
-            round(sum(stable_yes_cnt) / (classified_points * len(params['k_values'])) * 100, 1)
+            round(results_writer.get_robustness(), 1),
+            round(results_writer.get_stability(), 1)
         ))
 
-        if classified_points == params['num_test'] or i + 1 == params['test_set'].num_points():
-            progress_bar.set_description('Completed')
-
-    for i, k in enumerate(params['k_values']):
-        if not exists(join(results_dir_path, 'k{}'.format(k))):
-            makedirs(join(results_dir_path, 'k{}'.format(k)))
-
-        details[i].to_csv(join(results_dir_path, 'k{}'.format(k), 'details.csv'))
-
-        robustness = DataFrame({
-            '# Yes' : [robust_yes_cnt[i]],
-            '# No': [robust_no_cnt[i]],
-            '# Do not know': [robust_do_not_know_cnt[i]],
-            'Proved Robustness': ['{}%'.format(
-                round(robust_yes_cnt[i] / classified_points * 100, 1)
-                    if classified_points > 0 else '-'
-            )]
-        })
-        robustness.to_csv(join(results_dir_path, 'k{}'.format(k), 'robustness.csv'))
-
-        stability = DataFrame({
-            '# Yes' : [stable_yes_cnt[i]],
-            '# Do not know': [stable_do_not_know_cnt[i]],
-            'Proved Stability': ['{}%'.format(round(
-                stable_yes_cnt[i] / classified_points * 100, 1)
-                    if classified_points > 0 else '-'
-            )]
-        })
-        stability.to_csv(join(results_dir_path, 'k{}'.format(k), 'stability.csv'))
+    # fewer than num_test points are verified when ties are skipped
+    progress_bar.set_description('Completed')
+    progress_bar.close()
+    results_writer.close()
 
     with open(join(results_dir_path, 'runtime.txt'), 'w') as file:
-        file.write('{} seconds'.format(round(runtime)))
+        file.write('{} seconds'.format(round(results_writer.get_runtime())))
 
     print('\nThe results have been saved in \'{}\'\n'.format(results_dir_path))
 
+def perform_concrete_classification(
+    params: Map[String, Any],
+    results_dir_path: String
+) -> None:
+    '''
+    Main program for concrete classification
+    :param params: Input params
+    :param results_dir_path: Directory for the results
+    '''
+    concrete_classifier = get_fitted_classifier(ConcreteClassifier, params)
+    concrete_classifier.set_log(write_log)
+
+    write_results(
+        concrete_classifier,
+        concrete_classifier,
+        params,
+        results_dir_path,
+        abstract=False
+    )
+
+def perform_abstract_classification(
+    params: Map[String, Any],
+    results_dir_path: String
+) -> None:
+    '''
+    Main program for abstract classification
+    :param params: Input params
+    :param results_dir_path: Directory for the results
+    '''
+    abstract_classifier = get_fitted_classifier(
+        RafClassifier if params['abstraction'] == 'raf' else IntervalClassifier,
+        params
+    )
+    abstract_classifier.set_log(write_log)
+    set_categorical_blocks(abstract_classifier, params)
+
+    concrete_classifier = None
+    if params['skip_ties']:
+        concrete_classifier = get_fitted_classifier(ConcreteClassifier, params)
+        # as when it was created for every configuration, the classifier used to skip ties turns the logs off
+        concrete_classifier.set_log(False)
+
+    if params['sweep_epsilons'] is None:
+        write_results(
+            abstract_classifier,
+            concrete_classifier,
+            params,
+            results_dir_path,
+            abstract=True
+        )
+        return
+
+    # a point stable at an epsilon is stable, with the same labels, at every smaller epsilon,
+    # so the sweep goes from the largest epsilon down and verifies only the points not yet stable for all k
+    reused = None
+    for epsilon in params['sweep_epsilons']:
+        print('Epsilon:\t {}'.format(epsilon))
+        epsilon_dir_path = join(results_dir_path, 'epsilon_{}'.format(epsilon))
+        perturbation = Linfinity(
+            epsilon,
+            params['perturbation'].get_feature_range(),
+            params['perturbation'].get_starting_index()
+        )
+
+        write_results(
+            abstract_classifier,
+            concrete_classifier,
+            {**params, 'perturbation': perturbation},
+            epsilon_dir_path,
+            abstract=True,
+            reused=reused
+        )
+
+        reused = [
+            most_voted_labels if all(len(labels) == 1 for labels in most_voted_labels.values()) else None
+                for most_voted_labels in read_classifications(epsilon_dir_path, params['k_values'])
+        ]
+
 def main(input_file_path: String) -> None:
     '''
     Main program
@@ -312,6 +558,9 @@ def main(input_file_path: String) -> None:
     '''
     params = read_params(input_file_path)
 
+    if resume and params['save_in'] == '':
+        Error('Attribute \'save_in\' in \'{}\' cannot be empty to resume a run'.format(input_file_path))
+
     results_dir_path = join(join(
         settings_parser.get('DEFAULT', 'results_dir'),
         params['save_in'] if params['save_in'] != '' else '{:%Y-%m-%d-%H-%M-%S}'.format(datetime.now())
@@ -320,10 +569,14 @@ def main(input_file_path: String) -> None:
     if not exists(results_dir_path):
         makedirs(results_dir_path)
 
-    with open(join(results_dir_path, 'config.ini'), 'w') as backup_input_file:
-        config_parser = ConfigParser()
-        config_parser.read(input_file_path)
-        config_parser.write(backup_input_file)
+    # a resumed run goes on with the configuration backed up by the interrupted one
+    if resume and exists(join(results_dir_path, 'config.ini')):
+        params = read_params(join(results_dir_path, 'config.ini'))
+    else:
+        with open(join(results_dir_path, 'config.ini'), 'w') as backup_input_file:
+            config_parser = ConfigParser()
+            config_parser.read(input_file_path)
+            config_parser.write(backup_input_file)
 
     if params['classifier'] == 'concrete':
         perform_concrete_classification(params, results_dir_path)
@@ -332,22 +585,27 @@ def main(input_file_path: String) -> None:
 
 
 # argv[1] = configuration file name
-# argv[2] = 'log'
+# argv[2:] = 'log' and/or 'resume'
 
 if __name__ == "__main__":
     if len(argv) < 2:
         Error('Missing input file name')
-    if len(argv) > 2:
-        if argv[2] == 'log':
+    for option in argv[2:]:
+        if option == 'log':
             write_log = True
+        elif option == 'resume':
+            resume = True
         else:
-            Error('Parameter \'{}\' not recognized. Expected value: \'log\''.format(argv[2]))
-    else:
-        write_log = False
+            Error('Parameter \'{}\' not recognized. Expected value: \'log\' or \'resume\''.format(option))
 
     settings_parser = ConfigParser()
     settings_parser.read('settings.ini')
 
+    batch_size = settings_parser.getint('DEFAULT', 'batch_size', fallback=1)
+    workers = settings_parser.getint('DEFAULT', 'workers', fallback=1)
+    if workers < 1:
+        Error('Setting \'workers\' in \'settings.ini\' can only be a positive integer other than 0')
+
     if not exists(settings_parser.get('DEFAULT', 'config_dir')):
         makedirs(settings_parser.get('DEFAULT', 'config_dir'))
 
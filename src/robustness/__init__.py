@@ -9,14 +9,20 @@
 #   ./base.py
 #   ./concrete_classifier.py
 #   ./dataset.py
+#   ./shared_dataset.py
+#   ./sparse_dataset.py
+#   ./streaming_dataset.py
 # =============================================================================
 
 from .base import Boolean, Integer, Literal, Map, Number, Set, String, Real, Vector
 from .dataset import Dataset
+from .shared_dataset import SharedDataset
+from .sparse_dataset import SparseDataset
+from .streaming_dataset import StreamingDataset
 from .concrete_classifier import ConcreteClassifier
 
 __all__ = [
     'Boolean', 'Integer', 'Literal', 'Map', 'Number', 'Real', 'Set', 'String', 'Vector',
-    'Dataset',
+    'Dataset', 'SharedDataset', 'SparseDataset', 'StreamingDataset',
     'ConcreteClassifier',
 ]
\ No newline at end of file
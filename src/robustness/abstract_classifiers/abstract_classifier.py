@@ -8,6 +8,9 @@
 # Dependencies:
 #   ../base.py
 #   ../dataset.py
+#   ../abstract_domains/interval.py
+#   ../utils/kd_tree.py
+#   ../utils/min_heap.py
 # =============================================================================
 
 from abc import abstractmethod
@@ -15,10 +18,14 @@ from configparser import ConfigParser
 from os import makedirs
 from os.path import exists, join
 from logging import basicConfig, getLogger
-from typing import Type
+from nptyping import NDArray
+from numpy import arange, eye, flatnonzero, inf, maximum, minimum, partition, unique, zeros
+from scipy.sparse import issparse
+from typing import Any, Callable, Tuple, Type
 
-from robustness import Dataset, Boolean, Integer, Literal, Map, Set, String, Vector
-from robustness.abstract_domains import AbstractDomain
+from robustness import Dataset, Boolean, Integer, Literal, Map, Real, Set, String, Vector
+from robustness.abstract_domains import AbstractDomain, Interval
+from robustness.utils import KDTree, MinHeap
 
 class AbstractClassifier:
     '''Represent an abstract k-NN classifier'''
@@ -59,14 +66,358 @@ class AbstractClassifier:
         '''
         return self.__training_set
 
+    def get_training_points(self) -> NDArray:
+        '''
+        Return the points of the training set as a matrix
+        :return: Stored training points, one per row
+        '''
+        return self.__training_points
+
     def fit(self,
-        training_set: Dataset
+        training_set: Dataset,
+        pruning: String = 'none'
     ) -> None:
         '''
         Fit the classifier from the training dataset
         :param trainig_set: Training set to fit
+        :param pruning: Strategy to discard the training points that cannot affect the classification
+            ('none', 'kd_tree' or 'quickselect')
         '''
+        if pruning != 'none' and pruning != 'kd_tree' and pruning != 'quickselect':
+            raise Exception('\nUnsupported pruning strategy')
+        if pruning == 'kd_tree' and issparse(training_set.get_matrix()):
+            raise Exception('\nThe KD-tree pruning requires dense training points')
+
         self.__training_set = training_set
+        self.__training_points = training_set.get_matrix()
+        self.__pruning = pruning
+        self.__index = KDTree(self.__training_points) if pruning == 'kd_tree' else None
+        self.__restriction = None
+        self.__last_candidates = None
+        self.set_categorical_blocks(None)
+
+    def set_categorical_blocks(self,
+        cat_indexes: Vector[Tuple[Integer, Integer]] | None,
+        numerical_from: Integer = 0
+    ) -> None:
+        '''
+        Declare that the next adversarial regions fix every feature before the numerical ones, the blocks of one-hot
+        features to one of their values (or to any of them, when they range in [0, 1]): the part of the distances due
+        to these features is then looked up in tables and the numerical part is accumulated once for each of its values
+        (only if the training points take values in {0, 1} along these features, so that this part is an exact integer)
+        :param cat_indexes: Blocks of one-hot features in the form [(from_index, num_values)], or None to compute
+            the distances as usual
+        :param numerical_from: Index of the first numerical feature
+        '''
+        self.__categorical_blocks = None
+        if cat_indexes is not None and not issparse(self.__training_points):
+            fixed_features = self.__training_points[:, :numerical_from]
+            if ((fixed_features == 0.0) | (fixed_features == 1.0)).all():
+                self.__categorical_blocks = [
+                    (from_index, num_values if num_values > 2 else 1) for from_index, num_values in cat_indexes
+                ]
+        self.__numerical_from = numerical_from
+        self.__block_tables = [{} for _ in self.__categorical_blocks or []]
+        self.__other_features_table = None
+        self.__accumulated = None
+
+    def get_numerical_from(self) -> Integer:
+        '''
+        Return the index of the first numerical feature, as declared with the categorical blocks
+        :return: Index of the first numerical feature
+        '''
+        return self.__numerical_from
+
+    def get_categorical_distances(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray
+    ) -> Tuple[NDArray, NDArray] | None:
+        '''
+        Return the bounds of the part of the distance of every training point due to the features before the numerical
+        ones, as the sum of one table lookup per block (a block ranging in [0, 1] takes the minimum and the maximum
+        over the tables of its values, since exactly one of its features is 1)
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :return: Lower and upper bound of that part of the distance of each training point
+            (None if no block is declared or if the region does not fix the features as declared)
+        '''
+        start = self.__numerical_from
+        if self.__categorical_blocks is None or self.__restriction is not None:
+            return None
+        fixed_lower_bounds, fixed_upper_bounds = lower_bounds[:start], upper_bounds[:start]
+        if not ((fixed_lower_bounds == 0.0) | (fixed_lower_bounds == 1.0)).all() or \
+            not ((fixed_upper_bounds == 0.0) | (fixed_upper_bounds == 1.0)).all():
+            return None
+
+        # along these features both metrics count the values that differ, so the sums of the tables are exact
+        in_block = zeros(start, dtype=bool)
+        lower_distances = zeros(self.__training_points.shape[0])
+        upper_distances = zeros(self.__training_points.shape[0])
+        for (from_index, width), tables in zip(self.__categorical_blocks, self.__block_tables):
+            in_block[from_index:from_index + width] = True
+            block_lower_bounds = fixed_lower_bounds[from_index:from_index + width]
+            if (block_lower_bounds == fixed_upper_bounds[from_index:from_index + width]).all():
+                all_values = [tuple(block_lower_bounds.tolist())]
+            elif not block_lower_bounds.any() and fixed_upper_bounds[from_index:from_index + width].all():
+                all_values = [tuple(values) for values in eye(width).tolist()] if width > 1 else [(1.0,), (0.0,)]
+            else:
+                return None
+            for values in all_values:
+                if values not in tables:
+                    tables[values] = (self.__training_points[:, from_index:from_index + width] != values).sum(axis=1)
+            lower_distances += tables[all_values[0]] if len(all_values) == 1 else \
+                minimum.reduce([tables[values] for values in all_values])
+            upper_distances += tables[all_values[0]] if len(all_values) == 1 else \
+                maximum.reduce([tables[values] for values in all_values])
+
+        # the features before the numerical ones that are not in a block keep the values of the test point
+        if (fixed_lower_bounds[~in_block] != fixed_upper_bounds[~in_block]).any():
+            return None
+        other_values = fixed_lower_bounds[~in_block].tobytes()
+        if self.__other_features_table is None or self.__other_features_table[0] != other_values:
+            self.__other_features_table = (
+                other_values,
+                (self.__training_points[:, :start][:, ~in_block] != fixed_lower_bounds[~in_block]).sum(axis=1)
+            )
+        lower_distances += self.__other_features_table[1]
+        upper_distances += self.__other_features_table[1]
+        return lower_distances, upper_distances
+
+    def get_accumulated_distances(self,
+        categorical_distances: NDArray,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        distance_metric: String,
+        accumulate: Callable[[Real], Any]
+    ) -> Vector[Tuple[NDArray, Any]]:
+        '''
+        Group the training points by the value of the part of their distance due to the features before the numerical
+        ones, with the distances accumulated from that value along the numerical features
+        (the distances accumulated from each value are kept while the numerical part of the region does not change)
+        :param categorical_distances: Value of that part of the distance of each training point
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :param accumulate: Function accumulating the distances of all the training points along the numerical
+            features of the region, from a value
+        :return: For each value, the training points that have it and the distances accumulated from it
+        '''
+        start = self.__numerical_from
+        numerical_key = (distance_metric, lower_bounds[start:].tobytes(), upper_bounds[start:].tobytes())
+        if self.__accumulated is None or self.__accumulated[0] != numerical_key:
+            self.__accumulated = (numerical_key, {})
+        accumulated = self.__accumulated[1]
+
+        groups = []
+        for value in unique(categorical_distances).tolist():
+            if value not in accumulated:
+                accumulated[value] = accumulate(value)
+            groups.append((categorical_distances == value, accumulated[value]))
+        return groups
+
+    def get_candidates_from_bounds(self,
+        lower_distances: NDArray,
+        upper_distances: NDArray,
+        k: Integer
+    ) -> Tuple[NDArray, Vector[Literal]]:
+        '''
+        Return the training points that can be among the k nearest to the adversarial region, or be compared with them,
+        from the bounds of the distances of all the training points
+        :param lower_distances: Lower bound of the distance of each training point
+        :param upper_distances: Upper bound of the distance of each training point
+        :param k: Maximum number of neighbors to consider
+        :return: Indexes of the candidate points (sorted) and their labels
+        '''
+        labels = self.get_training_set().get_labels()
+        if self.__pruning == 'none' or k >= self.__training_points.shape[0]:
+            self.__last_candidates = arange(self.__training_points.shape[0])
+            return self.__last_candidates, labels
+
+        kth_upper_distance = partition(upper_distances, k - 1)[k - 1]
+        threshold = self.__widen(upper_distances[lower_distances <= kth_upper_distance].max())
+        self.__last_candidates = flatnonzero(lower_distances <= threshold)
+        return self.__last_candidates, [labels[i] for i in self.__last_candidates]
+
+    def __widen(self,
+        threshold: Real
+    ) -> Real:
+        '''
+        Return a threshold that absorbs the rounding errors between the bounds used for pruning
+        and the ones of the abstract distances
+        :param threshold: Threshold on the distances
+        :return: Widened threshold
+        '''
+        return threshold + 1e-9 * (1.0 + abs(threshold))
+
+    def restrict_candidates(self,
+        indexes: NDArray | None
+    ) -> None:
+        '''
+        Restrict the candidates of the next classifications to some training points, which are then always pruned
+        (sound for any region contained in the one those candidates were computed for)
+        :param indexes: Indexes of the training points (sorted), or None to consider all of them again
+        '''
+        self.__restriction = indexes
+
+    def get_last_candidates(self) -> NDArray:
+        '''
+        Return the candidates of the last classification
+        :return: Indexes of the candidate training points (sorted)
+        '''
+        return self.__last_candidates
+
+    def get_candidates(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        k: Integer,
+        distance_metric: String
+    ) -> Tuple[NDArray, Vector[Literal]]:
+        '''
+        Return the training points that can be among the k nearest to the adversarial region, or be compared with them
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param k: Maximum number of neighbors to consider
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: The candidate points, one per row, and their labels (in training set order)
+        '''
+        # sparse points are always pruned with their cheap bounds, so that only the candidates are densified
+        all_points = self.__pruning == 'none' and not issparse(self.__training_points)
+        if self.__restriction is None and (all_points or k >= self.__training_points.shape[0]):
+            self.__last_candidates = arange(self.__training_points.shape[0])
+            return self.__training_points, self.get_training_set().get_labels()
+
+        def get_bounds(indexes: NDArray) -> Tuple[NDArray, NDArray]:
+            return self.get_distance_bounds(lower_bounds, upper_bounds, self.__training_points[indexes], distance_metric)
+
+        def get_node_lower_bound(node_lower_bounds: NDArray, node_upper_bounds: NDArray) -> Real:
+            return self.get_box_lower_bound(lower_bounds, upper_bounds, node_lower_bounds, node_upper_bounds, distance_metric)
+
+        if self.__restriction is not None:
+            query_threshold = inf
+            indexes = self.__restriction
+            if k >= indexes.shape[0]:
+                self.__last_candidates = indexes
+                labels = self.get_training_set().get_labels()
+                return self.__training_points[indexes], [labels[i] for i in indexes]
+        elif self.__pruning == 'kd_tree':
+            # any k points bound the k-th smallest upper bound: take the ones closest to the region
+            _, nearby_upper_distances = get_bounds(self.__index.get_nearby(0.5 * (lower_bounds + upper_bounds), k))
+            query_threshold = self.__widen(partition(nearby_upper_distances, k - 1)[k - 1])
+            indexes = self.__index.query(get_node_lower_bound, query_threshold)
+        else:
+            query_threshold = inf
+            indexes = arange(self.__training_points.shape[0])
+        lower_distances, upper_distances = get_bounds(indexes)
+
+        # whatever the order of ties, every point among the k nearest has a lower bound not exceeding
+        # the k-th smallest upper bound, and every point beyond the largest of their upper bounds
+        # is strictly dominated by all of them, so it never changes the bounds of the labels
+        # (partition selects the k-th smallest upper bound in linear time)
+        kth_upper_distance = partition(upper_distances, k - 1)[k - 1]
+        threshold = self.__widen(upper_distances[lower_distances <= kth_upper_distance].max())
+        if threshold > query_threshold:
+            indexes = self.__index.query(get_node_lower_bound, threshold)
+            lower_distances, upper_distances = get_bounds(indexes)
+
+        indexes = indexes[lower_distances <= threshold]
+        self.__last_candidates = indexes
+        labels = self.get_training_set().get_labels()
+        return self.__training_points[indexes], [labels[i] for i in indexes]
+
+    def get_bounds_for_labels(self,
+        distances: MinHeap,
+        k_values: Vector[Integer],
+        get_range: Callable[[Type[AbstractDomain]], Tuple[Real, Real]] | None = None
+    ) -> Map[Integer, Map[Literal, Type[Interval]]]:
+        '''
+        Return the bounds of occurrence for the labels, for each k, in a single pass over the sorted distances:
+        the dominance between two distances is evaluated at most once, whatever the number of values of k
+        :param distances: Abstract distances of each candidate point to the adversarial region, paired with its label
+        :param k_values: Number of neighbors to consider (one or more values)
+        :param get_range: Function returning sound bounds of the values of a distance, used to skip the comparisons
+            whose outcome they already imply (None if not available)
+        :return: Bounds of occurrence for the labels, for each k
+        '''
+        size = distances.get_size()
+        classes = self.get_training_set().get_classes()
+        counts = {label: 0 for label in classes}
+
+        # for the i-th nearest: the first j at which the scan of the farther distances from a start not beyond it stops,
+        # and whether the i-th nearest is then certainly among the k nearest
+        certainly_stops = {}
+        # for the j-th nearest: how many of the nearest have been compared with it, whether one of them with a different
+        # label may be farther (possibly closer) and whether one of them at all may be farther (keep searching)
+        possibly_compared = {}
+
+        ranges = {}
+
+        def certainly_farther(i: Integer, j: Integer) -> Boolean:
+            # whether the j-th nearest strictly dominates the i-th one by a margin larger than any rounding error
+            if get_range is None:
+                return False
+            for n in [i, j]:
+                if n not in ranges:
+                    ranges[n] = get_range(distances.get_nth_smallest(n)[0])
+            (ith_lower, ith_upper), (jth_lower, jth_upper) = ranges[i], ranges[j]
+            return jth_lower - ith_upper > 1e-9 * (1.0 + abs(ith_lower) + abs(ith_upper) + abs(jth_lower) + abs(jth_upper))
+
+        def certainly_considered(i: Integer, start: Integer) -> Boolean:
+            stop, result = certainly_stops.get(i, (0, True))
+            if stop >= start:
+                return result
+            ith_distance, ith_label = distances.get_nth_smallest(i)
+            stop, result = size + 1, True
+            for j in range(start, size + 1):
+                jth_distance, jth_label = distances.get_nth_smallest(j)
+                if not certainly_farther(i, j) and not ith_distance.strictly_dominated_by(jth_distance):
+                    if ith_label != jth_label:
+                        stop, result = j, False
+                        break
+                else:
+                    stop = j
+                    break
+            certainly_stops[i] = (stop, result)
+            return result
+
+        def possibly_considered(j: Integer, k: Integer) -> Tuple[Boolean, Boolean]:
+            compared, possibly_closer, keep_searching = possibly_compared.get(j, (0, False, False))
+            if not possibly_closer and compared < k:
+                jth_distance, jth_label = distances.get_nth_smallest(j)
+                for i in range(compared + 1, k + 1):
+                    ith_distance, ith_label = distances.get_nth_smallest(i)
+                    if not certainly_farther(i, j) and not jth_distance.strictly_dominates(ith_distance):
+                        keep_searching = True
+                        if jth_label != ith_label:
+                            possibly_closer = True
+                            break
+                possibly_compared[j] = (k, possibly_closer, keep_searching)
+            return possibly_closer, keep_searching
+
+        bounds_for_k = {}
+        for k in sorted(Set(k_values)):
+            for i in range(sum(counts.values()) + 1, k + 1):
+                counts[distances.get_nth_smallest(i)[1]] += 1
+
+            bounds = {label: Interval(0, counts[label]) for label in classes}
+            for i in range(1, k + 1):
+                if certainly_considered(i, k + 1):
+                    bounds[distances.get_nth_smallest(i)[1]].lb += 1
+
+            uncertainty = k - sum(bounds[label].lb for label in classes)
+
+            if uncertainty > 0:
+                for j in range(k + 1, size + 1):
+                    possibly_closer, keep_searching = possibly_considered(j, k)
+                    if possibly_closer:
+                        jth_label = distances.get_nth_smallest(j)[1]
+                        if bounds[jth_label].ub - bounds[jth_label].lb < uncertainty:
+                            bounds[jth_label].ub += 1
+                    elif not keep_searching:
+                        break
+
+            bounds_for_k[k] = bounds
+
+        return {k: bounds_for_k[k] for k in k_values}
 
     def get_type(self) -> String:
         '''
@@ -75,6 +426,42 @@ class AbstractClassifier:
         '''
         return self.__class__.__name__
 
+    @abstractmethod
+    def get_distance_bounds(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        points: NDArray,
+        distance_metric: String
+    ) -> Tuple[NDArray, NDArray]:
+        '''
+        Compute cheap bounds of the abstract distances between the adversarial region and some points
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param points: Matrix whose rows are the points
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: Vectors holding the lower and the upper bound of the distance to each point
+        '''
+        pass
+
+    @abstractmethod
+    def get_box_lower_bound(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        box_lower_bounds: NDArray,
+        box_upper_bounds: NDArray,
+        distance_metric: String
+    ) -> Real:
+        '''
+        Compute a lower bound of the abstract distance between the adversarial region and any point of a box
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param box_lower_bounds: Lower bounds of the box
+        :param box_upper_bounds: Upper bounds of the box
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: Lower bound of the distance
+        '''
+        pass
+
     @abstractmethod
     def classify(self,
         adv_region: Vector[Type[AbstractDomain]],
@@ -88,4 +475,63 @@ class AbstractClassifier:
         :param distance_metric: Metric to evaluate the abstract distance between two points
         :return: The most voted labels for each k
         '''
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def classify_bounds(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        k_values: Vector[Integer],
+        distance_metric: String = 'euclidean'
+    ) -> Map[Integer, Set[Literal]]:
+        '''
+        Perform the abstract classification of the adversarial region with the given bounds
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param k_values: Number of neighbors to consider (one or more values)
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: The most voted labels for each k
+        '''
+        pass
+
+    def compares_all_points(self) -> Boolean:
+        '''
+        Return whether every adversarial region is compared with all the training points, with no candidate
+        restriction, pruning or categorical lookup, so that the distances of a block of regions can be computed at once
+        :return: Whether all the training points are compared with every region
+        '''
+        return self.__restriction is None and self.__pruning == 'none' and self.__categorical_blocks is None
+
+    def log_region(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray
+    ) -> None:
+        '''
+        Log the adversarial region with the given bounds, as classify does
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        '''
+        if self.logger.getEffectiveLevel() == 0:
+            self.logger.info('- adversarial region: {}\n'.format([
+                Interval(lb, ub) if lb < ub else lb for lb, ub in zip(lower_bounds.tolist(), upper_bounds.tolist())
+            ]))
+
+    def classify_batch(self,
+        regions_lb: NDArray,
+        regions_ub: NDArray,
+        k_values: Vector[Integer],
+        distance_metric: String = 'euclidean'
+    ) -> Vector[Map[Integer, Set[Literal]]]:
+        '''
+        Perform the abstract classification of a block of adversarial regions
+        :param regions_lb: Lower bounds of the adversarial regions (one region per row)
+        :param regions_ub: Upper bounds of the adversarial regions (one region per row)
+        :param k_values: Number of neighbors to consider (one or more values)
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: The most voted labels for each k, for each adversarial region
+        '''
+        most_voted_labels = []
+        for lower_bounds, upper_bounds in zip(regions_lb, regions_ub):
+            self.log_region(lower_bounds, upper_bounds)
+            most_voted_labels.append(self.classify_bounds(lower_bounds, upper_bounds, k_values, distance_metric))
+        return most_voted_labels
\ No newline at end of file
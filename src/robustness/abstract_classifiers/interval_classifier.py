@@ -11,92 +11,104 @@
 #   ../dataset.py
 #   ../abstract_domains/interval.py
 #   ../utils/distances.py
-#   ../utils/min_heap.py
 # =============================================================================
 
 from __future__ import annotations
 from math import ceil
+from nptyping import NDArray
+from numpy import arange, argsort, bincount, cumsum, empty, full, inf, lexsort, maximum, minimum, newaxis, searchsorted, zeros
+from scipy.sparse import issparse
 from typing import Tuple, Type
 
 from .abstract_classifier import AbstractClassifier
-from robustness import Boolean, Integer, Literal, Map, Set, String, Vector
+from robustness import Integer, Literal, Map, Real, Set, String, Vector
 from robustness.abstract_domains import Interval
-from robustness.utils import compute_distance, MinHeap
+from robustness.utils import (
+    interval_block_distance_bounds, interval_box_lower_bound, interval_distance_bounds, sparse_interval_distance_bounds
+)
 
 class IntervalClassifier(AbstractClassifier):
     '''Represent an interval classifier'''
 
     def __compute_abstract_distances(self,
-        adv_region: Vector[Type[Interval]],
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        k: Integer,
         distance_metric: String
-    ) -> MinHeap:
+    ) -> Tuple[NDArray, NDArray, NDArray]:
         '''
-        Compute the abstract distance of each point in the training set to the adversarial region
-        :param adv_region: Target adversarial region
+        Compute the abstract distance of each candidate point in the training set to the adversarial region
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param k: Maximum number of neighbors to consider
         :param distance_metric: Metric to evaluate the distance between two points
-        :return: The distances in a min heap structure
-        '''
-        distances = []
-        for train_point, train_label in zip(self.get_training_set().get_points(), self.get_training_set().get_labels()):
-            distances.append((
-                compute_distance(adv_region, train_point, distance_metric, init=Interval(0, 0)),
-                train_label
-            ))
-        return MinHeap(distances)
-
-    def __get_bounds_for_labels(self,
-        distances: MinHeap,
-        k: Integer
-    ) -> Map[Literal, Type[Interval]]:
+        :return: Lower and upper bounds of the distances of the candidate points, and their indexes
         '''
-        Returns of occurrence for the labels
-        :param distances: Abstract distances of each point in the training set to the adversarial region
-        :param k: Number of neighbors to consider
-        :return: Bounds of occurrence for the labels
-        '''
-        def certainly_considered() -> Boolean:
-            for j in range (k + 1, distances.get_size() + 1):
-                jth_distance, jth_label = distances.get_nth_smallest(j)
-                if not ith_distance.strictly_dominated_by(jth_distance):
-                    if ith_label != jth_label:
-                        return False
-                else:
-                    break
-            return True
-        
-        def possibly_considered() -> Tuple[Boolean, Boolean]:
-            keep_searching = False
-            for i in range (k, 0, -1):
-                ith_distance, ith_label = distances.get_nth_smallest(i)
-                if not jth_distance.strictly_dominates(ith_distance):
-                    keep_searching = True
-                    if jth_label != ith_label:
-                        return True, keep_searching
-            return False, keep_searching
-
-        bounds = {label : Interval(0, 0) for label in self.get_training_set().get_classes()}
-        certainly_closer = 0
-
-        for i in range(1, k + 1):
-            ith_distance, ith_label = distances.get_nth_smallest(i)
-            bounds[ith_label].ub += 1
-            if certainly_considered():
-                bounds[ith_label].lb += 1
-                certainly_closer += 1
-
-        uncertainty = k - certainly_closer
-        
-        if uncertainty > 0:
-            for j in range(k + 1, distances.get_size() + 1):
-                jth_distance, jth_label = distances.get_nth_smallest(j)
-                possibly_closer, keep_searching = possibly_considered()
-                if possibly_closer:
-                    if bounds[jth_label].ub - bounds[jth_label].lb < uncertainty:
-                        bounds[jth_label].ub += 1
-                elif not keep_searching:
-                    break
-        
-        return bounds
+        categorical_distances = self.get_categorical_distances(lower_bounds, upper_bounds)
+        if categorical_distances is None:
+            points, _ = self.get_candidates(lower_bounds, upper_bounds, k, distance_metric)
+            lower_distances, upper_distances = interval_distance_bounds(lower_bounds, upper_bounds, points, distance_metric)
+            indexes = self.get_last_candidates()
+        else:
+            start = self.get_numerical_from()
+
+            def accumulate(init: Real) -> Tuple[NDArray, NDArray]:
+                return interval_distance_bounds(
+                    lower_bounds[start:], upper_bounds[start:], self.get_training_points()[:, start:], distance_metric, init
+                )
+
+            # the lower bounds are accumulated from the ones of the categorical part, and the upper bounds likewise
+            lower_distances = empty(self.get_training_points().shape[0])
+            upper_distances = empty(self.get_training_points().shape[0])
+            for group, (group_lower_distances, _) in self.get_accumulated_distances(
+                categorical_distances[0], lower_bounds, upper_bounds, distance_metric, accumulate
+            ):
+                lower_distances[group] = group_lower_distances[group]
+            for group, (_, group_upper_distances) in self.get_accumulated_distances(
+                categorical_distances[1], lower_bounds, upper_bounds, distance_metric, accumulate
+            ):
+                upper_distances[group] = group_upper_distances[group]
+            indexes, _ = self.get_candidates_from_bounds(lower_distances, upper_distances, k)
+            lower_distances, upper_distances = lower_distances[indexes], upper_distances[indexes]
+
+        return lower_distances, upper_distances, indexes
+
+    def get_distance_bounds(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        points: NDArray,
+        distance_metric: String
+    ) -> Tuple[NDArray, NDArray]:
+        '''
+        Compute the bounds of the interval distances between the adversarial region and some points
+        (for sparse points, wider bounds computed on the stored features only)
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param points: Matrix (dense or sparse) whose rows are the points
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: Vectors holding the lower and the upper bound of the distance to each point
+        '''
+        if issparse(points):
+            return sparse_interval_distance_bounds(lower_bounds, upper_bounds, points, distance_metric)
+        return interval_distance_bounds(lower_bounds, upper_bounds, points, distance_metric)
+
+    def get_box_lower_bound(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        box_lower_bounds: NDArray,
+        box_upper_bounds: NDArray,
+        distance_metric: String
+    ) -> Real:
+        '''
+        Compute a lower bound of the interval distance between the adversarial region and any point of a box
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param box_lower_bounds: Lower bounds of the box
+        :param box_upper_bounds: Upper bounds of the box
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: Lower bound of the distance
+        '''
+        return interval_box_lower_bound(lower_bounds, upper_bounds, box_lower_bounds, box_upper_bounds, distance_metric)
 
     def __get_most_voted_labels(self,
         bounds: Map[Literal, Type[Interval]],
@@ -133,6 +145,136 @@ class IntervalClassifier(AbstractClassifier):
     
         return winning_labels
 
+    def __get_considered(self,
+        lower_distances: NDArray,
+        upper_distances: NDArray,
+        max_k: Integer
+    ) -> Integer:
+        '''
+        Return how many of the sorted distances may not be strictly greater than all the max_k nearest
+        :param lower_distances: Lower bounds of the distances, sorted
+        :param upper_distances: Upper bounds of the distances, in the same order
+        :param max_k: Maximum number of neighbors to consider
+        :return: Number of distances of interest, the first ones
+        '''
+        return max(max_k, int(searchsorted(lower_distances, upper_distances[:max_k].max(), side='right')))
+
+    def get_bounds_for_labels(self,
+        lower_distances: NDArray,
+        upper_distances: NDArray,
+        codes: NDArray,
+        k_values: Vector[Integer]
+    ) -> Map[Integer, Map[Literal, Type[Interval]]]:
+        '''
+        Return the bounds of occurrence for the labels, for each k, from the sorted arrays of the lower and upper bounds
+        of the distances: the points overlapping an interval are found with a binary search and counted per label
+        with prefix sums, so that no pair of distances is compared
+        :param lower_distances: Lower bounds of the distances of the candidate points, sorted
+        :param upper_distances: Upper bounds of the distances of the candidate points, in the same order
+        :param codes: Label codes of the candidate points, in the same order
+        :param k_values: Number of neighbors to consider (one or more values)
+        :return: Bounds of occurrence for the labels, for each k
+        '''
+        classes = self.get_training_set().get_classes()
+        max_k = max(k_values)
+
+        # only the distances that may not be strictly greater than all the max_k nearest are of interest
+        size = self.__get_considered(lower_distances, upper_distances, max_k)
+        lower_bounds = lower_distances[:size]
+        upper_bounds = upper_distances[:size]
+        codes = codes[:size]
+        label_range = arange(len(classes))
+        counts = zeros((size + 1, len(classes)), dtype=int)
+        counts[1:] = cumsum(codes[:, newaxis] == label_range, axis=0)
+
+        # number of distances that are not strictly greater than each of the max_k nearest
+        overlapping = searchsorted(lower_bounds, upper_bounds[:max_k], side='right')
+
+        results = {}
+        for k in sorted(Set(k_values)):
+            k_codes = codes[:k]
+            k_overlapping = overlapping[:k]
+            # the i-th nearest is certainly among the k nearest if every distance that may be lower has its label
+            certain = (k_overlapping <= k) | (
+                counts[k_overlapping, k_codes] - counts[k, k_codes] == k_overlapping - k
+            )
+            lbs = bincount(k_codes[certain], minlength=len(classes))
+            ubs = counts[k].copy()
+            uncertainty = k - int(certain.sum())
+
+            if uncertainty > 0:
+                # a farther point may replace one of the k nearest that has another label and is not strictly lower
+                label_upper_bounds = full(len(classes), -inf)
+                maximum.at(label_upper_bounds, k_codes, upper_bounds[:k])
+                order = argsort(label_upper_bounds)
+                other_upper_bounds = full(len(classes), label_upper_bounds[order[-1]])
+                if len(classes) > 1:
+                    other_upper_bounds[order[-1]] = label_upper_bounds[order[-2]]
+                else:
+                    other_upper_bounds[order[-1]] = -inf
+                ends = minimum(
+                    searchsorted(lower_bounds, other_upper_bounds, side='right'),
+                    searchsorted(lower_bounds, upper_bounds[:k].max(), side='right')
+                )
+                replacing = maximum(counts[maximum(ends, k), label_range] - counts[k], 0)
+                ubs += minimum(replacing, maximum(0, lbs + uncertainty - ubs))
+
+            results[k] = {classes[code]: Interval(int(lbs[code]), int(ubs[code])) for code in label_range}
+
+        return {k: results[k] for k in k_values}
+
+    def __classify_distances(self,
+        lower_distances: NDArray,
+        upper_distances: NDArray,
+        indexes: NDArray,
+        k_values: Vector[Integer]
+    ) -> Map[Integer, Set[Literal]]:
+        '''
+        Return the most voted labels from the abstract distances of the candidate points
+        :param lower_distances: Lower bounds of the distances of the candidate points
+        :param upper_distances: Upper bounds of the distances of the candidate points
+        :param indexes: Indexes of the candidate points in the training set
+        :param k_values: Number of neighbors to consider (one or more values)
+        :return: The most voted labels for each k
+        '''
+        # the same order as the one of the pairs of Interval and label in a min heap
+        codes = self.get_training_set().get_label_codes()[indexes]
+        order = lexsort((codes, upper_distances, lower_distances))
+        lower_distances, upper_distances, codes = lower_distances[order], upper_distances[order], codes[order]
+
+        most_voted_labels = {}
+        for k, bounds in self.get_bounds_for_labels(lower_distances, upper_distances, codes, k_values).items():
+            most_voted_labels[k] = self.__get_most_voted_labels(bounds, k)
+            self.logger.info('\tk = {} -> bounds: {} -> winning: {}'.format(k, bounds, most_voted_labels[k]))
+
+        self.logger.info('\n\tdistances:')
+        if self.logger.getEffectiveLevel() == 0:
+            classes = self.get_training_set().get_classes()
+            for i in range(self.__get_considered(lower_distances, upper_distances, max(k_values))):
+                self.logger.info('\t\t{}: {}'.format(classes[codes[i]], Interval(lower_distances[i], upper_distances[i])))
+        self.logger.info('\n')
+
+        return most_voted_labels
+
+    def classify_bounds(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        k_values: Vector[Integer],
+        distance_metric: String = 'euclidean'
+    ) -> Map[Integer, Set[Literal]]:
+        '''
+        Perform the abstract classification of the adversarial region with the given bounds
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param k_values: Number of neighbors to consider (one or more values)
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: The most voted labels for each k
+        '''
+        lower_distances, upper_distances, indexes = self.__compute_abstract_distances(
+            lower_bounds, upper_bounds, max(k_values), distance_metric
+        )
+        return self.__classify_distances(lower_distances, upper_distances, indexes, k_values)
+
     def classify(self,
         adv_region: Vector[Type[Interval]],
         k_values: Vector[Integer],
@@ -147,18 +289,39 @@ class IntervalClassifier(AbstractClassifier):
         '''        
         self.logger.info('- adversarial region: {}\n'.format(adv_region))
         
-        distances = self.__compute_abstract_distances(adv_region, distance_metric)
+        lower_bounds, upper_bounds = Interval.get_bounds(adv_region)
+        return self.classify_bounds(lower_bounds, upper_bounds, k_values, distance_metric)
 
-        most_voted_labels = {}
-        for k in k_values:
-            bounds = self.__get_bounds_for_labels(distances, k)
-            most_voted_labels[k] = self.__get_most_voted_labels(bounds, k)
-            self.logger.info('\tk = {} -> bounds: {} -> winning: {}'.format(k, bounds, most_voted_labels[k]))
+    def classify_batch(self,
+        regions_lb: NDArray,
+        regions_ub: NDArray,
+        k_values: Vector[Integer],
+        distance_metric: String = 'euclidean'
+    ) -> Vector[Map[Integer, Set[Literal]]]:
+        '''
+        Perform the abstract classification of a block of adversarial regions: when all the training points are
+        compared with every region, the bounds of the distances of the whole block are computed at once
+        :param regions_lb: Lower bounds of the adversarial regions (one region per row)
+        :param regions_ub: Upper bounds of the adversarial regions (one region per row)
+        :param k_values: Number of neighbors to consider (one or more values)
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: The most voted labels for each k, for each adversarial region
+        '''
+        if not self.compares_all_points() or issparse(self.get_training_points()):
+            return super().classify_batch(regions_lb, regions_ub, k_values, distance_metric)
 
-        self.logger.info('\n\tdistances:')
-        if self.logger.getEffectiveLevel() == 0:
-            for distance, label in distances.get_items_ordered_so_far():
-                self.logger.info('\t\t{}: {}'.format(label, distance))
-        self.logger.info('\n')
+        indexes = arange(self.get_training_points().shape[0])
+        # the regions are taken a few at a time, so that the matrices of the bounds hold at most about 2^22 distances
+        step = max(1, 2 ** 22 // max(1, indexes.shape[0]))
 
+        most_voted_labels = []
+        for start in range(0, regions_lb.shape[0], step):
+            block_lower_distances, block_upper_distances = interval_block_distance_bounds(
+                regions_lb[start:start + step], regions_ub[start:start + step], self.get_training_points(), distance_metric
+            )
+            for lower_bounds, upper_bounds, lower_distances, upper_distances in zip(
+                regions_lb[start:start + step], regions_ub[start:start + step], block_lower_distances, block_upper_distances
+            ):
+                self.log_region(lower_bounds, upper_bounds)
+                most_voted_labels.append(self.__classify_distances(lower_distances, upper_distances, indexes, k_values))
         return most_voted_labels
\ No newline at end of file
@@ -10,86 +10,118 @@
 #   ../base.py
 #   ../dataset.py
 #   ../abstract_domains/raf.py
+#   ../abstract_domains/raf_batch.py
 #   ../utils/distances.py
 #   ../utils/min_heap.py
 # =============================================================================
 
 from __future__ import annotations
 from math import ceil
-import numbers
+from nptyping import NDArray
+from numpy import empty
 from typing import Tuple, Type
 
 from .abstract_classifier import AbstractClassifier
-from robustness import Boolean, Integer, Literal, Map, Set, String, Vector
-from robustness.abstract_domains import Interval, Raf
-from robustness.utils import compute_distance, MinHeap
+from robustness import Integer, Literal, Map, Number, Real, Set, String, Vector
+from robustness.abstract_domains import Interval, Raf, RafBatch
+from robustness.utils import MinHeap, raf_box_lower_bound, raf_distance_bounds
 
 class RafClassifier(AbstractClassifier):
     def __compute_abstract_distances(self,
-        adv_region: Vector[Type[Raf]],
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        k: Integer,
         distance_metric: String
     ) -> MinHeap:
-        distances = []
-        for train_point, train_label in zip(self.get_training_set().get_points(), self.get_training_set().get_labels()):
-            distances.append((
-                compute_distance(adv_region, train_point, distance_metric, init=Raf(center=0, noise=0, linear=None, dimensions=len(train_point))),
-                train_label
-            ))
-        return MinHeap(distances)
-
-    def __get_bounds_for_labels(self,
-        distances: MinHeap,
-        k: Integer
-    ) -> Map[Literal, Type[Raf]]:
         '''
-        Returns of occurrence for the labels
-        :param distances: Abstract distances of each point in the training set to the adversarial region
-        :param k: Number of neighbors to consider
-        :return: Bounds of occurrence for the labels
+        Compute the abstract distances between the adversarial region and every candidate point in the training set
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param k: Maximum number of neighbors to consider
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: Abstract distances, paired with the label of the corresponding training point
         '''
-        def certainly_considered() -> Boolean:
-            for j in range (k + 1, distances.get_size() + 1):
-                jth_distance, jth_label = distances.get_nth_smallest(j)
-                if not ith_distance.strictly_dominated_by(jth_distance):
-                    if ith_label != jth_label:
-                        return False
-                else:
-                    break
-            return True
-        
-        def possibly_considered() -> Tuple[Boolean, Boolean]:
-            keep_searching = False
-            for i in range (k, 0, -1):
-                ith_distance, ith_label = distances.get_nth_smallest(i)
-                if not jth_distance.strictly_dominates(ith_distance):
-                    keep_searching = True
-                    if jth_label != ith_label:
-                        return True, keep_searching
-            return False, keep_searching
-
-        bounds = {label : Interval(0, 0) for label in self.get_training_set().get_classes()}
-        certainly_closer = 0
-
-        for i in range(1, k + 1):
-            ith_distance, ith_label = distances.get_nth_smallest(i)
-            bounds[ith_label].ub += 1
-            if certainly_considered():
-                bounds[ith_label].lb += 1
-                certainly_closer += 1
-
-        uncertainty = k - certainly_closer
-        
-        if uncertainty > 0:
-            for j in range(k + 1, distances.get_size() + 1):
-                jth_distance, jth_label = distances.get_nth_smallest(j)
-                possibly_closer, keep_searching = possibly_considered()
-                if possibly_closer:
-                    if bounds[jth_label].ub - bounds[jth_label].lb < uncertainty:
-                        bounds[jth_label].ub += 1
-                elif not keep_searching:
-                    break
-        
-        return bounds
+        if distance_metric != 'manhattan' and distance_metric != 'euclidean':
+            raise Exception('\nUnsupported distance metric')
+
+        centers = 0.5 * (lower_bounds + upper_bounds)
+        radii = 0.5 * (upper_bounds - lower_bounds)
+
+        def accumulate(points: NDArray, start: Integer = 0, init: Real = 0.0) -> RafBatch:
+            # features are accumulated in order, as done by the RAF arithmetic
+            distances = RafBatch.zeros(points.shape[0], points.shape[1])
+            distances.centers = distances.centers + init
+            for i in range(start, points.shape[1]):
+                difference = RafBatch.single(centers[i] - points[:, i], radii[i], i, points.shape[1])
+                distances += difference.square() if distance_metric == 'euclidean' else abs(difference)
+            return distances
+
+        categorical_distances = self.get_categorical_distances(lower_bounds, upper_bounds)
+        if categorical_distances is None:
+            points, labels = self.get_candidates(lower_bounds, upper_bounds, k, distance_metric)
+            distances = accumulate(points)
+            return MinHeap([(distances[i], label) for i, label in enumerate(labels)])
+
+        # the distances from the values of the categorical part only differ by their centers, so the linear
+        # coefficients and the noise of the last ones accumulated (for the same region of the noise) are shared
+        def accumulate_centers(init: Real) -> NDArray:
+            distances = accumulate(self.get_training_points(), self.get_numerical_from(), init)
+            self.__numerical_terms = (distances.linear, distances.noise)
+            return distances.centers
+
+        # when the categorical part is not exact, its radius is an additional noise
+        lower_categorical_distances, upper_categorical_distances = categorical_distances
+        groups = self.get_accumulated_distances(
+            0.5 * (lower_categorical_distances + upper_categorical_distances),
+            lower_bounds,
+            upper_bounds,
+            distance_metric,
+            accumulate_centers
+        )
+        linear, noise = self.__numerical_terms
+        distances = RafBatch(
+            empty(self.get_training_points().shape[0]),
+            linear,
+            noise + 0.5 * (upper_categorical_distances - lower_categorical_distances)
+        )
+        for group, group_centers in groups:
+            distances.centers[group] = group_centers[group]
+        indexes, labels = self.get_candidates_from_bounds(distances.lowerbound(), distances.upperbound(), k)
+        return MinHeap([(distances[i], label) for i, label in zip(indexes.tolist(), labels)])
+
+    def get_distance_bounds(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        points: NDArray,
+        distance_metric: String
+    ) -> Tuple[NDArray, NDArray]:
+        '''
+        Compute the bounds of the RAF distances between the adversarial region and some points
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param points: Matrix whose rows are the points
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: Vectors holding the lower and the upper bound of the distance to each point
+        '''
+        return raf_distance_bounds(lower_bounds, upper_bounds, points, distance_metric)
+
+    def get_box_lower_bound(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
+        box_lower_bounds: NDArray,
+        box_upper_bounds: NDArray,
+        distance_metric: String
+    ) -> Real:
+        '''
+        Compute a lower bound of the RAF distance between the adversarial region and any point of a box
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
+        :param box_lower_bounds: Lower bounds of the box
+        :param box_upper_bounds: Upper bounds of the box
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: Lower bound of the distance
+        '''
+        return raf_box_lower_bound(lower_bounds, upper_bounds, box_lower_bounds, box_upper_bounds, distance_metric)
 
     def __get_most_voted_labels(self,
         bounds: Map[Literal, Type[Raf]],
@@ -126,38 +158,24 @@ class RafClassifier(AbstractClassifier):
     
         return winning_labels
 
-    def classify(self,
-        adv_region: Vector[Type[Raf]],
+    def classify_bounds(self,
+        lower_bounds: NDArray,
+        upper_bounds: NDArray,
         k_values: Vector[Integer],
         distance_metric: String = 'euclidean'
     ) -> Map[Integer, Set[Literal]]:
         '''
-        Perform the abstract classification
-        :param adv_region: Target adversarial region
+        Perform the abstract classification of the adversarial region with the given bounds
+        :param lower_bounds: Lower bounds of the adversarial region
+        :param upper_bounds: Upper bounds of the adversarial region
         :param k_values: Number of neighbors to consider (one or more values)
         :param distance_metric: Metric to evaluate the abstract distance between two points
         :return: The most voted labels for each k
-        '''        
-        self.logger.info('- adversarial region: {}\n'.format(adv_region))
-        
-        raf_adv_region = []
-        for i in range(0, len(adv_region)):
-            box = adv_region[i]
-            if isinstance(box, numbers.Number):
-                c = box
-                a = 0.0
-            else:
-                c = 0.5 * (box.lb + box.ub)
-                a = 0.5 * (box.ub - box.lb)
-            raf = Raf(c, None, 0, len(adv_region))
-            raf.linear[i] = a
-            raf.single_variable = i
-            raf_adv_region.append(raf)
-        distances = self.__compute_abstract_distances(raf_adv_region, distance_metric)
+        '''
+        distances = self.__compute_abstract_distances(lower_bounds, upper_bounds, max(k_values), distance_metric)
 
         most_voted_labels = {}
-        for k in k_values:
-            bounds = self.__get_bounds_for_labels(distances, k)
+        for k, bounds in self.get_bounds_for_labels(distances, k_values, Raf.get_range).items():
             most_voted_labels[k] = self.__get_most_voted_labels(bounds, k)
             self.logger.info('\tk = {} -> bounds: {} -> winning: {}'.format(k, bounds, most_voted_labels[k]))
 
@@ -167,4 +185,21 @@ class RafClassifier(AbstractClassifier):
                 self.logger.info('\t\t{}: {}'.format(label, distance))
         self.logger.info('\n')
 
-        return most_voted_labels
\ No newline at end of file
+        return most_voted_labels
+
+    def classify(self,
+        adv_region: Vector[Type[Interval] | Number],
+        k_values: Vector[Integer],
+        distance_metric: String = 'euclidean'
+    ) -> Map[Integer, Set[Literal]]:
+        '''
+        Perform the abstract classification
+        :param adv_region: Target adversarial region
+        :param k_values: Number of neighbors to consider (one or more values)
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: The most voted labels for each k
+        '''        
+        self.logger.info('- adversarial region: {}\n'.format(adv_region))
+        
+        lower_bounds, upper_bounds = Interval.get_bounds(adv_region)
+        return self.classify_bounds(lower_bounds, upper_bounds, k_values, distance_metric)
\ No newline at end of file
@@ -8,14 +8,18 @@
 # Dependencies:
 #   ./abstract_domain.py
 #   ./interval.py
+#   ./raf.py
+#   ./raf_batch.py
 # =============================================================================
 
 from .abstract_domain import AbstractDomain
 from .interval import Interval
 from .raf import Raf
+from .raf_batch import RafBatch
 
 __all__ = [
     'AbstractDomain',
     'Interval',
-    'Raf'
+    'Raf',
+    'RafBatch'
 ]
\ No newline at end of file
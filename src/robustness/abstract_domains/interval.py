@@ -11,7 +11,9 @@
 # =============================================================================
 
 from __future__ import annotations
-from typing import Type
+from nptyping import NDArray
+from numpy import array
+from typing import Tuple, Type
 
 from robustness.base import Vector
 
@@ -70,6 +72,19 @@ class Interval(AbstractDomain):
 
         return Interval(min(interval1.lb, interval2.lb), max(interval1.ub, interval2.ub))
 
+    @staticmethod
+    def get_bounds(
+        region: Vector[Type[Interval] | Number]
+    ) -> Tuple[NDArray, NDArray]:
+        '''
+        Return the lower and upper bounds of a vector of intervals and numbers
+        :param region: Vector of intervals and numbers (e.g. an adversarial region)
+        :return: Vectors holding the lower and the upper bounds of each element
+        '''
+        lower_bounds = array([element.lb if isinstance(element, Interval) else element for element in region], dtype=float)
+        upper_bounds = array([element.ub if isinstance(element, Interval) else element for element in region], dtype=float)
+        return lower_bounds, upper_bounds
+
     def dominates(self,
         other: Type[Interval] | Number
     ) -> Boolean:
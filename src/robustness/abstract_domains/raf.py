@@ -11,16 +11,15 @@
 # =============================================================================
 
 from __future__ import annotations
-from typing import Type
+from typing import Tuple, Type
 
 import numbers
 import numpy as np
 
 from robustness.base import Vector
-from robustness.utils.hyperplane import Hyperplane
 
 from .abstract_domain import AbstractDomain
-from robustness import Boolean, Integer, Number, String
+from robustness import Boolean, Integer, Number, Real, String
 
 class Raf(AbstractDomain):
     '''Represents the RAF abstract domain'''
@@ -54,6 +53,14 @@ class Raf(AbstractDomain):
             return self.center + noise
         return self.center + np.sum(np.absolute(self.linear)) + self.noise
 
+    def get_range(self) -> Tuple[Real, Real]:
+        '''
+        Return bounds computed from all the terms, which contain the ones of lowerbound and upperbound
+        :return: Lower and upper bounds
+        '''
+        radius = np.sum(np.absolute(self.linear)) + abs(self.noise)
+        return self.center - radius, self.center + radius
+
     def is_number(self):
         return np.count_nonzero(self.linear) == 0 and self.noise == 0.0
 
@@ -123,12 +130,9 @@ class Raf(AbstractDomain):
     def square(self):
         if self.is_single_variable():
             return self.single_square()
-        noise = abs(self.noise**2 + 2 * self.center * self.noise)
-        for i in range(0, self.size()):
-            noise += self.linear[i]**2
-            noise += abs(2 * self.linear[i] * self.noise)
-            for j in range(i + 1, self.size()):
-                noise += abs(2 * self.linear[i] * self.linear[j])
+        # sum_i l_i^2 + sum_{i<j} |2 l_i l_j| = ||l||_1^2
+        norm_one = np.sum(np.absolute(self.linear))
+        noise = abs(self.noise**2 + 2 * self.center * self.noise) + 2 * self.noise * norm_one + norm_one**2
         return Raf(self.center**2, 2 * self.center * self.linear, noise)
 
     def __lt__(self,
@@ -174,17 +178,12 @@ class Raf(AbstractDomain):
                 other * self.linear,
                 abs(other * self.noise)
             )
-        linear = np.empty(self.linear.shape)
-        x_norm_one = 0.0
-        y_norm_one = 0.0
-        xy = 0.0
-        xy_abs = 0.0
-        for i in range(0, self.size()):
-            xy += self.linear[i] * other.linear[i]
-            xy_abs += abs(self.linear[i] * other.linear[i])
-            x_norm_one += abs(self.linear[i])
-            y_norm_one += abs(other.linear[i])
-            linear[i] = other.center * self.linear[i] + self.center * other.linear[i]
+        products = self.linear * other.linear
+        xy = np.sum(products)
+        xy_abs = np.sum(np.absolute(products))
+        x_norm_one = np.sum(np.absolute(self.linear))
+        y_norm_one = np.sum(np.absolute(other.linear))
+        linear = other.center * self.linear + self.center * other.linear
         return Raf(
             self.center * other.center + 0.5 * xy,
             linear,
@@ -195,6 +194,12 @@ class Raf(AbstractDomain):
         )
     
     def __abs__(self) -> Type[Raf]:
+        '''
+        Return a RAF bounding the absolute value of the RAF. In the general case the upper plane is solved directly,
+        while the point where the RAF crosses 0 (exactly t = -center / squared norm along the gradient) is still
+        found by the former 100-step search on purpose, so that the results match the former ones
+        :return: The absolute value of the RAF
+        '''
         if self.lowerbound() >= 0.0:
             return self
         elif self.upperbound() < 0.0:
@@ -212,60 +217,31 @@ class Raf(AbstractDomain):
             raf = Raf(q, np.zeros(len(self.linear)), epsilon)
             raf.linear[index] = m
             return raf
-        n = self.size() + 2
-
-        # RAF as hyperplane
-        p = Hyperplane(dimensions=n)
-        p.constant = self.center
-        for i in range(0, self.size()):
-            p.coefficients[i] = self.linear[i]
-        p.coefficients[self.size()] = self.noise
-        p.coefficients[self.size() + 1] = -1
-
-        # Finds n points
-        points = np.zeros((n, n))
-
-        # Finds minimum and maximum
-        for i in range(0, self.size()):
-            points[0][i] = +1 if self.linear[i] < 0.0 else -1
-            points[1][i] = -1 if self.linear[i] < 0.0 else +1
-        points[0][self.size()] = -1
-        points[1][self.size()] = +1
-        points[0][self.size() + 1] = abs(self.lowerbound())
-        points[1][self.size() + 1] = abs(self.upperbound())
-
-        # Finds other points
-        for i in range(0, self.size()):
-            points[i + 2][i] = 1
-            points[i + 2][self.size() + 1] = abs(p(points[i + 2]))
-
-        # Finds hyperplane for those points (upperbound)
-        X = np.matrix(points)
-        k = np.ones((n, 1))
-        A = np.matrix.dot(np.linalg.inv(X), k)
-        h_top = Hyperplane(np.squeeze(np.asarray(A)), -1.0)
-
-        # find one intersection between raf (as hyperplane) and x_d+2 = 0
-        x = np.zeros(n)
-        nabla = np.array([p.coefficients[i] for i in range(0, n)])
-        nabla[n - 1] = 0
+        # The upper plane interpolates |x| at the minimum, at the maximum and at c + l_i
+        # for every noise symbol: its coefficients solve an arrow-shaped linear system
+        linear = self.linear
+        lowerbound = abs(self.lowerbound())
+        upperbound = abs(self.upperbound())
+        a_top = 2 / (lowerbound + upperbound)
+        a = 1 - np.absolute(self.center + linear) * a_top
+        a_noise = np.sum(np.where(linear < 0.0, a, -a)) - 1 + lowerbound * a_top
+
+        # The lower plane is parallel and passes through the intersection of the RAF with 0,
+        # searched along the gradient of the RAF as the former code did (see the docstring).
+        # Being parallel to the upper plane, it is not a lower bound of |x| for every RAF, as before
+        squared_norm = np.dot(linear, linear) + self.noise ** 2
+        t = 0.0
         for i in range(1, 100):
-            if np.dot(x, nabla) == -p.constant:
+            if t * squared_norm == -self.center:
                 break
-            elif np.dot(x, nabla) > -p.constant:
-                x -= nabla / i
+            elif t * squared_norm > -self.center:
+                t -= 1 / i
             else:
-                x += nabla / i
-
-        # find parallel hyperplane passing through intersection: this is the lowebound
-        h_bottom = Hyperplane(h_top.coefficients, h_top.constant - h_top(x))
-
-        # find middle hyperplane
-        h = Hyperplane(h_top.coefficients, 0.5 * (h_top.constant + h_bottom.constant))
-        delta = abs(0.5 * (h_top.constant - h_bottom.constant) / -h.coefficients[n-1])
-        h_c = h / -h.coefficients[n - 1]
+                t += 1 / i
+        intersection = t * (np.dot(a, linear) + a_noise * self.noise)
 
-        return Raf(h_c.constant, h_c.coefficients[0:n-2], abs(h_c.coefficients[n - 2]) + delta)
+        delta = abs(0.5 * (intersection - 1) / a_top)
+        return Raf(0.5 * (1 + intersection) / a_top, -a / a_top, abs(a_noise / a_top) + delta)
     
     def __pow__(self,
         n: Integer
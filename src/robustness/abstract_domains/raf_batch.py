@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# File: raf_batch.py
+# Updated: 02/05/2023
+# =============================================================================
+'''Define a batch of Reduced Affine Forms (RAF) stored in contiguous arrays'''
+# =============================================================================
+# Dependencies:
+#   ./raf.py
+#   ../base.py
+# =============================================================================
+
+from __future__ import annotations
+from typing import Type
+
+import numbers
+import numpy as np
+
+from .raf import Raf
+from robustness import Integer, Number, String
+
+class RafBatch:
+    '''Represents a batch of RAFs sharing the same noise symbols'''
+
+    def __init__(self,
+        centers,
+        linear,
+        noise,
+        dimensions: Integer = 0,
+        single_variable: Integer = -1
+    ) -> None:
+        '''
+        Let the class initialize the object's attributes
+        :param centers: Center of each RAF (N)
+        :param linear: Linear coefficients of each RAF (N x dimensions), or only the coefficients of
+            the single variable (N) when single_variable is not negative
+        :param noise: Noise of each RAF (N)
+        :param dimensions: Number of noise symbols
+        :param single_variable: Index of the only linear coefficient that can be nonzero (-1 if not known)
+        '''
+        self.centers = centers
+        self.linear = linear
+        self.noise = np.abs(noise)
+        self.dimensions = dimensions if single_variable >= 0 else linear.shape[1]
+        self.single_variable = single_variable
+
+    @staticmethod
+    def zeros(
+        length: Integer,
+        dimensions: Integer
+    ) -> Type[RafBatch]:
+        '''
+        Return a batch of RAFs equal to zero
+        :param length: Number of RAFs in the batch
+        :param dimensions: Number of noise symbols
+        :return: The batch of RAFs
+        '''
+        return RafBatch(np.zeros(length), np.zeros((length, dimensions)), np.zeros(length))
+
+    @staticmethod
+    def single(
+        centers,
+        coefficient: Number,
+        single_variable: Integer,
+        dimensions: Integer
+    ) -> Type[RafBatch]:
+        '''
+        Return a batch of RAFs that depend on the same single noise symbol with the same coefficient
+        :param centers: Center of each RAF
+        :param coefficient: Coefficient of the noise symbol
+        :param single_variable: Index of the noise symbol
+        :param dimensions: Number of noise symbols
+        :return: The batch of RAFs
+        '''
+        return RafBatch(
+            centers,
+            np.full(centers.shape[0], coefficient, dtype=float),
+            np.zeros(centers.shape[0]),
+            dimensions,
+            single_variable
+        )
+
+    def size(self) -> Integer:
+        return self.dimensions
+
+    def __len__(self) -> Integer:
+        return self.centers.shape[0]
+
+    def is_sparse(self):
+        return self.single_variable >= 0
+
+    def is_single_variable(self):
+        return self.is_sparse() and not np.any(self.noise)
+
+    def dense_linear(self):
+        '''
+        Return the linear coefficients as a (N x dimensions) matrix
+        :return: Linear coefficients of each RAF
+        '''
+        if not self.is_sparse():
+            return self.linear
+        linear = np.zeros((len(self), self.dimensions))
+        linear[:, self.single_variable] = self.linear
+        return linear
+
+    def radius(self):
+        if self.is_sparse():
+            return np.abs(self.linear) + self.noise
+        return np.abs(self.linear).sum(axis=1) + self.noise
+
+    def lowerbound(self):
+        return self.centers - self.radius()
+
+    def upperbound(self):
+        return self.centers + self.radius()
+
+    def to_string(self) -> String:
+        return '\n'.join(self[i].to_string() for i in range(len(self)))
+
+    def __repr__(self) -> String:
+        return self.to_string()
+
+    def __getitem__(self,
+        index: Integer
+    ) -> Type[Raf]:
+        if self.is_sparse():
+            linear = np.zeros(self.dimensions)
+            linear[self.single_variable] = self.linear[index]
+        else:
+            linear = self.linear[index]
+        return Raf(self.centers[index].item(), linear, self.noise[index].item())
+
+    def square(self) -> Type[RafBatch]:
+        if self.is_single_variable():
+            return RafBatch(
+                self.centers ** 2,
+                2 * self.centers * self.linear,
+                self.linear ** 2,
+                self.dimensions,
+                self.single_variable
+            )
+        # sum_{i<j} |2 l_i l_j| = ||l||_1^2 - ||l||_2^2
+        l1_norm = np.abs(self.linear).sum(axis=1)
+        noise = np.abs(self.noise ** 2 + 2 * self.centers * self.noise) + 2 * self.noise * l1_norm + l1_norm ** 2
+        return RafBatch(self.centers ** 2, 2 * self.centers[:, np.newaxis] * self.linear, noise)
+
+    def __neg__(self) -> Type[RafBatch]:
+        return RafBatch(-self.centers, -self.linear, self.noise, self.dimensions, self.single_variable)
+
+    def __abs__(self) -> Type[RafBatch]:
+        if not self.is_single_variable():
+            rafs = [abs(self[i]) for i in range(len(self))]
+            return RafBatch(
+                np.array([raf.center for raf in rafs], dtype=float),
+                np.array([raf.linear for raf in rafs], dtype=float).reshape(len(self), self.dimensions),
+                np.array([raf.noise for raf in rafs], dtype=float)
+            )
+
+        c = self.centers
+        a = self.linear
+        positive = self.lowerbound() >= 0.0
+        negative = ~positive & (self.upperbound() < 0.0)
+        straddling = ~(positive | negative)
+
+        # same relaxation as Raf.__abs__ on single variable forms
+        safe_a = np.where(straddling, a, 1.0)
+        difference = np.abs(c + a) - np.abs(c - a)
+        total = np.abs(c + a) + np.abs(c - a)
+        m = 0.5 * difference
+        q = (c * difference + a * total) / (4 * safe_a)
+        epsilon = (-c * difference + a * total) / (4 * safe_a)
+
+        return RafBatch(
+            np.where(positive, c, np.where(negative, -c, q)),
+            np.where(positive, a, np.where(negative, -a, m)),
+            np.where(straddling, np.abs(epsilon), self.noise),
+            self.dimensions,
+            self.single_variable
+        )
+
+    def __add__(self,
+        other: Type[RafBatch] | Number
+    ) -> Type[RafBatch]:
+        linear = self.dense_linear()
+        result = RafBatch(self.centers, linear.copy() if linear is self.linear else linear, self.noise)
+        result += other
+        return result
+
+    def __iadd__(self,
+        other: Type[RafBatch] | Number
+    ) -> Type[RafBatch]:
+        if not isinstance(other, RafBatch):
+            self.centers = self.centers + other
+            return self
+        if self.is_sparse():
+            self.linear, self.single_variable = self.dense_linear(), -1
+        self.centers = self.centers + other.centers
+        if other.is_sparse():
+            self.linear[:, other.single_variable] += other.linear
+        else:
+            self.linear += other.linear
+        self.noise = np.abs(self.noise) + np.abs(other.noise)
+        return self
+
+    def __sub__(self,
+        other: Type[RafBatch] | Number
+    ) -> Type[RafBatch]:
+        if isinstance(other, RafBatch):
+            return self + (-other)
+        return RafBatch(self.centers - other, self.linear, self.noise, self.dimensions, self.single_variable)
+
+    def __mul__(self,
+        other: Number
+    ) -> Type[RafBatch]:
+        if isinstance(other, numbers.Number):
+            return RafBatch(other * self.centers, other * self.linear, abs(other) * self.noise, self.dimensions, self.single_variable)
+        return NotImplemented
+
+    def __pow__(self,
+        n: Integer
+    ) -> Type[RafBatch]:
+        if n == 2:
+            return self.square()
+        raise Exception('\nUnsupported exponent for a batch of RAFs')
@@ -9,7 +9,6 @@
 #   ../base.py
 #   ../dataset.py
 #   ../utils/distances.py
-#   ../utils/min_heap.py
 # =============================================================================
 
 from __future__ import annotations
@@ -18,9 +17,12 @@ from os import makedirs
 from os.path import exists, join
 from logging import basicConfig, getLogger
 from itertools import combinations
+from nptyping import NDArray
+from numpy import arange, argpartition, argsort, asarray, bincount, einsum, finfo, flatnonzero, full, inf, newaxis, partition
+from scipy.sparse import issparse
 
 from robustness import Dataset, Boolean, Integer, Literal, Map, Set, String, Real, Vector
-from robustness.utils import compute_distance, MinHeap
+from robustness.utils import compute_distances, compute_nearest_distances
 
 class ConcreteClassifier:
     '''Represents a k-NN classifier'''
@@ -46,22 +48,121 @@ class ConcreteClassifier:
         self.logger.setLevel(50)
 
     def __compute_distances(self,
-        test_point,
-        distance_metric: String
-    ) -> MinHeap:
+        test_point: Vector[Real],
+        distance_metric: String,
+        n: Integer
+    ) -> NDArray:
         '''
-        Computes the abstract distances of each point in the training set to the adversarial region
+        Computes the distances of the points in the training set that can be among the n nearest to the test point
         :param test_point: Target test point
         :param distance_metric: Metric to evaluate the distance between two points
-        :return: The distances in a min heap structure
+        :param n: Number of nearest points to select
+        :return: The distances in a vector aligned with the training set (inf for the points that cannot be selected)
+        '''
+        return compute_nearest_distances(test_point, self.__training_points, distance_metric, n)
+
+    def __get_nearest_distances_batch(self,
+        test_points: NDArray,
+        n: Integer
+    ) -> NDArray:
+        '''
+        Computes the squared euclidean distances of the training points that can be among the n nearest
+        to each test point, exactly as __compute_distances does (inf for the other training points)
+        :param test_points: Target test points (one point per row)
+        :param n: Number of nearest points to select
+        :return: The distances of each test point, in a vector aligned with the training set
+        '''
+        # ||x||^2 - 2 x.y + ||y||^2, with the cross term computed as a single matrix product,
+        # is rounded differently from the distances used in the tie tests and only selects the candidates
+        if issparse(self.__training_points):
+            cross_products = (self.__training_points @ test_points.T).T
+        else:
+            cross_products = test_points @ self.__training_points.T
+        test_squared_norms = einsum('ij,ij->i', test_points, test_points)
+        approximations = self.__training_squared_norms - 2.0 * cross_products
+        approximations += test_squared_norms[:, newaxis]
+
+        # bound on the rounding error of both ways of computing a distance
+        margins = 4.0 * (self.__training_points.shape[1] + 4) * finfo(float).eps * (
+            test_squared_norms + self.__training_max_squared_norm
+        )
+        # a training point as close as the n-th nearest one is approximated within the n-th approximation + 2 margins
+        thresholds = partition(approximations, n - 1, axis=1)[:, n - 1] + 2.0 * margins
+
+        block_distances = full(approximations.shape, inf)
+        for test_point, distances, approximated_distances, threshold in zip(test_points, block_distances, approximations, thresholds):
+            candidates = flatnonzero(approximated_distances <= threshold)
+            distances[candidates] = compute_distances(test_point, self.__training_points[candidates], 'euclidean')
+        return block_distances
+
+    def __get_nearest(self,
+        distances: NDArray,
+        n: Integer
+    ) -> NDArray:
+        '''
+        Returns the indexes of the n nearest training points, ordered by distance
+        :param distances: Distances of each point in the training set to the test point
+        :param n: Number of nearest points to select
+        :return: Indexes of the n nearest training points
         '''
-        distances = []
-        for train_point, train_label in zip(self.__training_set.get_points(), self.__training_set.get_labels()):
-            distances.append((
-                compute_distance(test_point, train_point, distance_metric),
-                train_label
-            ))
-        return MinHeap(distances)
+        if n < distances.shape[0]:
+            nearest = argpartition(distances, n - 1)[:n]
+        else:
+            nearest = arange(distances.shape[0])
+        return nearest[argsort(distances[nearest], kind='stable')]
+
+    def __get_most_voted_labels(self,
+        distances: NDArray,
+        k_values: Vector[Integer]
+    ) -> Map[Set[Literal]]:
+        '''
+        Returns the most voted labels given the distances of the training points
+        :param distances: Distances of each point in the training set to the test point
+        :param k_values: Number of neighbors to consider (one or more values)
+        :return: The most voted labels for each k
+        '''
+        classes = self.__training_set.get_classes()
+        nearest = self.__get_nearest(distances, min(max(k_values) + 1, distances.shape[0]))
+
+        most_voted_labels = {}
+        for k in k_values:
+            kth_distance = distances[nearest[k - 1]]
+            if distances.shape[0] <= k or kth_distance < distances[nearest[k]]:
+                scores = bincount(self.__training_codes[nearest[:k]], minlength=len(classes))
+                scores = {classes[code]: int(score) for code, score in enumerate(scores) if score > 0}
+                max_score = max(scores.values())
+                most_voted_labels[k] = Set([label for label in scores if scores[label] == max_score])
+                self.logger.info('\tk = {} -> scores: {} -> winning: {}'.format(k, scores, most_voted_labels[k]))
+
+            else:
+                # the h-th distance is equal to the k-th distance (holds) for some h > k
+                uncertain_labels = [classes[code] for code in self.__training_codes[distances == kth_distance]]
+                closest_labels = [classes[code] for code in self.__training_codes[distances < kth_distance]]
+
+                most_voted_labels[k] = Set()
+
+                # all possible ways to choose k points
+                for possible_selection in Set(combinations(uncertain_labels, k - len(closest_labels))):
+                    scores = {label : 0 for label in classes}
+                    for label in closest_labels:
+                        scores[label] += 1
+                    for label in possible_selection:
+                        scores[label] += 1
+                    scores = {label: score for label, score in scores.items() if score > 0}
+                    max_score = max(scores.values())
+                    winning_labels = Set([label for label in scores if scores[label] == max_score])
+                    most_voted_labels[k] = most_voted_labels[k].union(winning_labels)
+                    self.logger.info('\tk = {} -> scores: {} -> winning: {}'.format(k, scores, most_voted_labels[k]))
+                    if len(most_voted_labels[k]) == self.__training_set.num_classes():
+                        break
+
+        self.logger.info('\n\tdistances:')
+        if self.logger.getEffectiveLevel() == 0:
+            for index in nearest:
+                self.logger.info('\t\t{}: {}'.format(classes[self.__training_codes[index]], distances[index]))
+        self.logger.info('\n')
+
+        return most_voted_labels
 
     def get_training_set(self) -> Dataset:
         '''
@@ -87,6 +188,13 @@ class ConcreteClassifier:
         :param trainig_set: Training set to fit
         '''
         self.__training_set = training_set
+        self.__training_points = training_set.get_matrix()
+        if issparse(self.__training_points):
+            self.__training_squared_norms = asarray(self.__training_points.multiply(self.__training_points).sum(axis=1)).ravel()
+        else:
+            self.__training_squared_norms = einsum('ij,ij->i', self.__training_points, self.__training_points)
+        self.__training_max_squared_norm = self.__training_squared_norms.max(initial=0.0)
+        self.__training_codes = training_set.get_label_codes()
 
     def classify(self,
         test_point: Vector[Real],
@@ -102,61 +210,32 @@ class ConcreteClassifier:
         '''
         self.logger.info('- test point: {}\n'.format(test_point))
         
-        distances = self.__compute_distances(test_point, distance_metric)
+        distances = self.__compute_distances(test_point, distance_metric, min(max(k_values) + 1, self.__training_codes.shape[0]))
 
-        most_voted_labels = {}
-        for k in k_values:     
-            if distances.get_size() <= k or distances.get_nth_smallest(k)[0] < distances.get_nth_smallest(k + 1)[0]:
-                scores = {label : 0 for label in self.__training_set.get_classes()}
-                for i in range(1, k + 1):
-                    scores[distances.get_nth_smallest(i)[1]] += 1
-                scores = {label: score for label, score in scores.items() if score > 0}
-                max_score = max(scores.values())
-                most_voted_labels[k] = Set([label for label in scores if scores[label] == max_score])
-                self.logger.info('\tk = {} -> scores: {} -> winning: {}'.format(k, scores, most_voted_labels[k]))
+        return self.__get_most_voted_labels(distances, k_values)
 
-            else:
-                # the h-th distance is equal to the k-th distance (holds) for some h > k
-                kth_distance, kth_label = distances.get_nth_smallest(k)
-                uncertain_labels = [kth_label]
-                for i in range(k + 1, distances.get_size() + 1):
-                    ith_distance, ith_label = distances.get_nth_smallest(i)
-                    if ith_distance == kth_distance:
-                        uncertain_labels.append(ith_label)
-                    else:
-                        break
-
-                closest_labels = []
-                for i in range(k - 1, 0, -1):
-                    ith_distance, ith_label = distances.get_nth_smallest(i)
-                    if ith_distance == kth_distance:
-                        uncertain_labels.append(ith_label)
-                    else:
-                        for j in range(1, i + 1):
-                            closest_labels.append(distances.get_nth_smallest(j)[1])
-                        break
-                
-                most_voted_labels[k] = Set()
-                
-                # all possible ways to choose k points
-                for possible_selection in Set(combinations(uncertain_labels, k - len(closest_labels))):
-                    scores = {label : 0 for label in self.__training_set.get_classes()}
-                    for label in closest_labels:
-                        scores[label] += 1
-                    for label in possible_selection:
-                        scores[label] += 1
-                    scores = {label: score for label, score in scores.items() if score > 0}
-                    max_score = max(scores.values())
-                    winning_labels = Set([label for label in scores if scores[label] == max_score])
-                    most_voted_labels[k] = most_voted_labels[k].union(winning_labels)
-                    self.logger.info('\tk = {} -> scores: {} -> winning: {}'.format(k, scores, most_voted_labels[k]))
-                    if len(most_voted_labels[k]) == self.__training_set.num_classes():
-                        break
-        
-        self.logger.info('\n\tdistances:')
-        if self.logger.getEffectiveLevel() == 0:
-            for distance, label in distances.get_items_ordered_so_far():
-                self.logger.info('\t\t{}: {}'.format(label, distance))
-        self.logger.info('\n')
-
-        return most_voted_labels
\ No newline at end of file
+    def classify_batch(self,
+        test_points: NDArray,
+        k_values: Vector[Integer],
+        distance_metric: String = 'euclidean'
+    ) -> Vector[Map[Set[Literal]]]:
+        '''
+        Performs the classification of a block of test points
+        :param test_points: Points to be classified (one point per row)
+        :param k_values: Number of neighbors to consider (one or more values)
+        :param distance_metric: Metric to evaluate the abstract distance between two points
+        :return: The most voted labels for each k, for each test point
+        '''
+        test_points = asarray(test_points, dtype=float)
+
+        n = min(max(k_values) + 1, self.__training_codes.shape[0])
+        if distance_metric == 'euclidean':
+            block_distances = self.__get_nearest_distances_batch(test_points, n)
+        else:
+            block_distances = [self.__compute_distances(test_point, distance_metric, n) for test_point in test_points]
+
+        most_voted_labels = []
+        for test_point, distances in zip(test_points, block_distances):
+            self.logger.info('- test point: {}\n'.format(test_point.tolist()))
+            most_voted_labels.append(self.__get_most_voted_labels(distances, k_values))
+        return most_voted_labels
@@ -9,36 +9,108 @@
 #   ./base.py
 # =============================================================================
 
+from __future__ import annotations
+from nptyping import NDArray
+from numpy import asarray, float64, fromiter, int64, ravel
+from scipy.sparse import issparse
+from typing import Iterator, Tuple
+
 from robustness import Integer, Literal, Real, Set, Vector
 
+class PointsView:
+    '''
+    Represents the rows of a matrix of points (dense or sparse) as lists of features,
+    for the code that perturbs the points one feature at a time
+    '''
+
+    def __init__(self,
+        points: NDArray
+    ) -> None:
+        '''
+        Lets the class initialize the object's attributes
+        :param points: Matrix holding one point per row
+        '''
+        self.__points = points
+
+    def __len__(self) -> Integer:
+        return self.__points.shape[0]
+
+    def __getitem__(self,
+        index: Integer | slice
+    ) -> Vector[Real] | PointsView:
+        if isinstance(index, slice):
+            return PointsView(self.__points[index])
+        return self.__to_list(self.__points[index])
+
+    def __iter__(self) -> Iterator[Vector[Real]]:
+        for i in range(self.__points.shape[0]):
+            yield self.__to_list(self.__points[i])
+
+    def __to_list(self,
+        row: NDArray
+    ) -> Vector[Real]:
+        return ravel(row.toarray()).tolist() if issparse(row) else row.tolist()
+
+    def __array__(self,
+        dtype: type | None = None,
+        copy: bool | None = None
+    ) -> NDArray:
+        # a dense matrix is not copied when it is converted back with asarray
+        return asarray(self.__points.toarray() if issparse(self.__points) else self.__points, dtype=dtype)
+
 class Dataset:
-    '''Represents a dataset'''
-    
+    '''Represents a dataset whose points are stored in a contiguous matrix and whose labels are coded by class'''
+
     def __init__(self,
-        points: Vector[Vector[Real]],
+        points: NDArray | Vector[Vector[Real]],
         labels: Vector[Literal]
     ) -> None:
         '''
         Lets the class initialize the object's attributes
-        :param points: Data points
+        :param points: Data points, one per row (a memory-mapped matrix is not copied)
         :param labels: Labels associated with each point
         '''
-        self.__points = points
-        self.__labels = labels
+        self.__points = asarray(points, dtype=float64)
         self.__classes = sorted([*Set(labels)])
-    
-    def get_points(self) -> Vector[Vector[Real]]:
+        label_codes = {label: code for code, label in enumerate(self.__classes)}
+        self.__label_codes = fromiter((label_codes[label] for label in labels), dtype=int64, count=len(labels))
+        self.__labels = None
+
+    def get_matrix(self) -> NDArray:
         '''
         Returns the points in the dataset
-        :return: All points in the dataset
+        :return: Matrix holding one point per row
         '''
         return self.__points
-        
+
+    def get_points(self) -> PointsView:
+        '''
+        Returns the points in the dataset
+        :return: All points in the dataset, each one as a list of features
+        '''
+        return PointsView(self.__points)
+
+    def iterate(self) -> Iterator[Tuple[Vector[Real], Literal]]:
+        '''
+        Returns the points in the dataset, each one with its label
+        :return: Pairs of point (as a list of features) and label, in the order of the dataset
+        '''
+        return zip(self.get_points(), self.get_labels())
+
+    def get_label_codes(self) -> NDArray:
+        '''
+        Returns the labels in the dataset as indexes in the classes
+        :return: Code of the label of each point
+        '''
+        return self.__label_codes
+
     def get_labels(self) -> Vector[Literal]:
         '''
         Returns the labels in the dataset
         :return: All labels in the dataset
         '''
+        if self.__labels is None:
+            self.__labels = [self.__classes[code] for code in self.__label_codes.tolist()]
         return self.__labels
 
     def get_classes(self) -> Vector[Literal]:
@@ -53,14 +125,14 @@ class Dataset:
         Returns the number of points in the dataset
         :return: Number of points in the dataset
         '''
-        return len(self.__points)
+        return self.__points.shape[0]
 
     def num_features(self) -> Integer:
         '''
         Returns the number of features of a point
         :return: Number of features in the dataset
         '''
-        return len(self.__points[0])
+        return self.__points.shape[1]
 
     def num_classes(self) -> Integer:
         '''
@@ -74,5 +146,5 @@ class Dataset:
         Prints the dataset information
         '''
         print('# of points:\t', self.num_points())
-        print('# of features:\t', self.num_features()) 
-        print('# of classes:\t', self.num_classes())
\ No newline at end of file
+        print('# of features:\t', self.num_features())
+        print('# of classes:\t', self.num_classes())
@@ -69,6 +69,22 @@ class NoiseCat(Perturbation):
         '''
         return self.__num_adv_regions
 
+    def get_joined_region(self,
+        point: Vector[Real]
+    ) -> Vector[Type[Interval] | Number]:
+        '''
+        Return the region that contains all the adversarial regions of the given point,
+        where every perturbed block of one-hot features ranges in [0, 1] (exactly one of them being 1)
+        :param point: Point to perturb
+        :return: Region joining the adversarial regions of the given point
+        '''
+        joined_region = self.__noise.perturb(point)
+        for from_index, num_values in self.__cat_indexes:
+            if num_values > 1:
+                for i in range(len(self.__possible_values[num_values][0])):
+                    joined_region[from_index + i] = Interval(0.0, 1.0)
+        return joined_region
+
     def perturb(self,
         point: Vector[Real],
     ) -> Vector[Type[Interval] | Number] | None:
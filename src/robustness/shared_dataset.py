@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# File: shared_dataset.py
+# Updated: 02/05/2023
+# =============================================================================
+'''Defines a dataset stored in shared memory'''
+# =============================================================================
+# Dependencies:
+#   ./base.py
+#   ./dataset.py
+# =============================================================================
+
+from __future__ import annotations
+from multiprocessing.shared_memory import SharedMemory
+from nptyping import NDArray
+from numpy import dtype, float64, int64, ndarray
+from scipy.sparse import csr_matrix, issparse
+from typing import Tuple
+
+from robustness import Dataset, Integer, Literal, String, Vector
+from robustness.dataset import PointsView
+
+class SharedDataset(Dataset):
+    '''
+    Represents a dataset whose points (dense or sparse) and label codes are stored in shared memory,
+    so that every process can attach to them without copying them
+    '''
+
+    def __init__(self,
+        arrays: Vector[Tuple[String, Tuple[Integer, ...], String]],
+        shape: Tuple[Integer, Integer],
+        classes: Vector[Literal]
+    ) -> None:
+        '''
+        Lets the class initialize the object's attributes
+        :param arrays: Name of the shared memory block, shape and type of each array, in the form [(name, shape, type)]:
+            the points (one array if dense, the data, indices and pointers of the rows if sparse), then the label codes
+        :param shape: Number of points and number of features
+        :param classes: Classes in the dataset, indexed by label code
+        '''
+        self.__arrays = arrays
+        self.__shape = shape
+        self.__classes = classes
+        self.__owned_memory = []
+        self.__memory = []
+        self.__points = None
+        self.__label_codes = None
+        self.__labels = None
+
+    @staticmethod
+    def create(
+        dataset: Dataset
+    ) -> SharedDataset:
+        '''
+        Copies a dataset into shared memory. The returned dataset owns the memory, which must be released
+        :param dataset: Dataset to share
+        :return: The shared dataset
+        '''
+        points = dataset.get_matrix()
+        if issparse(points):
+            arrays = [points.data.astype(float64, copy=False), points.indices, points.indptr]
+        else:
+            arrays = [points.astype(float64, copy=False)]
+        arrays.append(dataset.get_label_codes().astype(int64, copy=False))
+
+        owned_memory = []
+        for array in arrays:
+            owned_memory.append(SharedMemory(create=True, size=max(array.nbytes, 1)))
+            ndarray(array.shape, dtype=array.dtype, buffer=owned_memory[-1].buf)[...] = array
+
+        shared_dataset = SharedDataset(
+            [(memory.name, array.shape, array.dtype.str) for memory, array in zip(owned_memory, arrays)],
+            points.shape,
+            dataset.get_classes()
+        )
+        shared_dataset.__owned_memory = owned_memory
+        return shared_dataset
+
+    def __attach(self) -> None:
+        '''
+        Attaches to the shared memory blocks, on first use
+        '''
+        if self.__points is not None:
+            return
+        self.__memory = [SharedMemory(name=name) for name, _, _ in self.__arrays]
+        arrays = []
+        for memory, (_, shape, array_type) in zip(self.__memory, self.__arrays):
+            arrays.append(ndarray(shape, dtype=dtype(array_type), buffer=memory.buf))
+            arrays[-1].flags.writeable = False
+        if len(arrays) == 2:
+            self.__points = arrays[0]
+        else:
+            self.__points = csr_matrix(tuple(arrays[:3]), shape=self.__shape, copy=False)
+        self.__label_codes = arrays[-1]
+        self.__labels = [self.__classes[code] for code in self.__label_codes.tolist()]
+
+    def release(self) -> None:
+        '''
+        Frees the shared memory blocks owned by the dataset
+        '''
+        for memory in self.__owned_memory:
+            memory.close()
+            memory.unlink()
+        self.__owned_memory = []
+
+    def __reduce__(self) -> Tuple:
+        return SharedDataset, (self.__arrays, self.__shape, self.__classes)
+
+    def get_matrix(self) -> NDArray:
+        '''
+        Returns the points in the dataset
+        :return: Read-only matrix (dense or sparse) holding one point per row
+        '''
+        self.__attach()
+        return self.__points
+
+    def get_points(self) -> PointsView:
+        '''
+        Returns the points in the dataset
+        :return: All points in the dataset, each one as a list of features
+        '''
+        self.__attach()
+        return PointsView(self.__points)
+
+    def get_label_codes(self) -> NDArray:
+        '''
+        Returns the labels in the dataset as indexes in the classes
+        :return: Read-only code of the label of each point
+        '''
+        self.__attach()
+        return self.__label_codes
+
+    def get_labels(self) -> Vector[Literal]:
+        '''
+        Returns the labels in the dataset
+        :return: All labels in the dataset
+        '''
+        self.__attach()
+        return self.__labels
+
+    def get_classes(self) -> Vector[Literal]:
+        '''
+        Returns the classes in the dataset
+        :return: All classes in the dataset
+        '''
+        return self.__classes
+
+    def num_points(self) -> Integer:
+        '''
+        Returns the number of points in the dataset
+        :return: Number of points in the dataset
+        '''
+        return self.__shape[0]
+
+    def num_features(self) -> Integer:
+        '''
+        Returns the number of features of a point
+        :return: Number of features in the dataset
+        '''
+        return self.__shape[1]
+
+    def num_classes(self) -> Integer:
+        '''
+        Returns the number of classes in the dataset
+        :return: Number of classes in the dataset
+        '''
+        return len(self.__classes)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# File: sparse_dataset.py
+# Updated: 02/05/2023
+# =============================================================================
+'''Defines a dataset whose points are stored as a sparse matrix'''
+# =============================================================================
+# Dependencies:
+#   ./base.py
+#   ./dataset.py
+# =============================================================================
+
+from __future__ import annotations
+from numpy import empty, float64
+from scipy.sparse import csr_matrix
+
+from robustness import Dataset, Integer, Literal, Vector
+from robustness.dataset import PointsView
+
+class SparseDataset(Dataset):
+    '''
+    Represents a dataset whose points are stored in Compressed Sparse Row format,
+    so that only the features other than 0 take memory
+    '''
+
+    def __init__(self,
+        points: csr_matrix,
+        labels: Vector[Literal]
+    ) -> None:
+        '''
+        Lets the class initialize the object's attributes
+        :param points: Data points, one per row
+        :param labels: Labels associated with each point
+        '''
+        # the labels are coded as in any dataset, the points are kept here
+        super().__init__(empty((points.shape[0], 0)), labels)
+        self.__points = csr_matrix(points, dtype=float64, copy=False)
+
+    def get_matrix(self) -> csr_matrix:
+        '''
+        Returns the points in the dataset
+        :return: Sparse matrix holding one point per row
+        '''
+        return self.__points
+
+    def get_points(self) -> PointsView:
+        '''
+        Returns the points in the dataset
+        :return: All points in the dataset, each one as a (dense) list of features
+        '''
+        return PointsView(self.__points)
+
+    def num_points(self) -> Integer:
+        '''
+        Returns the number of points in the dataset
+        :return: Number of points in the dataset
+        '''
+        return self.__points.shape[0]
+
+    def num_features(self) -> Integer:
+        '''
+        Returns the number of features of a point
+        :return: Number of features in the dataset
+        '''
+        return self.__points.shape[1]
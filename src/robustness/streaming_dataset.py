@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# File: streaming_dataset.py
+# Updated: 02/05/2023
+# =============================================================================
+'''Defines a dataset read from its file one chunk at a time'''
+# =============================================================================
+# Dependencies:
+#   ./base.py
+#   ./dataset.py
+# =============================================================================
+
+from __future__ import annotations
+from nptyping import NDArray
+from scipy.sparse import csr_matrix
+from typing import Callable, Iterator, Tuple
+
+from robustness import Dataset, Integer, Literal, Real, Vector
+from robustness.dataset import PointsView
+
+class StreamingDataset(Dataset):
+    '''
+    Represents a dataset whose points are read from its file, and preprocessed, one chunk at a time
+    whenever they are iterated, so that only one chunk is held in memory
+    '''
+
+    def __init__(self,
+        read_chunks: Callable[[], Iterator[Tuple[NDArray | csr_matrix, NDArray]]],
+        preprocess: Callable[[NDArray | csr_matrix], NDArray | csr_matrix],
+        num_points: Integer,
+        num_features: Integer,
+        classes: Vector[Literal]
+    ) -> None:
+        '''
+        Lets the class initialize the object's attributes
+        :param read_chunks: Function returning the chunks of points and labels in the file, as they are read
+        :param preprocess: Function encoding and scaling the points of a chunk
+        :param num_points: Number of points in the dataset
+        :param num_features: Number of features of a preprocessed point
+        :param classes: Classes in the dataset
+        '''
+        self.__read_chunks = read_chunks
+        self.__preprocess = preprocess
+        self.__num_points = num_points
+        self.__num_features = num_features
+        self.__classes = sorted(classes)
+
+    def iterate(self) -> Iterator[Tuple[Vector[Real], Literal]]:
+        '''
+        Returns the points in the dataset, each one with its label, reading the file again
+        :return: Pairs of point (as a list of features) and label, in the order of the file
+        '''
+        for points, labels in self.__read_chunks():
+            yield from zip(PointsView(self.__preprocess(points)), labels.tolist())
+
+    def get_matrix(self) -> NDArray:
+        '''
+        The points of the dataset are never held in memory at once
+        '''
+        raise Exception('\nThe points of a streamed dataset are never held in memory at once')
+
+    def get_label_codes(self) -> NDArray:
+        '''
+        The labels of the dataset are never held in memory at once
+        '''
+        raise Exception('\nThe labels of a streamed dataset are never held in memory at once')
+
+    def get_points(self) -> Iterator[Vector[Real]]:
+        '''
+        Returns the points in the dataset, reading the file again
+        :return: All points in the dataset, each one as a list of features
+        '''
+        return (point for point, _ in self.iterate())
+
+    def get_labels(self) -> Iterator[Literal]:
+        '''
+        Returns the labels in the dataset, reading the file again
+        :return: All labels in the dataset
+        '''
+        return (label for _, label in self.iterate())
+
+    def get_classes(self) -> Vector[Literal]:
+        '''
+        Returns the classes in the dataset
+        :return: All classes in the dataset
+        '''
+        return self.__classes
+
+    def num_points(self) -> Integer:
+        '''
+        Returns the number of points in the dataset
+        :return: Number of points in the dataset
+        '''
+        return self.__num_points
+
+    def num_features(self) -> Integer:
+        '''
+        Returns the number of features of a point
+        :return: Number of features in the dataset
+        '''
+        return self.__num_features
+
+    def num_classes(self) -> Integer:
+        '''
+        Returns the number of classes in the dataset
+        :return: Number of classes in the dataset
+        '''
+        return len(self.__classes)
@@ -9,22 +9,40 @@
 #   ./distances.py
 #   ./error.py
 #   ./inizialize_main.py
+#   ./kd_tree.py
 #   ./min_heap.py
 #   ./preprocessing.py
+#   ./results_writer.py
+#   ./sampling.py
 # =============================================================================
 
-from .distances import compute_distance, manhattan_distance, squared_euclidean_distance
+from .distances import (
+    compute_distance, compute_distances, compute_nearest_distances, interval_block_distance_bounds,
+    interval_box_lower_bound, interval_distance_bounds, manhattan_distance, raf_box_lower_bound, raf_distance_bounds,
+    sparse_distances, sparse_interval_distance_bounds, squared_euclidean_distance
+)
 from .error import Error
 from .inizialize_main import read_params
-from .preprocessing import one_hot_encoding, scale_features
+from .preprocessing import (
+    fit_one_hot_encoding, fit_scaling, fit_sparse_scaling, one_hot_encoding, scale_features, scale_sparse_features
+)
+from .sampling import sample_indexes
 from .min_heap import MinHeap
+from .kd_tree import KDTree
 from .hyperplane import Hyperplane
+from .results_writer import read_classifications, ResultsWriter
 
 __all__ = [
-    'compute_distance', 'manhattan_distance', 'squared_euclidean_distance',
+    'compute_distance', 'compute_distances', 'compute_nearest_distances', 'interval_block_distance_bounds',
+    'interval_box_lower_bound', 'interval_distance_bounds', 'manhattan_distance', 'raf_box_lower_bound', 'raf_distance_bounds',
+    'sparse_distances', 'sparse_interval_distance_bounds', 'squared_euclidean_distance',
     'read_params',
-    'one_hot_encoding', 'scale_features',
+    'fit_one_hot_encoding', 'fit_scaling', 'fit_sparse_scaling', 'one_hot_encoding', 'scale_features',
+    'scale_sparse_features',
+    'sample_indexes',
     'Error',
     'MinHeap',
-    'Hyperplane'
+    'KDTree',
+    'Hyperplane',
+    'read_classifications', 'ResultsWriter'
 ]
\ No newline at end of file
@@ -9,9 +9,15 @@
 #   ../base.py
 # =============================================================================
 
-from typing import Any
+from nptyping import NDArray
+from numpy import (
+    abs as np_abs, arange, asarray, bincount, diff, empty, finfo, flatnonzero, full, inf, maximum, minimum, newaxis, partition,
+    repeat, where, zeros
+)
+from scipy.sparse import csr_matrix, issparse
+from typing import Any, Iterator, Tuple
 
-from robustness import String, Vector
+from robustness import Integer, Real, String, Vector
 
 def compute_distance(
     point1:Vector[Any],
@@ -34,6 +40,360 @@ def compute_distance(
     else:
         raise Exception('\nUnsupported distance metric')
 
+def get_stored_rows(
+    points: csr_matrix
+) -> NDArray:
+    '''
+    Return the row of each feature stored in a sparse matrix of points
+    :param points: Sparse matrix whose rows are points
+    :return: Vector aligned with the stored features
+    '''
+    return repeat(arange(points.shape[0]), diff(points.indptr))
+
+def get_dense_blocks(
+    points: csr_matrix
+) -> Iterator[Tuple[Integer, NDArray]]:
+    '''
+    Densify a sparse matrix of points a few rows at a time, so that each block holds at most about 2^22 values
+    :param points: Sparse matrix whose rows are points
+    :return: Index of the first row of each block, and the block as a dense matrix
+    '''
+    step = max(1, 2 ** 22 // max(1, points.shape[1]))
+    for start in range(0, points.shape[0], step):
+        yield start, points[start:start + step].toarray()
+
+def get_rounding_margins(
+    norm: Real,
+    points: csr_matrix,
+    distance_metric: String
+) -> NDArray:
+    '''
+    Bound the difference between the results of the sparse kernels, which add up the features that are not stored
+    as a whole, and the ones accumulated in order along every feature
+    :param norm: Sum of the terms of the other point (or box) along every feature, as if the rows were 0
+    :param points: Sparse matrix whose rows are the points involved in the distance computation
+    :param distance_metric: Desired distance metric
+    :return: Vector holding the bound for each row of the matrix
+    '''
+    values = points.data * points.data if distance_metric == 'euclidean' else np_abs(points.data)
+    norms = bincount(get_stored_rows(points), values, minlength=points.shape[0])
+    return 4.0 * (points.shape[1] + 4) * finfo(float).eps * (norm + norms)
+
+def compute_distances(
+    point: Vector[Any] | NDArray,
+    points: NDArray | csr_matrix,
+    distance_metric: String
+) -> NDArray:
+    '''
+    Compute the distances between a point and every row of a matrix of points
+    (a sparse matrix is densified a few rows at a time, so that the distances are rounded as the dense ones)
+    :param point: Point involved in the distance computation
+    :param points: Matrix (dense or sparse) whose rows are the other points involved in the distance computation
+    :param distance_metric: Desired distance metric
+    :return: Vector holding the distance to each row of the matrix
+    '''
+    if distance_metric != 'manhattan' and distance_metric != 'euclidean':
+        raise Exception('\nUnsupported distance metric')
+
+    if issparse(points):
+        distances = empty(points.shape[0])
+        for start, block in get_dense_blocks(points):
+            distances[start:start + block.shape[0]] = compute_distances(point, block, distance_metric)
+        return distances
+
+    distances = zeros(points.shape[0])
+    # features are accumulated in order, as done by compute_distance, so that the sums are rounded the same way
+    for point_feature, feature in zip(asarray(point, dtype=float), points.T):
+        difference = feature - point_feature
+        distances += np_abs(difference) if distance_metric == 'manhattan' else difference * difference
+
+    return distances
+
+def compute_nearest_distances(
+    point: Vector[Any] | NDArray,
+    points: NDArray | csr_matrix,
+    distance_metric: String,
+    n: Integer
+) -> NDArray:
+    '''
+    Compute the distances between a point and the rows of a matrix of points that can be among the n nearest,
+    exactly as compute_distances does: the rows of a sparse matrix are first shortlisted with sparse_distances
+    :param point: Point involved in the distance computation
+    :param points: Matrix (dense or sparse) whose rows are the other points involved in the distance computation
+    :param distance_metric: Desired distance metric
+    :param n: Number of nearest rows to select
+    :return: Vector holding the distance to each row of the matrix (inf for the rows that are not shortlisted)
+    '''
+    if not issparse(points) or n >= points.shape[0]:
+        return compute_distances(point, points, distance_metric)
+
+    point = asarray(point, dtype=float)
+    approximations = sparse_distances(point, points, distance_metric)
+    margins = get_rounding_margins((point * point if distance_metric == 'euclidean' else np_abs(point)).sum(), points, distance_metric)
+
+    # a row as close as the n-th nearest one has an approximation within its margin of the n-th smallest upper end
+    threshold = partition(approximations + margins, n - 1)[n - 1]
+    candidates = flatnonzero(approximations - margins <= threshold)
+
+    distances = full(points.shape[0], inf)
+    distances[candidates] = compute_distances(point, points[candidates], distance_metric)
+    return distances
+
+def sparse_distances(
+    point: Vector[Any] | NDArray,
+    points: csr_matrix,
+    distance_metric: String
+) -> NDArray:
+    '''
+    Approximate the distances between a point and every row of a sparse matrix of points: the features
+    that are not stored contribute as a whole, and only the stored ones are visited. The sums are rounded
+    differently from the ones of compute_distances (within get_rounding_margins), so they only shortlist the rows
+    :param point: Point involved in the distance computation
+    :param points: Sparse matrix whose rows are the other points involved in the distance computation
+    :param distance_metric: Desired distance metric
+    :return: Vector holding the approximated distance to each row of the matrix
+    '''
+    point = asarray(point, dtype=float)
+    differences = point[points.indices] - points.data
+    if distance_metric == 'manhattan':
+        zero_distances = np_abs(point)
+        stored_distances = np_abs(differences)
+    elif distance_metric == 'euclidean':
+        zero_distances = point * point
+        stored_distances = differences * differences
+    else:
+        raise Exception('\nUnsupported distance metric')
+
+    distances = zero_distances.sum() + bincount(
+        get_stored_rows(points), stored_distances - zero_distances[points.indices], minlength=points.shape[0]
+    )
+    # the difference of the sums may be slightly negative for the points equal to the given one
+    return maximum(distances, 0.0)
+
+def interval_feature_bounds(
+    lower_bounds: NDArray | Real,
+    upper_bounds: NDArray | Real,
+    features: NDArray | Real,
+    distance_metric: String
+) -> Tuple[NDArray, NDArray]:
+    '''
+    Compute the bounds of the distance between a box and a point along single features
+    :param lower_bounds: Lower bound of the box along each feature
+    :param upper_bounds: Upper bound of the box along each feature
+    :param features: Value of the point along each feature
+    :param distance_metric: Desired distance metric
+    :return: Vectors holding the lower and the upper bound of the distance along each feature
+    '''
+    lower_difference = lower_bounds - features
+    upper_difference = upper_bounds - features
+    straddling = lower_difference * upper_difference < 0
+    if distance_metric == 'euclidean':
+        lower_difference = lower_difference ** 2
+        upper_difference = upper_difference ** 2
+    else:
+        lower_difference = np_abs(lower_difference)
+        upper_difference = np_abs(upper_difference)
+    return where(straddling, 0.0, minimum(lower_difference, upper_difference)), maximum(lower_difference, upper_difference)
+
+def interval_distance_bounds(
+    lower_bounds: NDArray,
+    upper_bounds: NDArray,
+    points: NDArray | csr_matrix,
+    distance_metric: String,
+    init: Real = 0.0
+) -> Tuple[NDArray, NDArray]:
+    '''
+    Compute the bounds of the distances between a box and every row of a matrix of points
+    (a sparse matrix is densified a few rows at a time, so that the bounds are rounded as the dense ones)
+    :param lower_bounds: Lower bound of the box along each feature
+    :param upper_bounds: Upper bound of the box along each feature
+    :param points: Matrix (dense or sparse) whose rows are the points involved in the distance computation
+    :param distance_metric: Desired distance metric
+    :param init: Initial value. The bounds are init + the bounds of the distance
+    :return: Vectors holding the lower and the upper bound of the distance to each row of the matrix
+    '''
+    if distance_metric != 'manhattan' and distance_metric != 'euclidean':
+        raise Exception('\nUnsupported distance metric')
+
+    if issparse(points):
+        lower_distances = empty(points.shape[0])
+        upper_distances = empty(points.shape[0])
+        for start, block in get_dense_blocks(points):
+            lower_distances[start:start + block.shape[0]], upper_distances[start:start + block.shape[0]] = \
+                interval_distance_bounds(lower_bounds, upper_bounds, block, distance_metric, init)
+        return lower_distances, upper_distances
+
+    lower_distances = full(points.shape[0], init, dtype=float)
+    upper_distances = full(points.shape[0], init, dtype=float)
+
+    # features are accumulated in order, as done by the Interval arithmetic
+    for lower_bound, upper_bound, feature in zip(lower_bounds, upper_bounds, points.T):
+        lower_difference, upper_difference = interval_feature_bounds(lower_bound, upper_bound, feature, distance_metric)
+        lower_distances += lower_difference
+        upper_distances += upper_difference
+
+    return lower_distances, upper_distances
+
+def interval_block_distance_bounds(
+    regions_lb: NDArray,
+    regions_ub: NDArray,
+    points: NDArray,
+    distance_metric: String
+) -> Tuple[NDArray, NDArray]:
+    '''
+    Compute the bounds of the distances between each box of a block and every row of a matrix of points,
+    rounded as the ones given by interval_distance_bounds for each box
+    :param regions_lb: Lower bounds of the boxes (one box per row)
+    :param regions_ub: Upper bounds of the boxes (one box per row)
+    :param points: Matrix whose rows are the points involved in the distance computation
+    :param distance_metric: Desired distance metric
+    :return: Matrices holding the lower and the upper bound of the distance of each box (row) to each point (column)
+    '''
+    if distance_metric != 'manhattan' and distance_metric != 'euclidean':
+        raise Exception('\nUnsupported distance metric')
+
+    lower_distances = zeros((regions_lb.shape[0], points.shape[0]))
+    upper_distances = zeros((regions_lb.shape[0], points.shape[0]))
+
+    # features are accumulated in order, as done by interval_distance_bounds
+    for lower_bounds, upper_bounds, feature in zip(regions_lb.T, regions_ub.T, points.T):
+        lower_difference, upper_difference = interval_feature_bounds(
+            lower_bounds[:, newaxis], upper_bounds[:, newaxis], feature, distance_metric
+        )
+        lower_distances += lower_difference
+        upper_distances += upper_difference
+
+    return lower_distances, upper_distances
+
+def sparse_interval_distance_bounds(
+    lower_bounds: NDArray,
+    upper_bounds: NDArray,
+    points: csr_matrix,
+    distance_metric: String
+) -> Tuple[NDArray, NDArray]:
+    '''
+    Compute bounds that contain the ones given by interval_distance_bounds for a box and every row of a sparse matrix
+    of points: the bounds along the features that are not stored are the same for every point (0 for the ones the box
+    fixes to 0), so they are added up once, and only the stored features are visited. The sums are rounded differently
+    from the ones accumulated in order, hence they are widened by get_rounding_margins and only prune the rows
+    :param lower_bounds: Lower bound of the box along each feature
+    :param upper_bounds: Upper bound of the box along each feature
+    :param points: Sparse matrix whose rows are the points involved in the distance computation
+    :param distance_metric: Desired distance metric
+    :return: Vectors holding the lower and the upper bound of the distance to each row of the matrix
+    '''
+    if distance_metric != 'manhattan' and distance_metric != 'euclidean':
+        raise Exception('\nUnsupported distance metric')
+
+    lower_bounds = asarray(lower_bounds, dtype=float)
+    upper_bounds = asarray(upper_bounds, dtype=float)
+    zero_lower_distances, zero_upper_distances = interval_feature_bounds(lower_bounds, upper_bounds, 0.0, distance_metric)
+    stored_lower_distances, stored_upper_distances = interval_feature_bounds(
+        lower_bounds[points.indices], upper_bounds[points.indices], points.data, distance_metric
+    )
+
+    rows = get_stored_rows(points)
+    lower_distances = zero_lower_distances.sum() + bincount(
+        rows, stored_lower_distances - zero_lower_distances[points.indices], minlength=points.shape[0]
+    )
+    upper_distances = zero_upper_distances.sum() + bincount(
+        rows, stored_upper_distances - zero_upper_distances[points.indices], minlength=points.shape[0]
+    )
+
+    # the largest term of the box along each feature is the one of the bound farther from 0
+    margins = get_rounding_margins(zero_upper_distances.sum(), points, distance_metric)
+    return lower_distances - margins, upper_distances + margins
+
+def raf_feature_lower_bounds(
+    differences: NDArray,
+    radii: NDArray,
+    distance_metric: String
+) -> NDArray:
+    '''
+    Compute the lower bound of the RAF distance along each feature, as built by the RAF classifier
+    :param differences: Absolute difference between the center of the box and the point along each feature
+    :param radii: Radius of the box along each feature
+    :param distance_metric: Desired distance metric
+    :return: Lower bound of the distance along each feature
+    '''
+    if distance_metric == 'euclidean':
+        return differences * differences - 2 * differences * radii - radii * radii
+    # the relaxation of |x| is exact outside the box, and equal to x^2 / a - |x| inside it
+    straddling = differences < radii
+    return where(straddling, differences * differences / where(straddling, radii, 1.0) - differences, differences - radii)
+
+def raf_distance_bounds(
+    lower_bounds: NDArray,
+    upper_bounds: NDArray,
+    points: NDArray,
+    distance_metric: String
+) -> Tuple[NDArray, NDArray]:
+    '''
+    Compute the bounds of the RAF distances between a box and every row of a matrix of points, without building the RAFs
+    :param lower_bounds: Lower bound of the box along each feature
+    :param upper_bounds: Upper bound of the box along each feature
+    :param points: Matrix whose rows are the points involved in the distance computation
+    :param distance_metric: Desired distance metric
+    :return: Vectors holding the lower and the upper bound of the distance to each row of the matrix
+    '''
+    if distance_metric != 'manhattan' and distance_metric != 'euclidean':
+        raise Exception('\nUnsupported distance metric')
+
+    centers = 0.5 * (lower_bounds + upper_bounds)
+    radii = 0.5 * (upper_bounds - lower_bounds)
+    differences = np_abs(centers - points)
+
+    lower_distances = raf_feature_lower_bounds(differences, radii, distance_metric).sum(axis=1)
+    upper_distances = differences + radii
+    if distance_metric == 'euclidean':
+        upper_distances = upper_distances ** 2
+    return lower_distances, upper_distances.sum(axis=1)
+
+def interval_box_lower_bound(
+    lower_bounds: NDArray,
+    upper_bounds: NDArray,
+    box_lower_bounds: NDArray,
+    box_upper_bounds: NDArray,
+    distance_metric: String
+) -> Real:
+    '''
+    Compute a lower bound of the interval distance between a box and any point of another box
+    :param lower_bounds: Lower bound of the box along each feature
+    :param upper_bounds: Upper bound of the box along each feature
+    :param box_lower_bounds: Lower bound of the box containing the points along each feature
+    :param box_upper_bounds: Upper bound of the box containing the points along each feature
+    :param distance_metric: Desired distance metric
+    :return: Lower bound of the distance
+    '''
+    gaps = maximum(0.0, maximum(box_lower_bounds - upper_bounds, lower_bounds - box_upper_bounds))
+    return (gaps * gaps).sum() if distance_metric == 'euclidean' else gaps.sum()
+
+def raf_box_lower_bound(
+    lower_bounds: NDArray,
+    upper_bounds: NDArray,
+    box_lower_bounds: NDArray,
+    box_upper_bounds: NDArray,
+    distance_metric: String
+) -> Real:
+    '''
+    Compute a lower bound of the RAF distance between a box and any point of another box
+    :param lower_bounds: Lower bound of the box along each feature
+    :param upper_bounds: Upper bound of the box along each feature
+    :param box_lower_bounds: Lower bound of the box containing the points along each feature
+    :param box_upper_bounds: Upper bound of the box containing the points along each feature
+    :param distance_metric: Desired distance metric
+    :return: Lower bound of the distance
+    '''
+    centers = 0.5 * (lower_bounds + upper_bounds)
+    radii = 0.5 * (upper_bounds - lower_bounds)
+    nearest = maximum(0.0, maximum(box_lower_bounds - centers, centers - box_upper_bounds))
+    farthest = maximum(np_abs(centers - box_lower_bounds), np_abs(centers - box_upper_bounds))
+
+    # along each feature the lower bound only decreases up to its minimum, then only increases
+    minimum_at = radii if distance_metric == 'euclidean' else 0.5 * radii
+    differences = minimum(maximum(minimum_at, nearest), farthest)
+    return raf_feature_lower_bounds(differences, radii, distance_metric).sum()
+
 def manhattan_distance(
     point1: Vector[Any],
     point2: Vector[Any],
@@ -15,13 +15,67 @@
 # =============================================================================
 
 from configparser import ConfigParser
-from typing import Type
+from os.path import abspath, exists, getmtime, join
+from typing import Tuple, Type
 
-from robustness import Dataset, Boolean, Number, Integer, Literal, Map, Real, Set, String, Vector
+from robustness import Dataset, SparseDataset, Boolean, Number, Integer, Literal, Map, Real, Set, String, Vector
 from robustness.perturbations import Hyperrectangle, Linfinity, NoiseCat
 from robustness.utils import Error
 from robustness.utils.loaders import LoaderFactory
 
+# training and test sets already loaded (with the categories found by the loader),
+# shared by the configurations read by the same process
+datasets_cache = {}
+
+def get_datasets_key(
+    datasets_dir_path: String,
+    dataset_format: String,
+    training_set_name: String,
+    test_set_name: String,
+    random: Boolean,
+    random_state: Integer | None,
+    num_test: Integer | None,
+    stream_test_set: Boolean,
+    feature_range: Map[Literal, Tuple[Real, Real]],
+    categorical_indexes: Vector[Integer],
+    categories_list: Vector[Vector[Literal]]
+) -> Tuple | None:
+    '''
+    Return the key identifying the training and test sets loaded with some settings
+    :param datasets_dir_path: Path to the datasets directory
+    :param dataset_format: Format of the datasets
+    :param training_set_name: Name and extension of the training set
+    :param test_set_name: Name and extension of the test set
+    :param random: Whether or not to randomize the selection of the test points
+    :param random_state: Random number generation for sampling the test points
+    :param num_test: Number of test points to sample, if random (all if None)
+    :param stream_test_set: Whether the test set is read a chunk at a time
+    :param feature_range: Minimum and maximum value of the numerical features of the points
+    :param categorical_indexes: Indexes of the categorical features
+    :param categories_list: Holds the categories expected in the every categorical feature
+    :return: The key, or None if loading the datasets again can give different sets
+    '''
+    if random and random_state is None:
+        return None
+
+    # the modification time makes a file changed between two configurations be loaded again
+    files = []
+    for name in [training_set_name, test_set_name]:
+        path = abspath(join(datasets_dir_path, name))
+        files.append((path, getmtime(path) if exists(path) else None))
+
+    return (
+        dataset_format,
+        *files,
+        random,
+        random_state,
+        num_test if random else None,
+        stream_test_set,
+        tuple(sorted(feature_range.items(), key=str)),
+        tuple(categorical_indexes),
+        tuple(tuple(categories) for categories in categories_list)
+    )
+
 def read_params(input_file_path: String) -> Map[String, Dataset | Integer | String | Vector[Number]]:
     '''
     Read the data contained in the input file
@@ -142,18 +196,61 @@ def read_params(input_file_path: String) -> Map[String, Dataset | Integer | Stri
     if dataset_format != 'csv' and dataset_format != 'libsvm' and dataset_format != 'svmlight':
         Error('Attribute \'dataset_format\' in \'{}\' can only be \'csv\', \'libsvm\' or \'svmlight\''.format(input_file_path))
 
-    training_set, test_set = LoaderFactory().create(
-        get_string('dataset_format', required=True)
-    ).load(
+    loader = LoaderFactory().create(dataset_format)
+
+    stream_test_set = get_boolean('stream_test_set', empty_is_true=False, required=False)
+
+    # when random, only the test points to verify are sampled, unless ties are skipped and more may be needed
+    num_samples = None
+    if not get_boolean('skip_ties', empty_is_true=False, required=False):
+        num_samples = get_pos_integer('num_test', required=False)
+
+    datasets_key = get_datasets_key(
+        loader.get_datasets_dir_path(),
+        dataset_format,
         get_string('training_set', required=True),
         get_string('test_set', required=True),
         get_boolean('random', required=True),
         get_pos_integer('random_state', required=False),
+        num_samples,
+        stream_test_set,
         feature_range,
         categorical_indexes,
         categories_list
     )
 
+    if datasets_key is not None and datasets_key in datasets_cache:
+        training_set, test_set, loaded_categories_list = datasets_cache[datasets_key]
+        # the loader fills in the categories that are not given, and the perturbation depends on them
+        for categories, loaded_categories in zip(categories_list, loaded_categories_list):
+            categories[:] = loaded_categories
+    else:
+        if stream_test_set:
+            # the test points are read from the file, a chunk at a time, whenever they are verified
+            training_set, test_set = loader.load_streaming(
+                get_string('training_set', required=True),
+                get_string('test_set', required=True),
+                get_boolean('random', required=True),
+                get_pos_integer('random_state', required=False),
+                num_samples,
+                feature_range,
+                categorical_indexes,
+                categories_list
+            )
+        else:
+            training_set, test_set = loader.load(
+                get_string('training_set', required=True),
+                get_string('test_set', required=True),
+                get_boolean('random', required=True),
+                get_pos_integer('random_state', required=False),
+                num_samples,
+                feature_range,
+                categorical_indexes,
+                categories_list
+            )
+        if datasets_key is not None:
+            datasets_cache[datasets_key] = (training_set, test_set, [[*categories] for categories in categories_list])
+
     for feature_index in categorical_indexes:
         if feature_index >= training_set.num_features():
             Error('Attribute \'categorical_features\' in \'{}\' can only contain positive integers ranging in [1, {}]'.format(input_file_path, training_set.num_features()))
@@ -187,6 +284,7 @@ def read_params(input_file_path: String) -> Map[String, Dataset | Integer | Stri
         ]
 
     classifier = 'concrete'
+    sweep_epsilons = None
 
     if perturbation_name == 'hyper_rect':
         epsilons = get_vector('epsilons', type=Real)
@@ -208,9 +306,21 @@ def read_params(input_file_path: String) -> Map[String, Dataset | Integer | Stri
         print('Epsilons:\t {}\n'.format(epsilons))
 
     elif perturbation_name == 'l_inf':
-        epsilon = get_real('epsilon')
-        if epsilon < 0 or epsilon > 1.0:
-            Error('Attribute \'epsilon\' in \'{}\' can only be a real number ranging in [0, 1]'.format(input_file_path))
+        if get_string('epsilons', required=False) != '':
+            if get_string('epsilon', required=False) != '':
+                Error('Attributes \'epsilon\' and \'epsilons\' in \'{}\' cannot be used together'.format(input_file_path))
+
+            # sweep, verified from the largest epsilon down
+            sweep_epsilons = sorted(Set(get_vector('epsilons', type=Real)), reverse=True)
+            for epsilon in sweep_epsilons:
+                if epsilon <= 0 or epsilon > 1.0:
+                    Error('Attribute \'epsilons\' in \'{}\' can only contain real numbers ranging in (0, 1]'.format(input_file_path))
+            epsilon = sweep_epsilons[0]
+
+        else:
+            epsilon = get_real('epsilon')
+            if epsilon < 0 or epsilon > 1.0:
+                Error('Attribute \'epsilon\' in \'{}\' can only be a real number ranging in [0, 1]'.format(input_file_path))
 
         if epsilon > 0.0:
             classifier = 'abstract'
@@ -221,7 +331,10 @@ def read_params(input_file_path: String) -> Map[String, Dataset | Integer | Stri
             start_perturbation_from
         )
         print('\nPerturbation:\t {}'.format(perturbation_name))
-        print('Epsilon:\t {}\n'.format(epsilon))
+        if sweep_epsilons is None:
+            print('Epsilon:\t {}\n'.format(epsilon))
+        else:
+            print('Epsilons:\t {}\n'.format(sweep_epsilons))
 
     elif perturbation_name == 'noise-cat':
         noise_type_name = get_string('noise_type', required=True)
@@ -292,7 +405,13 @@ def read_params(input_file_path: String) -> Map[String, Dataset | Integer | Stri
     #-----------------------------------------------------------------------------------------------------------------
     # values of 'k'
 
-    k_values = get_vector('k', type=Integer, required=True)
+    # a range 'a-b' stands for every k from a to b
+    k_values = []
+    for value in get_string('k', required=True).split():
+        first, _, last = value.partition('-')
+        if not first.isdigit() or (last != '' and not last.isdigit()) or Integer(first) > Integer(last or first):
+            Error('Attribute \'k\' in \'{}\' can only contain positive integers other than 0 or ranges of them'.format(input_file_path))
+        k_values.extend(range(Integer(first), Integer(last or first) + 1))
     for k in k_values:
         if k <= 0 or k > training_set.num_points():
             Error('Attribute \'k\' in \'{}\' can only be an integer ranging in [1, {}]'.format(input_file_path, training_set.num_points()))
@@ -312,6 +431,31 @@ def read_params(input_file_path: String) -> Map[String, Dataset | Integer | Stri
         abstraction = 'interval'
     if abstraction != 'interval' and abstraction != 'raf':
         Error('Attribute \'abstraction\' in \'{}\' can only be \'interval\' or \'raf\''.format(input_file_path))
+    if abstraction == 'raf' and classifier != 'concrete' and isinstance(training_set, SparseDataset):
+        Error('Attribute \'abstraction\' in \'{}\' can only be \'interval\' on a sparse dataset'.format(input_file_path))
+
+    #-----------------------------------------------------------------------------------------------------------------
+    # pruning of the training points
+
+    pruning = get_string('pruning', required=False)
+    if not pruning:
+        pruning = 'none'
+    if pruning != 'none' and pruning != 'kd_tree' and pruning != 'quickselect':
+        Error('Attribute \'pruning\' in \'{}\' can only be \'none\', \'kd_tree\' or \'quickselect\''.format(input_file_path))
+    if pruning == 'kd_tree' and isinstance(training_set, SparseDataset):
+        Error('Attribute \'pruning\' in \'{}\' can only be \'none\' or \'quickselect\' on a sparse dataset'.format(input_file_path))
+
+    #-----------------------------------------------------------------------------------------------------------------
+    # certified radius
+
+    certified_radius = get_boolean('certified_radius', empty_is_true=False, required=False)
+    radius_precision = get_real('radius_precision', required=False)
+    if radius_precision is None:
+        radius_precision = 0.001
+    if radius_precision <= 0:
+        Error('Attribute \'radius_precision\' in \'{}\' can only be a positive real number'.format(input_file_path))
+    if certified_radius and (perturbation_name != 'l_inf' or sweep_epsilons is not None or classifier == 'concrete'):
+        Error('Attribute \'certified_radius\' in \'{}\' requires perturbation = l_inf with a positive epsilon'.format(input_file_path))
 
     return {
         'classifier': classifier,
@@ -324,4 +468,9 @@ def read_params(input_file_path: String) -> Map[String, Dataset | Integer | Stri
         'skip_ties': get_boolean('skip_ties', empty_is_true=False, required=False),
         'save_in': get_string('save_in', required=False),
         'abstraction': abstraction,
+        'pruning': pruning,
+        'sweep_epsilons': sweep_epsilons,
+        'certified_radius': certified_radius,
+        'radius_precision': radius_precision,
+        'datasets_key': datasets_key,
     }
\ No newline at end of file
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# File: kd_tree.py
+# Updated: 02/05/2023
+# =============================================================================
+'''Define a KD-tree over a matrix of points'''
+# =============================================================================
+# Dependencies:
+#   ../base.py
+# =============================================================================
+
+from heapq import heappop, heappush
+from nptyping import NDArray
+from numpy import argpartition, arange, array, concatenate, maximum
+from typing import Callable
+
+from robustness import Integer, Real
+
+class KDTree:
+    '''Represent a KD-tree whose nodes store the bounding box of their points'''
+
+    def __init__(self,
+        points: NDArray,
+        leaf_size: Integer = 32
+    ) -> None:
+        '''
+        Let the class initialize the object's attributes
+        :param points: Matrix whose rows are the points to index
+        :param leaf_size: Maximum number of points in a leaf
+        '''
+        self.__indexes = arange(points.shape[0])
+        self.__lower_bounds = []
+        self.__upper_bounds = []
+        self.__ranges = []
+        self.__children = []
+
+        # nodes are built in preorder, splitting the widest side of the box at the median
+        stack = [(0, points.shape[0], -1, 0)]
+        while len(stack) > 0:
+            start, end, parent, side = stack.pop()
+            node = len(self.__ranges)
+            if parent >= 0:
+                self.__children[parent][side] = node
+
+            node_points = points[self.__indexes[start:end]]
+            self.__lower_bounds.append(node_points.min(axis=0))
+            self.__upper_bounds.append(node_points.max(axis=0))
+            self.__ranges.append((start, end))
+            self.__children.append([-1, -1])
+
+            widths = self.__upper_bounds[node] - self.__lower_bounds[node]
+            if end - start <= leaf_size or widths.max() == 0.0:
+                continue
+
+            middle = (end - start) // 2
+            order = argpartition(node_points[:, widths.argmax()], middle)
+            self.__indexes[start:end] = self.__indexes[start:end][order]
+            stack.append((start + middle, end, node, 1))
+            stack.append((start, start + middle, node, 0))
+
+        self.__lower_bounds = array(self.__lower_bounds)
+        self.__upper_bounds = array(self.__upper_bounds)
+
+    def get_size(self) -> Integer:
+        '''
+        Return the number of points in the KD-tree
+        :return: Number of indexed points
+        '''
+        return self.__indexes.shape[0]
+
+    def query(self,
+        node_lower_bound: Callable[[NDArray, NDArray], Real],
+        threshold: Real
+    ) -> NDArray:
+        '''
+        Return the points lying in the leaves that may contain a point whose bound does not exceed a threshold
+        :param node_lower_bound: Function returning, for the box of a node, a lower bound valid for all its points
+        :param threshold: Maximum bound of interest
+        :return: Indexes of the points (sorted)
+        '''
+        leaves = []
+        stack = [0]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node_lower_bound(self.__lower_bounds[node], self.__upper_bounds[node]) > threshold:
+                continue
+            left, right = self.__children[node]
+            if left < 0:
+                start, end = self.__ranges[node]
+                leaves.append(self.__indexes[start:end])
+            else:
+                stack.extend([right, left])
+
+        if len(leaves) == 0:
+            return array([], dtype=int)
+        indexes = concatenate(leaves)
+        indexes.sort()
+        return indexes
+
+    def get_nearby(self,
+        point: NDArray,
+        n: Integer
+    ) -> NDArray:
+        '''
+        Return at least n points taken from the leaves whose box is the closest to a point
+        :param point: Target point
+        :param n: Minimum number of points to return
+        :return: Indexes of the points
+        '''
+        leaves = []
+        num_points = 0
+        heap = [(0.0, 0)]
+        while len(heap) > 0 and num_points < n:
+            _, node = heappop(heap)
+            left, right = self.__children[node]
+            if left < 0:
+                start, end = self.__ranges[node]
+                leaves.append(self.__indexes[start:end])
+                num_points += end - start
+                continue
+            for child in [left, right]:
+                gaps = maximum(0.0, maximum(self.__lower_bounds[child] - point, point - self.__upper_bounds[child]))
+                heappush(heap, ((gaps * gaps).sum(), child))
+
+        return concatenate(leaves)
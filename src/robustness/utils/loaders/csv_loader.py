@@ -11,26 +11,40 @@
 # =============================================================================
 
 from __future__ import annotations
+from io import BytesIO
 from nptyping import NDArray
-from numpy import array, hsplit
+from numpy import array, concatenate, diff, flatnonzero, frombuffer, hsplit, int64, isin, minimum, searchsorted, uint8, zeros
 from os.path import join
 from pandas import read_csv
-from typing import Tuple
+from typing import Iterator, Tuple
 
 from .loader import Loader
-from robustness.base import String
+from robustness.base import Boolean, Set, String
+
+# the values that read_csv reads as missing by default
+MISSING_VALUES = Set([
+    b'', b'#N/A', b'#N/A N/A', b'#NA', b'-1.#IND', b'-1.#QNAN', b'-NaN', b'-nan', b'1.#IND', b'1.#QNAN', b'<NA>',
+    b'N/A', b'NA', b'NULL', b'NaN', b'n/a', b'nan', b'null'
+])
+# the bytes a missing value can start and end with, possibly quoted
+MISSING_FIRST_BYTES = frombuffer(b'"#-1<Nn', dtype=uint8)
+MISSING_LAST_BYTES = frombuffer(b'"ADLN>aln', dtype=uint8)
+# the bytes a line holding nothing else is blank with
+WHITESPACE_BYTES = frombuffer(b' \t\n\r\f\v', dtype=uint8)
 
 class CsvLoader(Loader):
     '''Load datasets in the csv format'''
 
     def load_from_file(self,
         training_set_name: String,
-        test_set_name: String = ''
+        test_set_name: String = '',
+        sparse: Boolean = False
     ) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
         '''
         Load points and labels of the training and test sets
         :param training_set_name: Name and extension of the training set to load
         :param test_set_name: Name and extension of the test set to load (if available)
+        :param sparse: Whether the points can be returned as sparse matrices (never the case for this format)
         :return: Points and labels of the training and test sets
         '''
         super().load_from_file(training_set_name, test_set_name)
@@ -54,4 +68,78 @@ class CsvLoader(Loader):
         )
         test_labels = test_labels.flatten()
         
-        return training_points, training_labels, test_points, test_labels
\ No newline at end of file
+        return training_points, training_labels, test_points, test_labels
+
+    def read_chunks(self,
+        set_name: String
+    ) -> Iterator[Tuple[NDArray, NDArray]]:
+        '''
+        Read points and labels of a set a chunk at a time, as load_from_file reads them
+        :param set_name: Name and extension of the set to read
+        :return: Points and labels of each chunk, as long as the chunk size set in the settings at most
+        '''
+        for chunk in read_csv(
+            join(self.get_datasets_dir_path(), set_name),
+            header=None,
+            chunksize=self.get_chunk_size()
+        ):
+            labels, points = hsplit(chunk.dropna().to_numpy(), [1])
+            if points.shape[0] > 0:
+                yield points, labels.flatten()
+
+    def index_lines(self,
+        set_name: String
+    ) -> NDArray:
+        '''
+        Find the lines of a set that hold a point with a raw scan of the file, without parsing them
+        (the blank lines are skipped, as read_csv does, and so are the ones with a missing value, as dropna does)
+        :param set_name: Name and extension of the set to scan
+        :return: Byte offset in the file of each line holding a point, in the order of the file
+        '''
+        num_fields = None
+
+        def find_points(block: bytes, starts: NDArray) -> NDArray:
+            nonlocal num_fields
+            data = frombuffer(block, dtype=uint8)
+            # every field ends with a separator, and the ones ending with a newline are the last of their line
+            separators = flatnonzero((data == ord(',')) | (data == ord('\n')))
+            field_starts = concatenate(([0], separators[:-1] + 1))
+            field_ends = separators - ((data[separators] == ord('\n')) & (data[separators - 1] == ord('\r')))
+            num_line_fields = diff(concatenate(([-1], flatnonzero(data[separators] == ord('\n')))))
+
+            # the first line sets the number of fields, and the shorter lines miss the last ones
+            if num_fields is None:
+                filled = flatnonzero(~isin(data, WHITESPACE_BYTES))
+                if len(filled) == 0:
+                    return zeros(len(starts), dtype=bool)
+                num_fields = int(num_line_fields[searchsorted(starts, filled[0], side='right') - 1])
+            points = num_line_fields >= num_fields
+
+            # only the fields that can be missing values are read
+            lengths = field_ends - field_starts
+            first_bytes = data[minimum(field_starts, len(data) - 1)]
+            last_bytes = data[field_ends - 1]
+            candidates = flatnonzero((lengths == 0) | (
+                (lengths <= 10) & isin(first_bytes, MISSING_FIRST_BYTES) & isin(last_bytes, MISSING_LAST_BYTES)
+            ))
+            missing = [
+                field_start for field_start, field_end in zip(field_starts[candidates].tolist(), field_ends[candidates].tolist())
+                    if block[field_start:field_end].strip(b'"') in MISSING_VALUES
+            ]
+            points[searchsorted(starts, array(missing, dtype=int64), side='right') - 1] = False
+            return points
+
+        return self.scan_lines(set_name, find_points)
+
+    def parse_lines(self,
+        set_name: String,
+        lines: bytes
+    ) -> Tuple[NDArray, NDArray]:
+        '''
+        Parse some lines of a set, as read_chunks parses a chunk
+        :param set_name: Name and extension of the set the lines belong to
+        :param lines: Lines of the file, joined
+        :return: Points and labels held by the lines
+        '''
+        labels, points = hsplit(read_csv(BytesIO(lines), header=None).dropna().to_numpy(), [1])
+        return points, labels.flatten()
@@ -12,35 +12,60 @@
 # =============================================================================
 
 from __future__ import annotations
+from io import BytesIO
+from itertools import islice
 from nptyping import NDArray
-from numpy import array
+from numpy import array, flatnonzero, frombuffer, int64, maximum, ones, searchsorted, uint8, zeros
 from os.path import join
+from re import compile
+from scipy.sparse import csr_matrix
 from sklearn.datasets import load_svmlight_file, load_svmlight_files
-from typing import Tuple
+from typing import Iterator, Tuple
 
 from .loader import Loader
-from robustness.base import String
+from robustness.base import Boolean, Integer, Real, String, Vector
+
+# points whose fraction of stored features is below this are kept sparse, when allowed
+SPARSE_DENSITY = 0.1
+# a comment, which lasts up to the end of the line
+COMMENT = compile(rb'#[^\n]*')
+# a line holding nothing but whitespace and a comment, matched from the newline before it
+EMPTY_LINE = compile(rb'\n[ \t\r\f\v]*(?:#[^\n]*)?(?=\n)')
 
 class LibsvmLoader(Loader):
     '''Load datasets in the svmlight / libsvm format'''
 
+    def __init__(self) -> None:
+        '''
+        Let the class initialize the object's attributes
+        '''
+        super().__init__()
+        # how the features of the sets read a chunk at a time are numbered, in the form {set name: (offset, number)}
+        self.__layouts = {}
+        # what the raw scan of the sets found, in the form {set name: (offsets of the lines, range of the features)}
+        self.__scans = {}
+
     def load_from_file(self,
         training_set_name: String,
-        test_set_name: String = ''
-    ) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
+        test_set_name: String = '',
+        sparse: Boolean = False
+    ) -> Tuple[NDArray | csr_matrix, NDArray, NDArray | csr_matrix, NDArray]:
         '''
         Load points and labels of the training and test sets
         :param training_set_name: Name and extension of the training set to load
         :param test_set_name: Name and extension of the test set to load (if available)
+        :param sparse: Whether the points can be returned as sparse matrices, which happens
+            when the training points are sparse enough
         :return: Points and labels of the training and test sets
         '''
-        super().load_from_file(training_set_name, test_set_name)
+        super().load_from_file(training_set_name, test_set_name, sparse)
 
         if test_set_name == '' or test_set_name == training_set_name:
             training_points, training_labels = load_svmlight_file(
                 join(self.get_datasets_dir_path(), training_set_name)
             )
-            training_points = training_points.toarray()
+            if not sparse or self.__get_density(training_points) >= SPARSE_DENSITY:
+                training_points = training_points.toarray()
 
             return training_points, training_labels, array([]), array([])
         
@@ -48,7 +73,183 @@ class LibsvmLoader(Loader):
             join(self.get_datasets_dir_path(), training_set_name),
             join(self.get_datasets_dir_path(), test_set_name)
         ])
-        training_points = training_points.toarray()
-        test_points = test_points.toarray()
+        if not sparse or self.__get_density(training_points) >= SPARSE_DENSITY:
+            training_points = training_points.toarray()
+            test_points = test_points.toarray()
+
+        return training_points, training_labels, test_points, test_labels
+
+    def load_training_from_file(self,
+        training_set_name: String,
+        test_set_name: String,
+        sparse: Boolean = False
+    ) -> Tuple[NDArray | csr_matrix, NDArray]:
+        '''
+        Load points and labels of the training set only, laid out as load_from_file lays them out with the test set
+        :param training_set_name: Name and extension of the training set to load
+        :param test_set_name: Name and extension of the test set that is read later
+        :param sparse: Whether the points can be returned as a sparse matrix, which happens
+            when the training points are sparse enough
+        :return: Points and labels of the training set
+        '''
+        super().load_from_file(training_set_name, test_set_name, sparse)
+
+        # the features as numbered in the files, which are laid out once the test set has been scanned too
+        training_points, training_labels = load_svmlight_file(
+            join(self.get_datasets_dir_path(), training_set_name),
+            zero_based=True
+        )
+        self.index_lines(test_set_name)
+        self.__set_layout(test_set_name, [
+            [self.__get_index_range(training_points)],
+            [self.__scans[test_set_name][1]]
+        ])
+        training_points = self.__lay_out(training_points, test_set_name)
+        if not sparse or self.__get_density(training_points) >= SPARSE_DENSITY:
+            training_points = training_points.toarray()
+
+        return training_points, training_labels
 
-        return training_points, training_labels, test_points, test_labels
\ No newline at end of file
+    def read_chunks(self,
+        set_name: String
+    ) -> Iterator[Tuple[csr_matrix, NDArray]]:
+        '''
+        Read points and labels of a set a chunk at a time, as load_from_file reads them
+        (along with the training set, if the set is the test set passed to load_training_from_file)
+        :param set_name: Name and extension of the set to read
+        :return: Points and labels of each chunk, as long as the chunk size set in the settings at most
+        '''
+        for points, labels in self.__read_numbered_chunks(set_name):
+            yield self.__lay_out(points, set_name), labels
+
+    def index_lines(self,
+        set_name: String
+    ) -> NDArray:
+        '''
+        Find the lines of a set that hold a point with a raw scan of the file, without parsing them
+        (the blank lines and the comments are skipped, as load_svmlight_file does), along with the range
+        of the features they store: the file is scanned once
+        :param set_name: Name and extension of the set to scan
+        :return: Byte offset in the file of each line holding a point, in the order of the file
+        '''
+        if set_name not in self.__scans:
+            index_range = None
+
+            def find_points(block: bytes, starts: NDArray) -> NDArray:
+                nonlocal index_range
+                # the index of a stored feature is made of the digits right before a colon
+                data = frombuffer(COMMENT.sub(b'', block) if b'#' in block else block, dtype=uint8)
+                colons = flatnonzero(data == ord(':'))
+                indexes = zeros(len(colons), dtype=int64)
+                digits = ones(len(colons), dtype=bool)
+                stored = zeros(len(colons), dtype=bool)
+                shift, scale = 1, 1
+                while digits.any():
+                    values = data[maximum(colons - shift, 0)]
+                    digits &= (colons >= shift) & (values >= ord('0')) & (values <= ord('9'))
+                    indexes[digits] += (values[digits] - ord('0')).astype(int64) * scale
+                    if shift == 1:
+                        stored = digits.copy()
+                    shift, scale = shift + 1, scale * 10
+                if stored.any():
+                    lowest, highest = indexes[stored].min(), indexes[stored].max()
+                    if index_range is not None:
+                        lowest, highest = min(lowest, index_range[0]), max(highest, index_range[1])
+                    index_range = (lowest, highest)
+
+                points = ones(len(starts), dtype=bool)
+                empty_lines = [match.start() for match in EMPTY_LINE.finditer(b'\n' + block)]
+                points[searchsorted(starts, array(empty_lines, dtype=int64), side='right') - 1] = False
+                return points
+
+            offsets = self.scan_lines(set_name, find_points)
+            self.__scans[set_name] = (offsets, index_range)
+        return self.__scans[set_name][0]
+
+    def parse_lines(self,
+        set_name: String,
+        lines: bytes
+    ) -> Tuple[csr_matrix, NDArray]:
+        '''
+        Parse some lines of a set, as read_chunks parses a chunk
+        :param set_name: Name and extension of the set the lines belong to
+        :param lines: Lines of the file, joined
+        :return: Points and labels held by the lines
+        '''
+        points, labels = load_svmlight_file(BytesIO(lines), zero_based=True)
+        return self.__lay_out(points, set_name), labels
+
+    def __read_numbered_chunks(self,
+        set_name: String
+    ) -> Iterator[Tuple[csr_matrix, NDArray]]:
+        '''
+        Read points and labels of a set a chunk at a time, with the features as numbered in the file
+        :param set_name: Name and extension of the set to read
+        :return: Points and labels of each chunk
+        '''
+        with open(join(self.get_datasets_dir_path(), set_name), 'rb') as file:
+            while True:
+                lines = [*islice(file, self.get_chunk_size())]
+                if len(lines) == 0:
+                    return
+                points, labels = load_svmlight_file(BytesIO(b''.join(lines)), zero_based=True)
+                if points.shape[0] > 0:
+                    yield points, labels
+
+    def __get_index_range(self,
+        points: csr_matrix
+    ) -> Tuple[Integer, Integer] | None:
+        '''
+        Return the lowest and the highest feature stored in some points
+        :param points: Points with the features as numbered in the file
+        :return: Lowest and highest feature, or None if no feature is stored
+        '''
+        if points.nnz == 0:
+            return None
+        return points.indices.min(), points.indices.max()
+
+    def __set_layout(self,
+        set_name: String,
+        index_ranges: Vector[Vector[Tuple[Integer, Integer] | None]]
+    ) -> None:
+        '''
+        Number the features as load_svmlight_files does: from 1, unless some file stores a feature 0
+        or stores no feature at all, and up to the highest feature stored
+        :param set_name: Name and extension of the set to lay out
+        :param index_ranges: Range of the features stored in each chunk, for each file read along with the set
+        '''
+        index_ranges = [[index_range for index_range in ranges if index_range is not None] for ranges in index_ranges]
+        offset = 0
+        if all(len(ranges) > 0 and min(lowest for lowest, _ in ranges) > 0 for ranges in index_ranges):
+            offset = 1
+        num_features = max([highest - offset for ranges in index_ranges for _, highest in ranges], default=0) + 1
+        self.__layouts[set_name] = (offset, num_features)
+
+    def __lay_out(self,
+        points: csr_matrix,
+        set_name: String
+    ) -> csr_matrix:
+        '''
+        Renumber the features of points read from the files as the layout of a set says
+        (the layout of a set read on its own follows from the raw scan of its file)
+        :param points: Points with the features as numbered in the file
+        :param set_name: Name and extension of the set whose layout applies
+        :return: Points with the features of the layout
+        '''
+        if set_name not in self.__layouts:
+            self.index_lines(set_name)
+            self.__set_layout(set_name, [[self.__scans[set_name][1]]])
+        offset, num_features = self.__layouts[set_name]
+        points = csr_matrix((points.data, points.indices - offset, points.indptr), shape=(points.shape[0], num_features))
+        points.sort_indices()
+        return points
+
+    def __get_density(self,
+        points: csr_matrix
+    ) -> Real:
+        '''
+        Return the fraction of the features of the points that are stored
+        :param points: Sparse points
+        :return: Density of the points
+        '''
+        return points.nnz / max(points.shape[0] * points.shape[1], 1)
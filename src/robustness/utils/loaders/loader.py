@@ -1,29 +1,47 @@
 # -*- coding: utf-8 -*-
 # =============================================================================
 # File: loader.py
-# Updated: 05/11/2022
+# Updated: 02/05/2023
 # =============================================================================
 '''Allow to load different dataset formats'''
 # =============================================================================
 # Dependencies:
 #   ../error.py
 #   ../preprocessing.py
+#   ../sampling.py
 #   ../../base.py
 #   ../../dataset.py
+#   ../../sparse_dataset.py
+#   ../../streaming_dataset.py
 # =============================================================================
 
 from __future__ import annotations
 from abc import abstractmethod
 from configparser import ConfigParser
+from hashlib import sha256
+from json import dumps, load, loads
 from nptyping import NDArray
-from os import makedirs
-from os.path import exists, join
-from sklearn.utils import shuffle
-from typing import Tuple
+from numpy import (
+    __version__ as numpy_version, array, asarray, concatenate, flatnonzero, frombuffer, int64, load as np_load, ravel, save,
+    searchsorted, uint8
+)
+from os import makedirs, rename
+from os.path import exists, getsize, join
+from scipy.sparse import csr_matrix, issparse
+from shutil import rmtree
+from sklearn import __version__ as sklearn_version
+from tempfile import mkdtemp
+from typing import Callable, Iterator, Tuple
 
 from ..error import Error
-from ..preprocessing import scale_features
-from robustness import Dataset, Boolean, Integer, Literal, Map, Real, Set, String, Vector
+from ..preprocessing import fit_scaling, fit_sparse_scaling, scale_features, scale_sparse_features
+from ..sampling import sample_indexes
+from robustness import Dataset, SparseDataset, StreamingDataset, Boolean, Integer, Literal, Map, Real, Set, String, Vector
+
+# changes whenever the content of the cache changes, so that the older entries are no longer read
+CACHE_VERSION = 1
+# number of bytes of a file scanned at once for its lines
+SCAN_BLOCK_SIZE = 1 << 22
 
 class Loader:
     '''Load different dataset formats'''
@@ -39,6 +57,153 @@ class Loader:
             makedirs(settings_parser.get('DEFAULT', 'datasets_dir'))
 
         self.__datasets_dir_path = settings_parser.get('DEFAULT', 'datasets_dir')
+        # an empty directory turns the cache of the preprocessed datasets off
+        self.__cache_dir_path = settings_parser.get('DEFAULT', 'cache_dir', fallback='')
+        self.__chunk_size = settings_parser.getint('DEFAULT', 'chunk_size', fallback=10000)
+
+    def get_chunk_size(self) -> Integer:
+        '''
+        Return the number of points read at once from a streamed test set
+        :return: Number of points in a chunk
+        '''
+        return self.__chunk_size
+
+    def get_cache_dir_path(self) -> String:
+        '''
+        Return the path to the directory caching the preprocessed datasets
+        :return: The path to the cache directory (empty if there is no cache)
+        '''
+        return self.__cache_dir_path
+
+    def __get_cache_key(self,
+        training_set_name: String,
+        test_set_name: String,
+        random: Boolean,
+        random_state: Integer | None,
+        num_test: Integer | None,
+        feature_range: Map[Literal, Tuple[Real, Real]],
+        categorical_indexes: Vector[Integer],
+        categories_list: Vector[Vector[Literal]]
+    ) -> String | None:
+        '''
+        Return the hash of the content of the files and of every preprocessing parameter
+        :param training_set_name: Name and extension of the training set
+        :param test_set_name: Name and extension of the test set
+        :param random: Whether or not to randomize the selection of the test points
+        :param random_state: Random number generation for sampling the test points
+        :param num_test: Number of test points to sample (all if None)
+        :param feature_range: Minimum and maximum value of the numerical features of the points
+        :param categorical_indexes: Indexes of the categorical features
+        :param categories_list: Holds the categories expected in the every categorical feature
+        :return: Hexadecimal digest, or None if the sets must not be cached
+        '''
+        if self.__cache_dir_path == '' or (random and random_state is None):
+            return None
+
+        digest = sha256()
+        for name in [training_set_name, test_set_name]:
+            path = join(self.get_datasets_dir_path(), name)
+            if not exists(path):
+                return None
+            digest.update('{}:{}:'.format(name, getsize(path)).encode())
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1 << 20), b''):
+                    digest.update(chunk)
+
+        # the versions of the libraries that parse, shuffle and scale the sets are part of the preprocessing
+        digest.update(repr((
+            CACHE_VERSION,
+            numpy_version,
+            sklearn_version,
+            type(self).__name__,
+            random,
+            random_state,
+            num_test if random else None,
+            sorted(feature_range.items(), key=str),
+            list(categorical_indexes),
+            [list(categories) for categories in categories_list]
+        )).encode())
+        return digest.hexdigest()
+
+    def __read_cache(self,
+        key: String,
+        categories_list: Vector[Vector[Literal]]
+    ) -> Tuple[Dataset, Dataset] | None:
+        '''
+        Read the preprocessed sets from the cache (the points are memory-mapped)
+        :param key: Hash identifying the sets
+        :param categories_list: Holds the categories expected in the every categorical feature,
+            completed with the ones found when the sets were loaded
+        :return: Training and test sets, or None if they are not in the cache
+        '''
+        cache_path = join(self.__cache_dir_path, key)
+        if not exists(join(cache_path, 'metadata.json')):
+            return None
+
+        with open(join(cache_path, 'metadata.json')) as file:
+            metadata = load(file)
+        for categories, cached_categories in zip(categories_list, metadata['categories_list']):
+            categories[:] = cached_categories
+
+        sets = []
+        for name in ['training', 'test']:
+            if metadata.get('sparse', False):
+                points = csr_matrix(tuple(
+                    np_load(join(cache_path, '{}_{}.npy'.format(name, part)), mmap_mode='r')
+                        for part in ['data', 'indices', 'indptr']
+                ), shape=metadata['{}_shape'.format(name)], copy=False)
+                sets.append(SparseDataset(points, metadata['{}_labels'.format(name)]))
+            else:
+                points = np_load(join(cache_path, '{}_points.npy'.format(name)), mmap_mode='r')
+                sets.append(Dataset(points, metadata['{}_labels'.format(name)]))
+        return sets[0], sets[1]
+
+    def __write_cache(self,
+        key: String,
+        training_set: Tuple[NDArray | csr_matrix, Vector[Literal]],
+        test_set: Tuple[NDArray | csr_matrix, Vector[Literal]],
+        categories_list: Vector[Vector[Literal]]
+    ) -> None:
+        '''
+        Write the preprocessed sets to the cache, unless their labels or categories cannot be read back as they are
+        :param key: Hash identifying the sets
+        :param training_set: Points and labels of the training set
+        :param test_set: Points and labels of the test set
+        :param categories_list: Holds the categories of every categorical feature
+        '''
+        metadata = {
+            'training_labels': training_set[1],
+            'test_labels': test_set[1],
+            'categories_list': categories_list,
+            'sparse': issparse(training_set[0]),
+            'training_shape': list(training_set[0].shape),
+            'test_shape': list(test_set[0].shape)
+        }
+        try:
+            encoded_metadata = dumps(metadata)
+        except (TypeError, ValueError):
+            return
+        # the representation tells apart the values that are equal but of a different type (e.g. 1 and 1.0)
+        if repr(loads(encoded_metadata)) != repr(metadata):
+            return
+
+        # the files are written aside and moved into place at once, so that a reader never sees them half written
+        if not exists(self.__cache_dir_path):
+            makedirs(self.__cache_dir_path, exist_ok=True)
+        temporary_path = mkdtemp(dir=self.__cache_dir_path)
+        for name, (points, _) in [('training', training_set), ('test', test_set)]:
+            if issparse(points):
+                for part in ['data', 'indices', 'indptr']:
+                    save(join(temporary_path, '{}_{}.npy'.format(name, part)), getattr(points, part))
+            else:
+                save(join(temporary_path, '{}_points.npy'.format(name)), asarray(points, dtype=float))
+        with open(join(temporary_path, 'metadata.json'), 'w') as file:
+            file.write(encoded_metadata)
+        try:
+            rename(temporary_path, join(self.__cache_dir_path, key))
+        except OSError:
+            # the same sets have been cached in the meantime
+            rmtree(temporary_path, ignore_errors=True)
 
     def get_datasets_dir_path(self) -> String:
         '''
@@ -52,6 +217,7 @@ class Loader:
         test_set_name: String,
         random: Boolean = True,
         random_state: Integer | None = None,
+        num_test: Integer | None = None,
         feature_range: Map[Literal, Tuple[Real, Real]] = {}, 
         categorical_indexes: Vector[Integer] = [],
         categories_list: Vector[Vector[Literal]] = [],
@@ -61,20 +227,50 @@ class Loader:
         :param training_set_name: Name and extension of the training set to load
         :param test_set_name: Name and extension of the test set to load
         :param random: Whether or not to randomize the selection of the test points
-        :param random_state: Random number generation for shuffling the data
+        :param random_state: Random number generation for sampling the test points
+        :param num_test: Number of test points to sample, if random (all if None)
         :param feature_range: Minimum and maximum value of the numerical features of the points
         :param categorical_indexes: Indexes of the categorical features
         :param categories_list: Holds the categories expected in the every categorical feature
         :return: Trainig and test sets
         '''
-        training_points, training_labels, test_points, test_labels = self.load_from_file(
+        cache_key = self.__get_cache_key(
             training_set_name,
-            test_set_name
+            test_set_name,
+            random,
+            random_state,
+            num_test,
+            feature_range,
+            categorical_indexes,
+            categories_list
         )
+        if cache_key is not None:
+            cached_sets = self.__read_cache(cache_key, categories_list)
+            if cached_sets is not None:
+                return cached_sets
+
+        # the categories that are not given are found in every test point, otherwise only the sampled ones are parsed
+        find_categories = any(len(categories) == 0 for _, categories in zip(categorical_indexes, categories_list))
+        # categorical features are encoded on dense points only
+        if random and not find_categories:
+            training_points, training_labels = self.load_training_from_file(
+                training_set_name,
+                test_set_name,
+                len(categorical_indexes) == 0
+            )
+            test_points, test_labels = self.read_sample(test_set_name, num_test, random_state)
+            if not issparse(training_points) and issparse(test_points):
+                test_points = test_points.toarray()
+        else:
+            training_points, training_labels, test_points, test_labels = self.load_from_file(
+                training_set_name,
+                test_set_name,
+                len(categorical_indexes) == 0
+            )
 
-        if len(training_points) == 0:
+        if training_points.shape[0] == 0:
             Error('Training set \'{}\' is empty'.format(training_set_name))
-        if len(test_points) == 0:
+        if test_points.shape[0] == 0:
             Error('Test set \'{}\' is empty'.format(test_set_name))
         if training_points.shape[1] != test_points.shape[1]:
             Error('Training set \'{}\' and test set \'{}\' have a different number of features'.format(training_set_name, test_set_name))
@@ -85,32 +281,268 @@ class Loader:
                 new_categories = new_categories.union(Set([point[feature_index] for point in test_points]))
                 categories.extend([*new_categories])
 
-        if random:
-            test_points, test_labels = shuffle(test_points, test_labels, random_state)
+        if random and find_categories:
+            # only the sampled test points are scaled, in the order of the file
+            indexes = sample_indexes(test_points.shape[0], num_test, random_state)
+            test_points, test_labels = test_points[indexes], test_labels[indexes]
 
-        training_points, test_points = scale_features(
-            training_points,
-            test_points,
-            feature_range,
-            categorical_indexes,
-            categories_list,
-        )
+        scaled_points = None
+        if issparse(training_points):
+            scaled_points = scale_sparse_features(training_points, test_points, feature_range)
+            if scaled_points is None:
+                training_points, test_points = training_points.toarray(), test_points.toarray()
+        if scaled_points is None:
+            scaled_points = scale_features(
+                training_points,
+                test_points,
+                feature_range,
+                categorical_indexes,
+                categories_list,
+            )
+        training_points, test_points = scaled_points
 
-        training_points = training_points.tolist()
         training_labels = training_labels.tolist()
-        test_points = test_points.tolist()
         test_labels = test_labels.tolist()
+        if cache_key is not None:
+            self.__write_cache(
+                cache_key,
+                (training_points, training_labels),
+                (test_points, test_labels),
+                categories_list
+            )
+
+        dataset_type = SparseDataset if issparse(training_points) else Dataset
+        return dataset_type(training_points, training_labels), dataset_type(test_points, test_labels)
+
+    def load_streaming(self,
+        training_set_name: String,
+        test_set_name: String,
+        random: Boolean = True,
+        random_state: Integer | None = None,
+        num_test: Integer | None = None,
+        feature_range: Map[Literal, Tuple[Real, Real]] = {},
+        categorical_indexes: Vector[Integer] = [],
+        categories_list: Vector[Vector[Literal]] = [],
+    ) -> Tuple[Dataset, StreamingDataset]:
+        '''
+        Load the training set, and the test set as a stream of chunks preprocessed as the training set is
+        :param training_set_name: Name and extension of the training set to load
+        :param test_set_name: Name and extension of the test set to stream
+        :param random: Whether or not to randomize the selection of the test points
+        :param random_state: Random number generation for sampling the test points
+        :param num_test: Number of test points to sample, if random (all if None)
+        :param feature_range: Minimum and maximum value of the numerical features of the points
+        :param categorical_indexes: Indexes of the categorical features
+        :param categories_list: Holds the categories expected in the every categorical feature
+        :return: Trainig set and streamed test set
+        '''
+        training_points, training_labels = self.load_training_from_file(
+            training_set_name,
+            test_set_name,
+            len(categorical_indexes) == 0
+        )
+        if training_points.shape[0] == 0:
+            Error('Training set \'{}\' is empty'.format(training_set_name))
+
+        # the points are counted without parsing them, and only the sampled ones are read
+        num_test_points = None
+        read_test_chunks = lambda: self.read_chunks(test_set_name)
+        if random:
+            offsets = self.index_lines(test_set_name)
+            indexes = sample_indexes(len(offsets), num_test, random_state)
+            num_test_points = len(indexes)
+            read_test_chunks = lambda: self.read_lines(test_set_name, offsets[indexes])
 
-        return Dataset(training_points, training_labels), Dataset(test_points, test_labels)
+        # one pass over the points checks them and finds their classes, and the categories they add
+        # (found in every test point, as load does, so that the whole test set is then read)
+        find_categories = any(len(categories) == 0 for _, categories in zip(categorical_indexes, categories_list))
+        first_index = 0
+        test_classes = Set()
+        test_categories = [Set() for _ in categorical_indexes]
+        for test_points, test_labels in (self.read_chunks(test_set_name) if find_categories else read_test_chunks()):
+            if test_points.shape[1] != training_points.shape[1]:
+                Error('Training set \'{}\' and test set \'{}\' have a different number of features'.format(training_set_name, test_set_name))
+            if random and find_categories:
+                start, end = searchsorted(indexes, [first_index, first_index + test_points.shape[0]])
+                test_classes.update(test_labels[indexes[start:end] - first_index].tolist())
+            else:
+                test_classes.update(test_labels.tolist())
+            first_index += test_points.shape[0]
+            for feature_index, categories, new_categories in zip(categorical_indexes, categories_list, test_categories):
+                if len(categories) == 0 and feature_index < training_points.shape[1]:
+                    feature_values = test_points[:, feature_index]
+                    new_categories.update(ravel(feature_values.toarray()) if issparse(feature_values) else feature_values)
+        if num_test_points is None:
+            num_test_points = first_index
+        if num_test_points == 0:
+            Error('Test set \'{}\' is empty'.format(test_set_name))
+
+        for feature_index, categories, new_categories in zip(categorical_indexes, categories_list, test_categories):
+            if len(categories) == 0 and feature_index < training_points.shape[1]:
+                new_categories = Set([point[feature_index] for point in training_points]).union(new_categories)
+                categories.extend([*new_categories])
+
+        scaling = None
+        if issparse(training_points):
+            scaling = fit_sparse_scaling(training_points, feature_range)
+            if scaling is None:
+                training_points = training_points.toarray()
+        if scaling is None:
+            training_points, scale = fit_scaling(
+                training_points,
+                feature_range,
+                categorical_indexes,
+                categories_list,
+            )
+            preprocess = lambda points: scale(points.toarray() if issparse(points) else points)
+        else:
+            training_points, preprocess = scaling
+
+        dataset_type = SparseDataset if issparse(training_points) else Dataset
+        return dataset_type(training_points, training_labels.tolist()), StreamingDataset(
+            read_test_chunks,
+            preprocess,
+            num_test_points,
+            training_points.shape[1],
+            [*test_classes]
+        )
+
+    def load_training_from_file(self,
+        training_set_name: String,
+        test_set_name: String,
+        sparse: Boolean = False
+    ) -> Tuple[NDArray | csr_matrix, NDArray]:
+        '''
+        Load points and labels of the training set only, laid out as load_from_file lays them out with the test set
+        :param training_set_name: Name and extension of the training set to load
+        :param test_set_name: Name and extension of the test set that is read later
+        :param sparse: Whether the points can be returned as a sparse matrix, when the format allows it
+        :return: Points and labels of the training set
+        '''
+        if not exists(join(self.get_datasets_dir_path(), test_set_name)):
+            Error('There is no dataset \'{}\' in \'{}\''.format(test_set_name, self.get_datasets_dir_path()))
+
+        training_points, training_labels, _, _ = self.load_from_file(training_set_name, '', sparse)
+        return training_points, training_labels
+
+    @abstractmethod
+    def read_chunks(self,
+        set_name: String
+    ) -> Iterator[Tuple[NDArray | csr_matrix, NDArray]]:
+        '''
+        Read points and labels of a set a chunk at a time, as load_from_file reads them
+        :param set_name: Name and extension of the set to read
+        :return: Points and labels of each chunk, as long as the chunk size set in the settings at most
+        '''
+        pass
+
+    @abstractmethod
+    def index_lines(self,
+        set_name: String
+    ) -> NDArray:
+        '''
+        Find the lines of a set that hold a point with a raw scan of the file, without parsing them
+        :param set_name: Name and extension of the set to scan
+        :return: Byte offset in the file of each line holding a point, in the order of the file
+        '''
+        pass
+
+    def scan_lines(self,
+        set_name: String,
+        find_points: Callable[[bytes, NDArray], NDArray]
+    ) -> NDArray:
+        '''
+        Scan the lines of a set a block at a time, without parsing them
+        :param set_name: Name and extension of the set to scan
+        :param find_points: Function that, given a block of whole lines, each one ending with a newline,
+            and the offset in the block where each line starts, tells which lines hold a point
+        :return: Byte offset in the file of each line holding a point, in the order of the file
+        '''
+        offsets = []
+        position = 0
+        remainder = b''
+        with open(join(self.get_datasets_dir_path(), set_name), 'rb') as file:
+            while True:
+                data = file.read(SCAN_BLOCK_SIZE)
+                block = remainder + data
+                # the block ends at its last newline, and the line after it goes with the next block
+                end = len(block) if data == b'' else block.rfind(b'\n') + 1
+                block, remainder = block[:end], block[end:]
+                if len(block) > 0:
+                    if not block.endswith(b'\n'):
+                        block += b'\n'
+                    starts = concatenate(([0], flatnonzero(frombuffer(block, dtype=uint8) == ord('\n'))[:-1] + 1))
+                    offsets.append(position + starts[find_points(block, starts)])
+                    position += end
+                if data == b'':
+                    return concatenate(offsets) if len(offsets) > 0 else array([], dtype=int64)
+
+    def read_lines(self,
+        set_name: String,
+        offsets: NDArray,
+        chunk_size: Integer | None = None
+    ) -> Iterator[Tuple[NDArray | csr_matrix, NDArray]]:
+        '''
+        Read points and labels of some lines of a set a chunk at a time, seeking to each line,
+        as read_chunks reads them
+        :param set_name: Name and extension of the set to read
+        :param offsets: Byte offsets in the file of the lines to read, sorted
+        :param chunk_size: Number of lines parsed at once (the chunk size set in the settings if None)
+        :return: Points and labels of each chunk
+        '''
+        chunk_size = self.__chunk_size if chunk_size is None else chunk_size
+        with open(join(self.get_datasets_dir_path(), set_name), 'rb') as file:
+            for start in range(0, len(offsets), chunk_size):
+                lines = []
+                for offset in offsets[start:start + chunk_size].tolist():
+                    file.seek(offset)
+                    lines.append(file.readline())
+                points, labels = self.parse_lines(set_name, b''.join(lines))
+                if points.shape[0] > 0:
+                    yield points, labels
+
+    @abstractmethod
+    def parse_lines(self,
+        set_name: String,
+        lines: bytes
+    ) -> Tuple[NDArray | csr_matrix, NDArray]:
+        '''
+        Parse some lines of a set, as read_chunks parses a chunk
+        :param set_name: Name and extension of the set the lines belong to
+        :param lines: Lines of the file, joined
+        :return: Points and labels held by the lines
+        '''
+        pass
+
+    def read_sample(self,
+        set_name: String,
+        num_samples: Integer | None = None,
+        random_state: Integer | None = None
+    ) -> Tuple[NDArray | csr_matrix, NDArray]:
+        '''
+        Read a uniform sample of the points of a set, parsing only the sampled lines
+        :param set_name: Name and extension of the set to read
+        :param num_samples: Size of the sample (all points if None)
+        :param random_state: Random number generation for drawing the sample
+        :return: Points and labels of the sample, in the order of the file
+        '''
+        offsets = self.index_lines(set_name)
+        offsets = offsets[sample_indexes(len(offsets), num_samples, random_state)]
+        # the sampled lines are parsed at once, as load_from_file parses the whole set
+        for points, labels in self.read_lines(set_name, offsets, max(1, len(offsets))):
+            return points, labels
+        return array([]), array([])
 
     def load_from_file(self,
         training_set_name: String,
         test_set_name: String = '',
+        sparse: Boolean = False
     ) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
         '''
         Load points and labels of the training and test sets
         :param training_set_name: Name and extension of the training set to load
         :param test_set_name: Name and extension of the test set to load (if available)
+        :param sparse: Whether the points can be returned as sparse matrices, when the format allows it
         :return: Points and labels of the training and test sets
         '''
         if not exists(join(self.get_datasets_dir_path(), training_set_name)):
@@ -10,29 +10,28 @@
 # =============================================================================
 
 from nptyping import NDArray
-from numpy import array, concatenate, delete, hsplit
+from numpy import array, concatenate, delete, hsplit, ravel
+from scipy.sparse import csr_matrix
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import MinMaxScaler, OneHotEncoder, OrdinalEncoder
-from typing import Tuple
+from typing import Callable, Tuple
 
-from robustness import Integer, Literal, Map, Real, Vector
+from robustness import Boolean, Integer, Literal, Map, Real, Vector
 
-def one_hot_encoding(
+def fit_one_hot_encoding(
     training_points: NDArray,
-    test_points: NDArray,
     categorical_indexes: Vector[Integer] = [],
     categories_list: Vector[Vector[Literal]] = []
-) -> Tuple[Tuple[NDArray, NDArray], Integer]:
+) -> Tuple[Callable[[NDArray], NDArray], Integer]:
     '''
-    Encode categorical features as a one-hot numeric array
+    Fit the encoding of the categorical features as a one-hot numeric array to the training points
     :param training_points: Points in the training set
-    :param test_points: Points in the test set
     :param categorical_indexes: Indexes of the categorical features
     :param categories_list: Holds the categories expected in the every categorical feature
-    :return: Training and test points with encoded categorical features, and the encoding size
+    :return: Function encoding the categorical features of some points, and the encoding size
     '''
     if len(categorical_indexes) == 0:
-        return (training_points, test_points), 0
+        return lambda points: points, 0
 
     encoding_size = 0
 
@@ -58,18 +57,34 @@ def one_hot_encoding(
         [('', OneHotEncoder(categories=one_hot_categories, sparse=False), one_hot_categorical_indexes)]
     )
 
-    training_points = concatenate((
-            binary_encoder.fit_transform(training_points),
-            one_hot_encoder.fit_transform(training_points),
-            delete(training_points, categorical_indexes, axis=1)
-        ), axis=1)
-    test_points = concatenate((
-            binary_encoder.transform(test_points),
-            one_hot_encoder.transform(test_points),
-            delete(test_points, categorical_indexes, axis=1),
-        ), axis=1)
+    binary_encoder.fit(training_points)
+    one_hot_encoder.fit(training_points)
+
+    def encode(points: NDArray) -> NDArray:
+        return concatenate((
+                binary_encoder.transform(points),
+                one_hot_encoder.transform(points),
+                delete(points, categorical_indexes, axis=1)
+            ), axis=1)
 
-    return (training_points, test_points), encoding_size
+    return encode, encoding_size
+
+def one_hot_encoding(
+    training_points: NDArray,
+    test_points: NDArray,
+    categorical_indexes: Vector[Integer] = [],
+    categories_list: Vector[Vector[Literal]] = []
+) -> Tuple[Tuple[NDArray, NDArray], Integer]:
+    '''
+    Encode categorical features as a one-hot numeric array
+    :param training_points: Points in the training set
+    :param test_points: Points in the test set
+    :param categorical_indexes: Indexes of the categorical features
+    :param categories_list: Holds the categories expected in the every categorical feature
+    :return: Training and test points with encoded categorical features, and the encoding size
+    '''
+    encode, encoding_size = fit_one_hot_encoding(training_points, categorical_indexes, categories_list)
+    return (encode(training_points), encode(test_points)), encoding_size
 
 def set_scaler_with_range(
     scaler: MinMaxScaler,
@@ -95,71 +110,108 @@ def set_scaler_with_range(
             [feature_range[i][1] if i in feature_range else scaler.data_max_[i] for i in range(points.shape[1])]
         ]))
 
-def scale_features(
+def fit_scaling(
     training_points: NDArray,
-    test_points: NDArray,
     feature_range: Map[Literal, Tuple[Real, Real]] = {},
     categorical_indexes: Vector[Integer] = [],
     categories_list: Vector[Vector[Literal]] = []
-) -> Tuple[Tuple[NDArray, NDArray], Integer]:
+) -> Tuple[NDArray, Callable[[NDArray], NDArray]]:
     '''
-    Scale the features of training and test points to the [0,1] range
+    Fit the encoding and the scaling of the features to the [0,1] range to the training points
     :param training_points: Points in the training set
-    :param test_points: Points in the test set
     :param feature_range: Minimum and maximum value of the numerical features of the points (if available)
     :param categorical_features: What are the categorical features (indexes)
     :param categories_list: Holds the categories expected in the every categorical feature
-    :return: Training and test points with scaled features
+    :return: Training points with scaled features, and the function scaling the features of other points
     '''
-    (training_points, test_points), encoded_with_one_hot = one_hot_encoding(
-        training_points,
-        test_points,
-        categorical_indexes,
-        categories_list
-    )
+    encode, encoded_with_one_hot = fit_one_hot_encoding(training_points, categorical_indexes, categories_list)
+    training_points = encode(training_points)
 
     scaler = MinMaxScaler(feature_range=(0.0, 1.0))
-
+    _, numerical_training_features = hsplit(training_points, [encoded_with_one_hot])
     if len(feature_range) == 0:
-        if encoded_with_one_hot == 0:
-            training_points = scaler.fit_transform(training_points)
-            test_points = scaler.transform(test_points)
-
-        else:
-            categorical_training_features, numerical_training_features = hsplit(
-                training_points, [encoded_with_one_hot]
-            )
-            training_points = concatenate((
-                categorical_training_features, scaler.fit_transform(numerical_training_features)
-            ), axis=1)
-
-            categorical_test_features, numerical_test_features = hsplit(
-                test_points, [encoded_with_one_hot]
-            )
-            test_points = concatenate((
-                categorical_test_features, scaler.transform(numerical_test_features)
-            ), axis=1)
-        
+        scaler.fit(numerical_training_features)
     else:
+        set_scaler_with_range(scaler, numerical_training_features, feature_range)
+
+    def scale(points: NDArray, encoded: Boolean = False) -> NDArray:
+        if not encoded:
+            points = encode(points)
         if encoded_with_one_hot == 0:
-            set_scaler_with_range(scaler, training_points, feature_range)
-            training_points = scaler.transform(training_points)
-            test_points = scaler.transform(test_points)
-
-        else:
-            categorical_training_features, numerical_training_features = hsplit(
-                training_points, [encoded_with_one_hot]
-            )
-            set_scaler_with_range(scaler, numerical_training_features, feature_range)
-            training_points = concatenate((
-                categorical_training_features, scaler.transform(numerical_training_features)
-            ), axis=1)
+            return scaler.transform(points)
+        categorical_features, numerical_features = hsplit(points, [encoded_with_one_hot])
+        return concatenate((categorical_features, scaler.transform(numerical_features)), axis=1)
 
-            categorical_test_features, numerical_test_features = hsplit(
-                test_points, [encoded_with_one_hot]
-            )
-            test_points = concatenate((
-                categorical_test_features, scaler.transform(numerical_test_features)
-            ), axis=1)
+    return scale(training_points, encoded=True), scale
 
-    return training_points, test_points
\ No newline at end of file
+def scale_features(
+    training_points: NDArray,
+    test_points: NDArray,
+    feature_range: Map[Literal, Tuple[Real, Real]] = {},
+    categorical_indexes: Vector[Integer] = [],
+    categories_list: Vector[Vector[Literal]] = []
+) -> Tuple[NDArray, NDArray]:
+    '''
+    Scale the features of training and test points to the [0,1] range
+    :param training_points: Points in the training set
+    :param test_points: Points in the test set
+    :param feature_range: Minimum and maximum value of the numerical features of the points (if available)
+    :param categorical_features: What are the categorical features (indexes)
+    :param categories_list: Holds the categories expected in the every categorical feature
+    :return: Training and test points with scaled features
+    '''
+    training_points, scale = fit_scaling(training_points, feature_range, categorical_indexes, categories_list)
+    return training_points, scale(test_points)
+
+def fit_sparse_scaling(
+    training_points: csr_matrix,
+    feature_range: Map[Literal, Tuple[Real, Real]] = {}
+) -> Tuple[csr_matrix, Callable[[csr_matrix], csr_matrix]] | None:
+    '''
+    Fit the scaling of the features of sparse points to the [0,1] range to the training points, as fit_scaling does,
+    when the scaling maps 0 to 0 along every feature (so that the points stay sparse)
+    :param training_points: Points in the training set (one per row)
+    :param feature_range: Minimum and maximum value of the features of the points (if available)
+    :return: Training points with scaled features and the function scaling the features of other points,
+        or None if the scaling does not keep them sparse
+    '''
+    if 'all' in feature_range:
+        data_min = [feature_range['all'][0] for _ in range(training_points.shape[1])]
+        data_max = [feature_range['all'][1] for _ in range(training_points.shape[1])]
+    else:
+        # the minimum and the maximum also account for the zeros that are not stored
+        data_min = ravel(training_points.min(axis=0).toarray())
+        data_max = ravel(training_points.max(axis=0).toarray())
+        data_min = [feature_range[i][0] if i in feature_range else data_min[i] for i in range(training_points.shape[1])]
+        data_max = [feature_range[i][1] if i in feature_range else data_max[i] for i in range(training_points.shape[1])]
+
+    # the same scaler as fit_scaling, fitted to the same bounds, only scales the features that start from 0
+    scaler = MinMaxScaler(feature_range=(0.0, 1.0)).fit(array([data_min, data_max]))
+    if (scaler.min_ != 0.0).any():
+        return None
+
+    def scale(points: csr_matrix) -> csr_matrix:
+        points = csr_matrix(points, dtype=float, copy=True)
+        points.data *= scaler.scale_[points.indices]
+        return points
+
+    return scale(training_points), scale
+
+def scale_sparse_features(
+    training_points: csr_matrix,
+    test_points: csr_matrix,
+    feature_range: Map[Literal, Tuple[Real, Real]] = {}
+) -> Tuple[csr_matrix, csr_matrix] | None:
+    '''
+    Scale the features of sparse training and test points to the [0,1] range, as scale_features does,
+    when the scaling maps 0 to 0 along every feature (so that the points stay sparse)
+    :param training_points: Points in the training set (one per row)
+    :param test_points: Points in the test set (one per row)
+    :param feature_range: Minimum and maximum value of the features of the points (if available)
+    :return: Training and test points with scaled features, or None if the scaling does not keep them sparse
+    '''
+    scaling = fit_sparse_scaling(training_points, feature_range)
+    if scaling is None:
+        return None
+    training_points, scale = scaling
+    return training_points, scale(test_points)
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# File: results_writer.py
+# Updated: 02/05/2023
+# =============================================================================
+'''Define a writer that streams the verification results to disk'''
+# =============================================================================
+# Dependencies:
+#   ../base.py
+#   ./error.py
+# =============================================================================
+
+from ast import literal_eval
+from csv import reader, writer
+from json import dump, load
+from os import makedirs, replace, truncate
+from os.path import exists, getsize, join
+from pandas import DataFrame
+
+from robustness import Boolean, Integer, Literal, Map, Real, Set, String, Vector
+from robustness.utils import Error
+
+def read_classifications(
+    results_dir_path: String,
+    k_values: Vector[Integer]
+) -> Vector[Map[Integer, Set[Literal]]]:
+    '''
+    Read back the classifications written in the details files of a results directory
+    :param results_dir_path: Directory for the results
+    :param k_values: Number of neighbors considered (one or more values)
+    :return: The most voted labels for each k, for each classified point
+    '''
+    classifications = []
+    for k in k_values:
+        with open(join(results_dir_path, 'k{}'.format(k), 'details.csv'), newline='') as file:
+            rows = reader(file)
+            next(rows)
+            for i, row in enumerate(rows):
+                if i == len(classifications):
+                    classifications.append({})
+                classifications[i][k] = literal_eval(row[3])
+    return classifications
+
+class ResultsWriter:
+    '''Represent a sink that writes one row of details.csv per classified point and k'''
+
+    def __init__(self,
+        results_dir_path: String,
+        k_values: Vector[Integer],
+        abstract: Boolean,
+        flush_every: Integer = 100,
+        resume: Boolean = False,
+        certified_radius: Boolean = False
+    ) -> None:
+        '''
+        Let the class initialize the object's attributes and create the details files
+        :param results_dir_path: Directory for the results
+        :param k_values: Number of neighbors considered (one or more values)
+        :param abstract: Whether the results come from an abstract classifier
+        :param flush_every: Number of points after which the files on disk are brought up to date
+        :param resume: Whether to continue from the last checkpoint in the directory (if any)
+        :param certified_radius: Whether the details also report the certified radius of each point
+        '''
+        self.__results_dir_path = results_dir_path
+        self.__k_values = k_values
+        self.__abstract = abstract
+        self.__flush_every = flush_every
+
+        self.__classified_points = 0
+        self.__runtime = 0
+        self.__stable_yes_cnt = [0 for _ in k_values]
+        self.__stable_no_cnt = [0 for _ in k_values]
+        self.__robust_yes_cnt = [0 for _ in k_values]
+        self.__robust_no_cnt = [0 for _ in k_values]
+        self.__robust_do_not_know_cnt = [0 for _ in k_values]
+
+        checkpoint = None
+        if resume and exists(self.__get_checkpoint_path()):
+            with open(self.__get_checkpoint_path()) as file:
+                checkpoint = load(file)
+            if checkpoint['k_values'] != list(k_values) or checkpoint['abstract'] != abstract:
+                Error('The checkpoint in \'{}\' does not match the configuration'.format(results_dir_path))
+            self.__classified_points = checkpoint['classified_points']
+            self.__runtime = checkpoint['runtime']
+            self.__stable_yes_cnt = checkpoint['stable_yes']
+            self.__stable_no_cnt = checkpoint['stable_no']
+            self.__robust_yes_cnt = checkpoint['robust_yes']
+            self.__robust_no_cnt = checkpoint['robust_no']
+            self.__robust_do_not_know_cnt = checkpoint['robust_do_not_know']
+
+        self.__files = []
+        self.__writers = []
+        for i, k in enumerate(k_values):
+            if not exists(self.__get_k_dir_path(k)):
+                makedirs(self.__get_k_dir_path(k))
+            details_path = join(self.__get_k_dir_path(k), 'details.csv')
+            if checkpoint is not None:
+                # rows written after the checkpoint are dropped, as their points are verified again
+                truncate(details_path, checkpoint['details_sizes'][i])
+                file = open(details_path, 'a', newline='')
+            else:
+                file = open(details_path, 'w', newline='')
+            self.__files.append(file)
+            self.__writers.append(writer(file, lineterminator='\n'))
+            if checkpoint is None:
+                self.__writers[-1].writerow(['', 'Robust', 'Stable', 'Classification'] + (['Radius'] if certified_radius else []))
+
+    def __get_k_dir_path(self,
+        k: Integer
+    ) -> String:
+        return join(self.__results_dir_path, 'k{}'.format(k))
+
+    def __get_checkpoint_path(self) -> String:
+        return join(self.__results_dir_path, 'checkpoint.json')
+
+    def __write_checkpoint(self) -> None:
+        '''
+        Save the counters and the size of the details files, which must have been flushed
+        '''
+        checkpoint = {
+            'k_values': list(self.__k_values),
+            'abstract': self.__abstract,
+            'classified_points': self.__classified_points,
+            'runtime': self.__runtime,
+            'stable_yes': self.__stable_yes_cnt,
+            'stable_no': self.__stable_no_cnt,
+            'robust_yes': self.__robust_yes_cnt,
+            'robust_no': self.__robust_no_cnt,
+            'robust_do_not_know': self.__robust_do_not_know_cnt,
+            'details_sizes': [getsize(join(self.__get_k_dir_path(k), 'details.csv')) for k in self.__k_values]
+        }
+        # the checkpoint is replaced at once, so that an interruption never leaves it half written
+        with open(self.__get_checkpoint_path() + '.tmp', 'w') as file:
+            dump(checkpoint, file)
+        replace(self.__get_checkpoint_path() + '.tmp', self.__get_checkpoint_path())
+
+    def get_classified_points(self) -> Integer:
+        '''
+        Return the number of points written so far
+        :return: Number of classified points
+        '''
+        return self.__classified_points
+
+    def get_runtime(self) -> Real:
+        '''
+        Return the total execution time of the points written so far
+        :return: Runtime (seconds)
+        '''
+        return self.__runtime
+
+    def get_robustness(self) -> Real:
+        '''
+        Return the percentage of robust points over all k
+        :return: Robustness (percentage)
+        '''
+        return sum(self.__robust_yes_cnt) / (self.__classified_points * len(self.__k_values)) * 100
+
+    def get_stability(self) -> Real:
+        '''
+        Return the percentage of stable points over all k
+        :return: Stability (percentage)
+        '''
+        return sum(self.__stable_yes_cnt) / (self.__classified_points * len(self.__k_values)) * 100
+
+    def add(self,
+        test_label: Literal,
+        most_voted_labels: Map[Integer, Set[Literal]],
+        exec_time: Real = 0,
+        radii: Map[Integer, Real] | None = None
+    ) -> None:
+        '''
+        Write the verdicts for a classified point
+        :param test_label: Label of the test point
+        :param most_voted_labels: The most voted labels for each k
+        :param exec_time: Execution time of the point
+        :param radii: Certified radius for each k (if required)
+        '''
+        not_stable = 'Do not know' if self.__abstract else 'No'
+
+        for j, labels in enumerate(most_voted_labels.values()):
+            if len(labels) == 1:
+                is_stable = 'Yes'
+                self.__stable_yes_cnt[j] += 1
+                if test_label in labels:
+                    is_robust = 'Yes'
+                    self.__robust_yes_cnt[j] += 1
+                else:
+                    is_robust = 'No'
+                    self.__robust_no_cnt[j] += 1
+            else:
+                is_stable = not_stable
+                self.__stable_no_cnt[j] += 1
+                if self.__abstract and test_label in labels:
+                    is_robust = 'Do not know'
+                    self.__robust_do_not_know_cnt[j] += 1
+                else:
+                    is_robust = 'No'
+                    self.__robust_no_cnt[j] += 1
+
+            row = [self.__classified_points, is_robust, is_stable, labels]
+            if radii is not None:
+                row.append(radii[self.__k_values[j]])
+            self.__writers[j].writerow(row)
+
+        self.__classified_points += 1
+        self.__runtime += exec_time
+        if self.__classified_points % self.__flush_every == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        '''
+        Bring the details, the summaries and the checkpoint on disk up to date with the points written so far
+        '''
+        for file in self.__files:
+            file.flush()
+        self.__write_checkpoint()
+
+        for i, k in enumerate(self.__k_values):
+            robustness = {
+                '# Yes' : [self.__robust_yes_cnt[i]],
+                '# No': [self.__robust_no_cnt[i]]
+            }
+            if self.__abstract:
+                robustness['# Do not know'] = [self.__robust_do_not_know_cnt[i]]
+            robustness['Proved Robustness' if self.__abstract else 'Robustness'] = ['{}%'.format(
+                round(self.__robust_yes_cnt[i] / self.__classified_points * 100, 1)
+                    if self.__classified_points > 0 else '-'
+            )]
+            DataFrame(robustness).to_csv(join(self.__get_k_dir_path(k), 'robustness.csv'))
+
+            stability = {
+                '# Yes' : [self.__stable_yes_cnt[i]],
+                '# Do not know' if self.__abstract else '# No': [self.__stable_no_cnt[i]],
+                'Proved Stability' if self.__abstract else 'Stability': ['{}%'.format(round(
+                    self.__stable_yes_cnt[i] / self.__classified_points * 100, 1)
+                        if self.__classified_points > 0 else '-'
+                )]
+            }
+            DataFrame(stability).to_csv(join(self.__get_k_dir_path(k), 'stability.csv'))
+
+    def close(self) -> None:
+        '''
+        Write the final summaries and close the details files
+        '''
+        self.flush()
+        for file in self.__files:
+            file.close()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# =============================================================================
+# File: sampling.py
+# Updated: 02/05/2023
+# =============================================================================
+'''Define the seeded sampling of the test points'''
+# =============================================================================
+# Dependencies:
+#   ../base.py
+# =============================================================================
+
+from nptyping import NDArray
+from numpy import arange, array, int64
+from sklearn.utils import check_random_state
+
+from robustness import Integer, Set
+
+def sample_indexes(
+    num_points: Integer,
+    num_samples: Integer | None = None,
+    random_state: Integer | None = None
+) -> NDArray:
+    '''
+    Draw a uniform sample without replacement of the indexes of some points (Floyd's algorithm),
+    in time and memory proportional to the size of the sample
+    :param num_points: Number of points to sample from
+    :param num_samples: Size of the sample (all points if None)
+    :param random_state: Random number generation for drawing the sample
+    :return: Sampled indexes, sorted
+    '''
+    if num_samples is None or num_samples >= num_points:
+        return arange(num_points)
+
+    samples = Set()
+    first_index = num_points - num_samples
+    draws = check_random_state(random_state).randint(0, arange(first_index, num_points) + 1)
+    for index, draw in enumerate(draws.tolist(), first_index):
+        samples.add(index if draw in samples else draw)
+    return array(sorted(samples), dtype=int64)